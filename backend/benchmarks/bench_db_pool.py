@@ -0,0 +1,52 @@
+"""
+Measures database pool checkout waits and saturation under concurrent sessions, to size
+`DATABASE_POOL_SIZE` / `DATABASE_MAX_OVERFLOW` for a given number of concurrent requests.
+
+Each task opens a session from the shared factory, runs a query and holds the connection
+for `--hold-ms` (standing in for a request's database time). Runs against the database in
+`DATABASE_URL` with the pool settings from the environment, e.g.:
+
+    DATABASE_POOL_SIZE=5 DATABASE_MAX_OVERFLOW=0 python -m benchmarks.bench_db_pool --concurrency 20
+"""
+import argparse
+import asyncio
+import time
+from .common import use_placeholder_settings, summarize, print_report
+
+use_placeholder_settings()
+
+from sqlalchemy import text  # noqa: E402
+from src.core.database import async_session_factory, engine, pool_stats  # noqa: E402
+
+async def main(concurrency: int, requests: int, hold_ms: float):
+    latencies = []
+
+    async def request():
+        start = time.perf_counter()
+        async with async_session_factory() as session:
+            await session.execute(text("SELECT 1"))
+            await asyncio.sleep(hold_ms / 1000)
+        latencies.append(time.perf_counter() - start)
+
+    async def worker(count: int):
+        for _ in range(count):
+            await request()
+
+    per_worker, extra = divmod(requests, concurrency)
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(per_worker + (i < extra)) for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    stats = pool_stats()
+    print(f"{requests} sessions from {concurrency} concurrent tasks in {elapsed:.2f}s ({requests / elapsed:.0f}/s)")
+    print_report("Session latency including checkout (microseconds)", {"session": summarize(latencies)})
+    print(f"Pool: {stats}")
+    await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=20, help="Concurrent tasks using sessions")
+    parser.add_argument("--requests", type=int, default=500, help="Total sessions to open")
+    parser.add_argument("--hold-ms", type=float, default=10.0, help="Time each session holds its connection")
+    args = parser.parse_args()
+    asyncio.run(main(args.concurrency, args.requests, args.hold_ms))
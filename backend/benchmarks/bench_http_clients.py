@@ -0,0 +1,45 @@
+"""
+Calls `gemini_service.generate_content` against a local mock upstream, once with a fresh
+`httpx.AsyncClient` per call (the previous behaviour) and once through the shared pooled
+client, and reports latency together with the number of TCP connections the upstream accepted.
+"""
+import asyncio
+import httpx
+from .common import use_placeholder_settings, time_async, summarize, print_report
+from .mock_upstream import MockUpstream
+
+use_placeholder_settings()
+
+import src.graphs  # noqa: E402,F401  (import order used by the app; avoids the graphs <-> gemini_service cycle)
+from src.api.services import gemini_service  # noqa: E402
+from src.api.services.http_clients import http_clients  # noqa: E402
+
+ITERATIONS = 300
+
+async def main():
+    upstream = MockUpstream()
+    await upstream.start()
+    gemini_service.GEMINI_API_URL = upstream.url
+
+    async def client_per_call():
+        async with httpx.AsyncClient() as client:
+            response = await client.post(upstream.url, params={"key": "benchmark"}, json={"contents": []})
+            response.json()
+
+    async def shared_client():
+        await gemini_service.generate_content("sneakers")
+
+    results = {}
+    for case, func in (("client per call", client_per_call), ("shared pooled client", shared_client)):
+        upstream.reset()
+        stats = summarize(await time_async(func, ITERATIONS))
+        stats["connections"] = upstream.connections
+        stats["requests"] = upstream.requests
+        results[case] = stats
+
+    await http_clients.close()
+    await upstream.close()
+    print_report(f"Gemini call latency against a local mock upstream ({ITERATIONS} calls + warmup)", results)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,35 @@
+"""
+Measures the per-call overhead of the stage instrumentation on a trivial coroutine:
+uninstrumented, decorated while disabled (the function is returned as is), and decorated
+with `prometheus_client` recording into a histogram.
+"""
+import asyncio
+from .common import print_report, summarize, time_async, use_placeholder_settings
+
+use_placeholder_settings()
+
+from src.core.instrumentation import STORAGE, Instrumentation  # noqa: E402
+
+ITERATIONS = 100_000
+
+async def stage():
+    return None
+
+async def main():
+    disabled = Instrumentation(False)
+    enabled = Instrumentation(True)
+    if not enabled.enabled:
+        print("prometheus_client is not installed; only the disabled case can be measured")
+    cases = {
+        "plain coroutine": stage,
+        "timed, disabled": disabled.timed(STORAGE, "stage")(stage),
+    }
+    if enabled.enabled:
+        cases["timed, enabled"] = enabled.timed(STORAGE, "stage")(stage)
+    results = {}
+    for label, func in cases.items():
+        results[label] = summarize(await time_async(func, ITERATIONS, warmup=1000))
+    print_report(f"Instrumentation overhead per call ({ITERATIONS:,} calls)", results)
+
+if __name__ == "__main__":
+    asyncio.run(main())
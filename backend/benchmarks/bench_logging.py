@@ -0,0 +1,108 @@
+"""
+Measures request throughput of an endpoint that logs like the `/generate` path, with the
+previous logging setup (a synchronous stream handler at DEBUG and eagerly built f-strings)
+and with `core.logging` (queue handler and writer thread at INFO, lazy %-style arguments).
+
+Each case writes to a real file, and again to a sink that takes `SLOW_SINK_SECONDS` per
+write, standing in for a stderr pipe whose reader (container log driver, terminal) lags.
+"""
+import asyncio
+import logging
+import os
+import tempfile
+import time
+import httpx
+from fastapi import FastAPI
+from .common import use_placeholder_settings
+
+use_placeholder_settings()
+
+from src.core.logging import configure_logging, get_logger, stop_logging  # noqa: E402
+
+REQUESTS = 2000
+CONCURRENCY = 50
+SLOW_SINK_SECONDS = 0.0002
+PROMPT = "a post about our new winter collection of waterproof hiking boots"
+
+logger = get_logger("bench_logging")
+
+def build_app(lazy: bool) -> FastAPI:
+    app = FastAPI()
+    state = {"prompt": PROMPT, "content": "❄️ New in: waterproof hiking boots. Shop Now! #WinterSale", "error": None}
+
+    @app.post("/generate")
+    async def generate():
+        if lazy:
+            logger.info("Generating post for prompt: %s", PROMPT)
+            logger.debug("Executing generate_node with prompt: %s", state["prompt"])
+            logger.debug("Sending tweet of %d characters to Twitter API", len(state["content"]))
+            logger.debug("Executing validate_node")
+            logger.info("Saved new post with ID: %s", 42)
+            logger.info("Generated post ID: %s", 42)
+        else:
+            logger.info(f"Generating post for prompt: {PROMPT}")
+            logger.info(f"Executing generate_node with prompt: {state['prompt']}")
+            logger.debug(f"Sending to Twitter API: {state}")
+            logger.info("Executing validate_node")
+            logger.info(f"Saved new post with ID: {42}")
+            logger.info(f"Generated post ID: {42}")
+        await asyncio.sleep(0)
+        return {"id": 42}
+    return app
+
+class SlowFile:
+    """
+    File wrapper whose writes block for a fixed time, like a pipe with a slow reader.
+    """
+    def __init__(self, stream, delay: float):
+        self.stream = stream
+        self.delay = delay
+
+    def write(self, text: str):
+        time.sleep(self.delay)
+        return self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+def use_sync_logging(stream):
+    stop_logging()
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+    root.addHandler(handler)
+    root.setLevel(logging.DEBUG)
+
+def use_queue_logging(stream):
+    configure_logging(stream)
+    logging.getLogger().setLevel(logging.INFO)
+
+async def throughput(app: FastAPI) -> float:
+    transport = httpx.ASGITransport(app=app)
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one():
+            async with semaphore:
+                await client.post("/generate")
+        await asyncio.gather(*(one() for _ in range(100)))
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(REQUESTS)))
+        return REQUESTS / (time.perf_counter() - start)
+
+async def main():
+    print(f"Requests/s over {REQUESTS:,} requests, {CONCURRENCY} concurrent, 6 log calls per request")
+    with tempfile.TemporaryDirectory() as directory:
+        for sink in ("file", "slow sink"):
+            for label, setup, lazy in (("sync handler, DEBUG, f-strings", use_sync_logging, False),
+                                       ("queue handler, INFO, lazy args", use_queue_logging, True)):
+                with open(os.path.join(directory, "bench.log"), "w") as log_file:
+                    stream = log_file if sink == "file" else SlowFile(log_file, SLOW_SINK_SECONDS)
+                    setup(stream)
+                    rate = await throughput(build_app(lazy))
+                    stop_logging()
+                print(f"  {sink:<10} {label:<34} {rate:10,.0f} req/s")
+
+if __name__ == "__main__":
+    asyncio.run(main())
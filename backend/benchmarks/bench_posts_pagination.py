@@ -0,0 +1,94 @@
+"""
+Compares the old unbounded `/posts` query (`get_all_posts`) with keyset-paginated,
+filtered and projected pages from `list_posts` on a large `post` table.
+
+Runs against the database in `DATABASE_URL` and tops the `post` table up to `--rows`
+synthetic rows first (1,000,000 by default), e.g.:
+
+    DATABASE_URL=postgresql+asyncpg://... python -m benchmarks.bench_posts_pagination --rows 1000000
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from .common import use_placeholder_settings, time_async, summarize, print_report
+
+use_placeholder_settings()
+
+import src.graphs  # noqa: E402,F401  (import order: graphs before services)
+from sqlalchemy import func, insert  # noqa: E402
+from sqlmodel import SQLModel, select  # noqa: E402
+from src.core.database import async_session_factory as session_factory, engine  # noqa: E402
+from src.api.models.post import Post  # noqa: E402
+from src.api.services.postgresql_storage_service import PostgreSQLStorageService, encode_cursor  # noqa: E402
+
+CHUNK_SIZE = 10_000
+PAGE_SIZE = 100
+
+async def populate(session_factory, rows: int):
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    async with session_factory() as session:
+        existing = (await session.execute(select(func.count()).select_from(Post))).scalar_one()
+        rng = random.Random(42)
+        start = datetime.now(timezone.utc) - timedelta(days=365)
+        inserted_start = time.perf_counter()
+        for offset in range(existing, rows, CHUNK_SIZE):
+            batch = []
+            for i in range(offset, min(rows, offset + CHUNK_SIZE)):
+                approved = rng.random() < 0.6
+                batch.append({
+                    "content": f"Synthetic post {i} " + "x" * rng.randint(40, 240),
+                    "approved": approved,
+                    "is_posted": approved and rng.random() < 0.7,
+                    "scheduled_at": start + timedelta(minutes=rng.randint(0, 525_600)) if approved else None,
+                    "created_at": start + timedelta(seconds=i * 31_536_000 / rows),
+                })
+            await session.execute(insert(Post), batch)
+            await session.commit()
+        if rows > existing:
+            print(f"Inserted {rows - existing:,} rows in {time.perf_counter() - inserted_start:.1f}s")
+        return max(rows, existing)
+
+async def main(rows: int, iterations: int, skip_full: bool):
+    total = await populate(session_factory, rows)
+    print(f"Table has {total:,} posts; page size {PAGE_SIZE}")
+
+    async with session_factory() as session:
+        middle = (await session.execute(
+            select(Post.created_at, Post.id).order_by(Post.created_at.desc(), Post.id.desc()).offset(total // 2).limit(1)
+        )).one()
+    deep_cursor = encode_cursor(middle.created_at, middle.id)
+    window_start = datetime.now(timezone.utc) - timedelta(days=30)
+
+    async with session_factory() as session:
+        storage = PostgreSQLStorageService(session)
+        cases = {
+            "first page": lambda: storage.list_posts(PAGE_SIZE),
+            "page at 50% depth (cursor)": lambda: storage.list_posts(PAGE_SIZE, cursor=deep_cursor),
+            "filtered: approved, not posted": lambda: storage.list_posts(PAGE_SIZE, approved=True, is_posted=False),
+            "filtered: scheduled last 30d": lambda: storage.list_posts(PAGE_SIZE, scheduled_after=window_start),
+            "projected: id,approved,sched.": lambda: storage.list_posts(PAGE_SIZE, fields=["approved", "scheduled_at"]),
+        }
+        results = {}
+        if not skip_full:
+            samples = []
+            for _ in range(max(1, iterations // 20)):
+                start = time.perf_counter()
+                await storage.get_all_posts()
+                samples.append(time.perf_counter() - start)
+                session.expunge_all()
+            results["get_all_posts (old /posts)"] = summarize(samples)
+        for case, call in cases.items():
+            results[case] = summarize(await time_async(call, iterations, warmup=3))
+    print_report("GET /posts storage latency (microseconds)", results)
+    await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Top the post table up to this many rows")
+    parser.add_argument("--iterations", type=int, default=50, help="Timed iterations per paginated case")
+    parser.add_argument("--skip-full", action="store_true", help="Skip the unbounded get_all_posts baseline")
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.iterations, args.skip_full))
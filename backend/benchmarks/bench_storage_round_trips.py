@@ -0,0 +1,76 @@
+"""
+Counts the database round trips and measures the latency of one request's worth of
+`PostgreSQLStorageService` writes, including the commit `get_session` runs after the handler.
+
+A round trip is a statement, a BEGIN, a COMMIT or a ROLLBACK sent to the database (asyncpg
+sends BEGIN as its own round trip). The pool's pre-ping, if enabled, adds one per checkout
+and is not counted. Runs against the database in `DATABASE_URL`:
+
+    python -m benchmarks.bench_storage_round_trips
+"""
+import asyncio
+from .common import use_placeholder_settings, time_async, summarize, print_report
+
+use_placeholder_settings()
+
+import src.graphs  # noqa: E402,F401  (import order: graphs before services)
+from sqlalchemy import event  # noqa: E402
+from sqlmodel import SQLModel  # noqa: E402
+from src.core.database import async_session_factory, engine, get_session  # noqa: E402
+from src.api.models.models import SocialMediaAgent  # noqa: E402
+from src.api.services.postgresql_storage_service import PostgreSQLStorageService  # noqa: E402
+
+ITERATIONS = 200
+
+class RoundTripCounter:
+    def __init__(self):
+        self.count = 0
+        for name in ("before_cursor_execute", "begin", "commit", "rollback"):
+            event.listen(engine.sync_engine, name, self._count)
+
+    def _count(self, *args, **kwargs):
+        self.count += 1
+
+async def as_request(operation):
+    """
+    Runs `operation` with a storage service the way a request handler does, through `get_session`.
+    """
+    sessions = get_session()
+    session = await sessions.__anext__()
+    await operation(PostgreSQLStorageService(session))
+    try:
+        await sessions.__anext__()
+    except StopAsyncIteration:
+        pass
+
+async def main():
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    async with async_session_factory() as session:
+        agent = SocialMediaAgent(name="benchmark")
+        session.add(agent)
+        await session.commit()
+        agent_id = agent.id
+        [post] = await PostgreSQLStorageService(session).save_posts([("Benchmark post", agent_id)])
+        post_id = str(post.id)
+
+    cases = {
+        "save_post (/generate)": lambda storage: storage.save_post("Benchmark post", agent_id=agent_id),
+        "update_post (/approve)": lambda storage: storage.update_post(post_id, approved=True),
+        "update_post with agent": lambda storage: storage.update_post(post_id, approved=True, agent_id=agent_id),
+        "get_post (/post_now read)": lambda storage: storage.get_post(post_id),
+    }
+    counter = RoundTripCounter()
+    results = {}
+    for case, operation in cases.items():
+        counter.count = 0
+        await as_request(operation)
+        round_trips = counter.count
+        stats = summarize(await time_async(lambda: as_request(operation), ITERATIONS))
+        stats["round_trips"] = round_trips
+        results[case] = stats
+    print_report("Storage writes per request (microseconds, round trips)", results)
+    await engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,46 @@
+"""
+Measures the weighted-length counter and the grapheme/URL-safe truncation over a large
+synthetic corpus of tweets mixing ASCII copy, URLs, hashtags, emoji sequences, accented
+Latin and CJK text.
+"""
+import random
+import time
+from .common import use_placeholder_settings
+
+use_placeholder_settings()
+
+from src.core.twitter_text import weighted_length, truncate  # noqa: E402
+
+CORPUS_SIZE = 100_000
+WORDS = ["new", "drop", "shop", "today", "limited", "stock", "sneakers", "winter", "collection", "deal", "free", "shipping"]
+EXTRAS = [
+    "https://example.com/products/winter-sale?utm_source=twitter", "shop.example.io/deal", "#WinterSale", "#NewIn",
+    "🎉", "🔥", "👍🏽", "👨‍👩‍👧", "🇺🇸", "1️⃣", "café", "naïve", "新品", "限定セール", "特价",
+]
+
+def build_corpus(size: int):
+    rng = random.Random(42)
+    corpus = []
+    for _ in range(size):
+        tokens = [rng.choice(WORDS) if rng.random() < 0.8 else rng.choice(EXTRAS) for _ in range(rng.randint(10, 70))]
+        corpus.append(" ".join(tokens))
+    return corpus
+
+def run(label: str, func, corpus):
+    start = time.perf_counter()
+    for tweet in corpus:
+        func(tweet)
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<28} {elapsed * 1e6 / len(corpus):8.2f} us/tweet  {len(corpus) / elapsed:12,.0f} tweets/s")
+
+def main():
+    corpus = build_corpus(CORPUS_SIZE)
+    over_limit = sum(weighted_length(tweet) > 280 for tweet in corpus)
+    print(f"Corpus: {len(corpus):,} tweets, {over_limit:,} over 280 weighted chars")
+    run("len() (baseline)", len, corpus)
+    run("weighted_length()", weighted_length, corpus)
+    run("truncate() (mixed corpus)", truncate, corpus)
+    run("truncate() (over limit only)", truncate, [tweet for tweet in corpus if weighted_length(tweet) > 280])
+
+if __name__ == "__main__":
+    main()
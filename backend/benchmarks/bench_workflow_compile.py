@@ -0,0 +1,35 @@
+"""
+Compares per-request latency of building and compiling the content workflow on every call
+against invoking the workflow compiled once by the registry. The Gemini call is replaced by
+a constant so only langgraph overhead is measured.
+"""
+import asyncio
+from .common import use_placeholder_settings, time_async, summarize, print_report
+
+use_placeholder_settings()
+
+from src.graphs import nodes, workflow  # noqa: E402
+
+ITERATIONS = 500
+
+async def fake_generate_content(prompt: str) -> str:
+    return f"Benchmark tweet about {prompt} #bench"
+
+async def per_request_compile():
+    app = workflow.build_default_workflow().compile()
+    await app.ainvoke({"prompt": "sneakers", "content": None, "error": None})
+
+async def precompiled():
+    await workflow.generate_content_workflow("sneakers")
+
+async def main():
+    nodes.generate_content = fake_generate_content
+    workflow.compile_workflows()
+    results = {
+        "compile per request": summarize(await time_async(per_request_compile, ITERATIONS)),
+        "registry (compiled once)": summarize(await time_async(precompiled, ITERATIONS)),
+    }
+    print_report(f"Content workflow latency over {ITERATIONS} invocations", results)
+
+if __name__ == "__main__":
+    asyncio.run(main())
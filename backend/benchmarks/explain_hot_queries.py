@@ -0,0 +1,91 @@
+"""
+Checks with EXPLAIN that the scheduler, dispatcher, outbox, listing and metrics hot queries use the
+indexes declared on the models. Exits with status 1 if any of them does not.
+
+The queries are captured from the real service methods, so the check follows their
+shape. Runs against the database in `DATABASE_URL` (PostgreSQL or SQLite):
+
+    python -m benchmarks.explain_hot_queries
+
+On PostgreSQL sequential scans are disabled for the check, so the result does not depend on
+the table size or statistics, only on whether a matching index is usable.
+"""
+import asyncio
+import json
+import sys
+from datetime import datetime, timedelta, timezone
+from .common import use_placeholder_settings
+
+use_placeholder_settings()
+
+import src.graphs  # noqa: E402,F401  (import order: graphs before services)
+from sqlalchemy import event  # noqa: E402
+from sqlmodel import SQLModel, select  # noqa: E402
+from src.core.database import async_session_factory as session_factory, engine  # noqa: E402
+from src.api.models.post import Post  # noqa: E402
+from src.api.services import publish_outbox, scheduling_service  # noqa: E402
+from src.api.services.metrics_collector import metrics_collector  # noqa: E402
+from src.api.services.postgresql_storage_service import PostgreSQLStorageService  # noqa: E402
+
+async def capture(run) -> list:
+    """
+    Runs a coroutine factory and returns the (statement, parameters) it sent to the database.
+    """
+    captured = []
+    def listener(conn, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters))
+    event.listen(engine.sync_engine, "before_cursor_execute", listener)
+    try:
+        await run()
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", listener)
+    return captured
+
+async def explain(statement: str, parameters) -> str:
+    async with engine.connect() as conn:
+        if engine.dialect.name == "postgresql":
+            await conn.exec_driver_sql("SET enable_seqscan = off")
+            result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+            return json.dumps(result.scalar())
+        result = await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        return "\n".join(str(row[-1]) for row in result.all())
+
+async def main() -> int:
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    now = datetime.now(timezone.utc)
+
+    async def claim_query():
+        # The SELECT ... FOR UPDATE SKIP LOCKED part of `claim_due_posts`, without claiming anything
+        async with session_factory() as session:
+            await session.execute(
+                select(Post.id).where(*scheduling_service._claimable(now)).order_by(Post.scheduled_at).limit(50)
+            )
+
+    async def listing(**filters):
+        async with session_factory() as session:
+            await PostgreSQLStorageService(session).list_posts(100, **filters)
+
+    checks = {
+        "scheduler: claim due posts": (claim_query, "ix_post_pending_scheduled_at"),
+        "dispatcher: load upcoming posts": (scheduling_service.load_upcoming_posts, "ix_post_pending_scheduled_at"),
+        "outbox: pending retries": (lambda: publish_outbox.pending_retries(now + timedelta(days=1)), "ix_publish_attempt_pending_next_retry_at"),
+        "listing: first page": (lambda: listing(), "ix_post_created_at_id"),
+        "listing: agent page": (lambda: listing(agent_id=1), "ix_post_agent_id_created_at_id"),
+        "metrics: tweets to collect": (lambda: metrics_collector._published_tweets(now), "ix_publish_attempt_sent_updated_at"),
+        "metrics: collected recently": (lambda: metrics_collector._collected_recently(now), "ix_post_metric_snapshot_collected_at"),
+    }
+
+    failures = 0
+    for name, (run, index) in checks.items():
+        plans = [await explain(statement, parameters) for statement, parameters in await capture(run)]
+        used = any(index in plan for plan in plans)
+        failures += not used
+        print(f"  {'OK  ' if used else 'FAIL'} {name:<34} expects {index}")
+        if not used:
+            print("\n".join(f"       {line}" for plan in plans for line in plan.splitlines()))
+    await engine.dispose()
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,59 @@
+"""
+Minimal keep-alive HTTP/1.1 server used as a local stand-in for the Gemini and Twitter APIs.
+It counts accepted TCP connections so benchmarks can show connection reuse.
+"""
+import asyncio
+import json
+from typing import Optional
+
+GEMINI_RESPONSE = {"candidates": [{"content": {"parts": [{"text": "Mock tweet from the local upstream #bench"}]}}]}
+
+class MockUpstream:
+    def __init__(self, body: Optional[dict] = None, delay: float = 0.0):
+        self.body = json.dumps(body or GEMINI_RESPONSE).encode()
+        self.delay = delay
+        self.connections = 0
+        self.requests = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}/v1/generate"
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+
+    async def close(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    def reset(self):
+        self.connections = 0
+        self.requests = 0
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.decode("latin-1").split("\r\n"):
+                    name, _, value = line.partition(":")
+                    if name.lower() == "content-length":
+                        length = int(value)
+                if length:
+                    await reader.readexactly(length)
+                self.requests += 1
+                if self.delay:
+                    await asyncio.sleep(self.delay)
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nConnection: keep-alive\r\n"
+                    + f"Content-Length: {len(self.body)}\r\n\r\n".encode()
+                    + self.body
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
@@ -0,0 +1,44 @@
+import asyncio
+from sqlalchemy import inspect
+from sqlmodel import SQLModel
+from src.core.database import engine
+import src.api.models  # noqa: F401  (register tables on the metadata)
+
+def add_missing_columns(sync_conn, table):
+    """
+    Adds the nullable columns declared on a model that its existing table lacks, e.g. the
+    publishing lease columns `post.claimed_by` and `post.lease_expires_at`.
+    """
+    existing = {column["name"] for column in inspect(sync_conn).get_columns(table.name)}
+    for column in table.columns:
+        if column.name in existing:
+            continue
+        if not column.nullable:
+            raise RuntimeError(f"Cannot add NOT NULL column {table.name}.{column.name} to an existing table")
+        column_type = column.type.compile(dialect=sync_conn.dialect)
+        sync_conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}")
+        print(f"Column {table.name}.{column.name} added.")
+
+async def create_indexes():
+    """
+    Brings a database created by `create_all` before migrations were introduced up to the
+    current models: creates missing tables, adds missing nullable columns and creates any
+    missing indexes. Migrated databases get all of this from `alembic upgrade head`; this is
+    only needed before stamping such a database with `alembic stamp head`.
+    """
+    print("Creating missing tables, columns and indexes...")
+    async with engine.begin() as conn:
+        existing = set(await conn.run_sync(lambda sync_conn: inspect(sync_conn).get_table_names()))
+        for table in SQLModel.metadata.sorted_tables:
+            if table.name not in existing:
+                await conn.run_sync(table.create)
+                print(f"Table {table.name} created.")
+                continue
+            await conn.run_sync(add_missing_columns, table)
+            for index in sorted(table.indexes, key=lambda index: index.name):
+                await conn.run_sync(lambda sync_conn: index.create(sync_conn, checkfirst=True))
+                print(f"Index {index.name} ready.")
+    print("Schema update complete.")
+
+if __name__ == "__main__":
+    asyncio.run(create_indexes())
@@ -1,22 +1,29 @@
 import asyncio
+from alembic import command
 from sqlmodel import SQLModel
 from src.core.database import engine
-from src.api.models.post import Post
-from src.api.models.models import SocialMediaAgent
+from src.core.migrations import alembic_config
+import src.api.models  # noqa: F401  (register tables on the metadata)
 
-async def reset_database():
+async def drop_tables():
     """
-    Drops and recreates all tables in the database.
+    Drops all tables in the database, including the migration version table.
     """
-    print("Resetting database...")
     async with engine.begin() as conn:
-        # Drop all tables
         await conn.run_sync(SQLModel.metadata.drop_all)
-        print("Tables dropped.")
-        # Create all tables
-        await conn.run_sync(SQLModel.metadata.create_all)
-        print("Tables created.")
+        await conn.exec_driver_sql("DROP TABLE IF EXISTS alembic_version")
+    await engine.dispose()
+
+def reset_database():
+    """
+    Drops all tables and recreates them by running the migrations.
+    """
+    print("Resetting database...")
+    asyncio.run(drop_tables())
+    print("Tables dropped.")
+    command.upgrade(alembic_config(), "head")
+    print("Tables created.")
     print("Database reset complete.")
 
 if __name__ == "__main__":
-    asyncio.run(reset_database())
+    reset_database()
@@ -1,16 +1,83 @@
-from fastapi import APIRouter, Depends
-from typing import List, Dict
+from fastapi import APIRouter, HTTPException, Query, Request, Response, status
+from typing import Any, Awaitable, Callable, List, Dict
+from ...api.models.post_metric_snapshot import METRICS
+from ...api.services.analytics_cache import analytics_cache
 from ...api.services.postgresql_storage_service import PostgreSQLStorageService
-from ...core.logging import logger
-from ..dependencies import get_storage_service
+from ...core.config import settings
+from ...core.database import async_session_factory
+from ..exceptions import DatabaseOperationException
 
 router = APIRouter()
 
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+async def _cached(
+    request: Request,
+    response: Response,
+    key: str,
+    compute: Callable[[PostgreSQLStorageService], Awaitable[Any]],
+) -> Any:
+    """
+    Serves an aggregate from `analytics_cache`, computing it with a fresh session on a miss.
+
+    Sets `ETag` and `Cache-Control` on the response, and answers 304 Not Modified when the
+    client's `If-None-Match` already holds the current ETag.
+    """
+    async def load():
+        async with async_session_factory() as session:
+            return await compute(PostgreSQLStorageService(session))
+
+    try:
+        value, etag = await analytics_cache.get(key, load)
+    except DatabaseOperationException as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    headers = {"ETag": etag, "Cache-Control": f"private, max-age={settings.ANALYTICS_CACHE_MAX_AGE_SECONDS}"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return value
+
 @router.get("/metrics", response_model=List[Dict])
-async def get_metrics(storage: PostgreSQLStorageService = Depends(get_storage_service)):
+async def get_metrics(request: Request, response: Response):
+    """
+    Retrieves the latest collected engagement metrics of every published post.
+    """
+    return await _cached(request, response, "metrics", lambda storage: storage.get_metrics())
+
+@router.get("/summary", response_model=Dict)
+async def get_summary(request: Request, response: Response):
+    """
+    Retrieves post counts by state and engagement totals over all published posts.
+    """
+    return await _cached(request, response, "summary", lambda storage: storage.analytics_summary())
+
+@router.get("/agents", response_model=List[Dict])
+async def get_agents(request: Request, response: Response):
+    """
+    Retrieves post counts and engagement totals per social media agent.
+    """
+    return await _cached(request, response, "agents", lambda storage: storage.analytics_by_agent())
+
+@router.get("/daily", response_model=List[Dict])
+async def get_daily(request: Request, response: Response, days: int = Query(30, ge=1, le=365)):
+    """
+    Retrieves the number of posts published per day over the last `days` days, with their engagement totals.
+    """
+    return await _cached(request, response, f"daily:{days}", lambda storage: storage.analytics_daily(days))
+
+@router.get("/top", response_model=List[Dict])
+async def get_top_posts(
+    request: Request,
+    response: Response,
+    metric: str = Query("likes", description=f"One of: {', '.join(METRICS)}"),
+    limit: int = Query(10, ge=1, le=100),
+):
     """
-    Retrieves mock engagement metrics for all posts.
+    Retrieves the published posts with the highest latest value of an engagement metric.
     """
-    metrics = await storage.get_metrics()
-    logger.info(f"Retrieved metrics for {len(metrics)} posts")
-    return metrics
\ No newline at end of file
+    if metric not in METRICS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown metric '{metric}', expected one of: {', '.join(METRICS)}")
+    return await _cached(request, response, f"top:{metric}:{limit}", lambda storage: storage.top_posts(metric, limit))
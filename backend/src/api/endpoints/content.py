@@ -1,42 +1,251 @@
-from fastapi import APIRouter, HTTPException, Depends, status
+import asyncio
+import json
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
 from pydantic import BaseModel, Field
 from datetime import datetime
-from ...api.services.postgresql_storage_service import PostgreSQLStorageService
-from ...graphs import generate_content_workflow
-from ...core.logging import logger
+from uuid import UUID
+from ...api.services.postgresql_storage_service import PostgreSQLStorageService, POST_LIST_FIELDS
+from ...graphs import generate_content_workflow, generate_candidates_workflow, generate_content_batch, repair_content_workflow
+from ...api.services.gemini_service import generate_content_stream
+from ...api.services.scheduling_service import post_dispatcher
+from ...api.services.generation_jobs import generation_job_queue
+from ...core.config import settings
+from ...core.logging import get_logger
 from ...api.models.post import Post
+from ...api.models.generation_job import GenerationJob, JOB_FINISHED
 from ..dependencies import get_storage_service
-from ..exceptions import PostNotFoundException, DatabaseOperationException
+from ..exceptions import (
+    PostNotFoundException, DatabaseOperationException, AgentNotFoundException, ContentGenerationFailedException,
+    JobNotFoundException, JobQueueFullException,
+)
+
+logger = get_logger(__name__)
 
 router = APIRouter()
 
 class PromptRequest(BaseModel):
     prompt: str
     agent_id: Optional[int] = Field(default=None)
+    bypass_cache: bool = Field(default=False)
+    candidate_count: int = Field(default=1, ge=1, le=8)
+
+class BatchPromptRequest(BaseModel):
+    prompts: List[PromptRequest] = Field(min_length=1, max_length=settings.GENERATION_BATCH_MAX_SIZE)
+
+class BatchItemResult(BaseModel):
+    index: int
+    success: bool
+    post: Optional[Post] = None
+    error: Optional[str] = None
+
+class CandidateResult(BaseModel):
+    content: str
+    valid: bool
+    score: float
+
+class CandidatesResponse(BaseModel):
+    post: Post
+    candidates: List[CandidateResult]
 
 class ApproveRequest(BaseModel):
     scheduled_at: Optional[datetime] = None
 
+class JobResponse(BaseModel):
+    """
+    A generation job; `post` is set once it has succeeded and `error` once it has failed.
+    """
+    id: UUID
+    status: str
+    prompt: str
+    agent_id: Optional[int] = None
+    attempt_count: int
+    post: Optional[Post] = None
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
+def _job_response(job: GenerationJob, post: Optional[Post] = None) -> JobResponse:
+    return JobResponse(
+        id=job.id, status=job.status, prompt=job.prompt, agent_id=job.agent_id, attempt_count=job.attempt_count,
+        post=post, error=job.error, created_at=job.created_at, updated_at=job.updated_at,
+    )
+
+class PostListItem(BaseModel):
+    """
+    A post in the `/posts` listing; fields left out by the `fields` projection are omitted.
+    """
+    id: UUID
+    content: Optional[str] = None
+    approved: Optional[bool] = None
+    scheduled_at: Optional[datetime] = None
+    is_posted: Optional[bool] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    agent_id: Optional[int] = None
+
 @router.post("/generate", response_model=Post)
 async def generate_post(request: PromptRequest, storage: PostgreSQLStorageService = Depends(get_storage_service)):
     """
     Generates a new social media post based on a user prompt.
     The post is saved in an unapproved and unscheduled state.
     """
-    logger.info(f"Generating post for prompt: {request.prompt}")
+    logger.info("Generating post for prompt: %s", request.prompt)
     try:
-        content = await generate_content_workflow(request.prompt)
-        post_id = await storage.save_post(content, agent_id=request.agent_id)
-        logger.info(f"Generated post ID: {post_id}")
-        # Return a Post object that is valid under the new schema
-        return Post(id=post_id, content=content, approved=False, is_posted=False, agent_id=request.agent_id)
-    except DatabaseOperationException as e:
+        content = await generate_content_workflow(request.prompt, bypass_cache=request.bypass_cache, candidate_count=request.candidate_count)
+        post = await storage.save_post(content, agent_id=request.agent_id)
+        logger.info("Generated post ID: %s", post.id)
+        return post
+    except (DatabaseOperationException, ContentGenerationFailedException, AgentNotFoundException) as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except Exception as e:
+        logger.error("Error generating post: %s", e)
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+@router.post("/generate/candidates", response_model=CandidatesResponse)
+async def generate_post_candidates(request: PromptRequest, storage: PostgreSQLStorageService = Depends(get_storage_service)):
+    """
+    Generates `candidate_count` candidates in a single Gemini call, saves the best valid one
+    as a new post, and returns it together with the full ranked candidate list.
+    """
+    logger.info("Generating %s candidates for prompt: %s", request.candidate_count, request.prompt)
+    try:
+        candidates = await generate_candidates_workflow(request.prompt, request.candidate_count, bypass_cache=request.bypass_cache)
+        content = candidates[0]["content"]
+        post = await storage.save_post(content, agent_id=request.agent_id)
+        logger.info("Generated post ID: %s from %s candidates", post.id, len(candidates))
+        return CandidatesResponse(post=post, candidates=[CandidateResult(**candidate) for candidate in candidates])
+    except (DatabaseOperationException, ContentGenerationFailedException, AgentNotFoundException) as e:
         raise HTTPException(status_code=e.status_code, detail=e.detail)
     except Exception as e:
-        logger.error(f"Error generating post: {str(e)}")
+        logger.error("Error generating post candidates: %s", e)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
+@router.post("/generate/batch", response_model=List[BatchItemResult])
+async def generate_posts_batch(request: BatchPromptRequest, storage: PostgreSQLStorageService = Depends(get_storage_service)):
+    """
+    Generates posts for many prompts concurrently and saves them with a single bulk insert.
+    Each item reports its own success or error; one failed prompt does not fail the batch.
+    """
+    logger.info("Generating batch of %s posts", len(request.prompts))
+    results = [BatchItemResult(index=index, success=False) for index in range(len(request.prompts))]
+    try:
+        known_agents = await storage.get_existing_agent_ids({item.agent_id for item in request.prompts if item.agent_id})
+    except DatabaseOperationException as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+    pending = []
+    for index, item in enumerate(request.prompts):
+        if item.agent_id and item.agent_id not in known_agents:
+            results[index].error = AgentNotFoundException(agent_id=item.agent_id).detail
+        else:
+            pending.append(index)
+
+    generated = await generate_content_batch([
+        (request.prompts[index].prompt, request.prompts[index].bypass_cache, request.prompts[index].candidate_count)
+        for index in pending
+    ])
+    to_save = []
+    for index, outcome in zip(pending, generated):
+        # Cancelling the request raises from the gather above; a CancelledError here is one item's
+        if isinstance(outcome, BaseException):
+            if isinstance(outcome, asyncio.CancelledError):
+                results[index].error = "Generation was cancelled"
+            elif isinstance(outcome, Exception):
+                results[index].error = outcome.detail if isinstance(outcome, HTTPException) else str(outcome)
+            else:
+                raise outcome
+            logger.error("Error generating batch item %s: %s", index, results[index].error)
+        else:
+            to_save.append((index, outcome))
+
+    try:
+        posts = await storage.save_posts([(content, request.prompts[index].agent_id) for index, content in to_save])
+        for (index, _), post in zip(to_save, posts):
+            results[index].success = True
+            results[index].post = post
+    except DatabaseOperationException as e:
+        for index, _ in to_save:
+            results[index].error = e.detail
+
+    logger.info("Generated %s/%s posts in batch", sum(result.success for result in results), len(results))
+    return results
+
+def _sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@router.post("/generate/stream")
+async def generate_post_stream(request: PromptRequest, storage: PostgreSQLStorageService = Depends(get_storage_service)):
+    """
+    Generates a new post and streams it to the client as Server-Sent Events.
+
+    Emits a `token` event for every chunk received from Gemini, then validates the post,
+    repairing an over-length draft like `/generate` does, saves it and emits a final `done`
+    event with the post ID and saved content, or an `error` event on failure.
+    """
+    logger.info("Streaming post generation for prompt: %s", request.prompt)
+
+    async def event_stream():
+        chunks = []
+        try:
+            async for chunk in generate_content_stream(request.prompt, bypass_cache=request.bypass_cache):
+                chunks.append(chunk)
+                yield _sse_event("token", {"text": chunk})
+            content = await repair_content_workflow(request.prompt, "".join(chunks), bypass_cache=request.bypass_cache)
+            post = await storage.save_post(content, agent_id=request.agent_id)
+            logger.info("Generated post ID: %s", post.id)
+            yield _sse_event("done", {"post_id": str(post.id), "content": post.content})
+        except HTTPException as e:
+            logger.error("Error streaming post: %s", e.detail)
+            yield _sse_event("error", {"detail": e.detail})
+        except Exception as e:
+            logger.error("Error streaming post: %s", e)
+            yield _sse_event("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.post("/jobs", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_generation_job(request: PromptRequest, http_request: Request, response: Response):
+    """
+    Queues the generation of a new post and returns right away with the job.
+
+    The job is generated in the background; poll `GET /jobs/{job_id}` (its URL is in the
+    `Location` header) for the post.
+    """
+    try:
+        job = await generation_job_queue.submit(
+            request.prompt, agent_id=request.agent_id, bypass_cache=request.bypass_cache, candidate_count=request.candidate_count,
+        )
+    except (JobQueueFullException, AgentNotFoundException, DatabaseOperationException) as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail, headers=e.headers)
+    response.headers["Location"] = str(http_request.url_for("get_generation_job", job_id=str(job.id)))
+    return _job_response(job)
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_generation_job(
+    job_id: str,
+    response: Response,
+    wait: float = Query(0, ge=0, le=settings.GENERATION_JOB_MAX_WAIT_SECONDS, description="Seconds to wait for the job to finish"),
+):
+    """
+    Retrieves a generation job, with its post once it has succeeded.
+
+    With `wait`, the request is held until the job finishes or `wait` seconds pass. While
+    the job is unfinished a `Retry-After` header suggests when to poll again.
+    """
+    try:
+        job, post = await generation_job_queue.wait(job_id, wait)
+    except (JobNotFoundException, DatabaseOperationException) as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    if job.status not in JOB_FINISHED:
+        response.headers["Retry-After"] = str(max(1, round(settings.GENERATION_JOB_POLL_INTERVAL_SECONDS)))
+    return _job_response(job, post)
+
 @router.post("/approve/{post_id}")
 async def approve_post(post_id: str, request: ApproveRequest, storage: PostgreSQLStorageService = Depends(get_storage_service)):
     """
@@ -45,23 +254,49 @@ async def approve_post(post_id: str, request: ApproveRequest, storage: PostgreSQ
     try:
         await storage.update_post(post_id, approved=True, scheduled_at=request.scheduled_at)
         if request.scheduled_at:
-            logger.info(f"Approved and scheduled post ID: {post_id} for {request.scheduled_at}")
+            post_dispatcher.schedule(post_id, request.scheduled_at)
+            logger.info("Approved and scheduled post ID: %s for %s", post_id, request.scheduled_at)
         else:
-            logger.info(f"Approved post ID: {post_id}")
+            logger.info("Approved post ID: %s", post_id)
         return {"success": True}
     except PostNotFoundException as e:
         raise HTTPException(status_code=e.status_code, detail=e.detail)
     except DatabaseOperationException as e:
         raise HTTPException(status_code=e.status_code, detail=e.detail)
 
-@router.get("/posts", response_model=List[Post])
-async def get_posts(storage: PostgreSQLStorageService = Depends(get_storage_service)):
+@router.get("/posts", response_model=List[PostListItem], response_model_exclude_unset=True)
+async def get_posts(
+    response: Response,
+    limit: int = Query(settings.POSTS_PAGE_DEFAULT_LIMIT, ge=1, le=settings.POSTS_PAGE_MAX_LIMIT),
+    cursor: Optional[str] = Query(None, description="The X-Next-Cursor header of the previous page"),
+    approved: Optional[bool] = None,
+    is_posted: Optional[bool] = None,
+    agent_id: Optional[int] = None,
+    scheduled_after: Optional[datetime] = None,
+    scheduled_before: Optional[datetime] = None,
+    fields: Optional[str] = Query(None, description=f"Comma-separated fields to return, from: {', '.join(POST_LIST_FIELDS)}"),
+    storage: PostgreSQLStorageService = Depends(get_storage_service),
+):
     """
-    Retrieves all stored social media posts.
+    Retrieves stored social media posts, newest first, one page at a time.
+
+    The cursor of the next page is returned in the `X-Next-Cursor` header; it is absent on
+    the last page.
     """
+    field_list = [name.strip() for name in fields.split(",") if name.strip()] if fields else None
+    unknown = set(field_list or ()) - set(POST_LIST_FIELDS)
+    if unknown:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
     try:
-        posts = await storage.get_all_posts()
-        logger.info(f"Retrieved {len(posts)} posts")
-        return posts
+        posts, next_cursor = await storage.list_posts(
+            limit, cursor=cursor, approved=approved, is_posted=is_posted, agent_id=agent_id,
+            scheduled_after=scheduled_after, scheduled_before=scheduled_before, fields=field_list,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except DatabaseOperationException as e:
         raise HTTPException(status_code=e.status_code, detail=e.detail)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    logger.debug("Retrieved %s posts", len(posts))
+    return posts
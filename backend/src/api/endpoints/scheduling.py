@@ -1,16 +1,52 @@
-from fastapi import APIRouter, HTTPException, Depends, status
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends, Query, Request, Response, status
+from pydantic import BaseModel
 from ...api.services.postgresql_storage_service import PostgreSQLStorageService
-from ...api.services.twitter_service import schedule_post as post_to_twitter
-from ...core.logging import logger
+from ...api.services.publish_outbox import publish_post, get_attempt
+from ...api.services.resilience import deadline
+from ...api.models.publish_attempt import PUBLISH_SENT
+from ...core.config import settings
+from ...core.logging import get_logger
 from ..dependencies import get_storage_service
 from ..exceptions import PostNotFoundException, DatabaseOperationException, TwitterAPIException
 
+logger = get_logger(__name__)
+
 router = APIRouter()
 
+class PublishStatus(BaseModel):
+    post_id: str
+    status: str
+    attempt_count: int
+    last_error: Optional[str] = None
+    next_retry_at: Optional[datetime] = None
+    tweet_id: Optional[str] = None
+
+async def _publish_in_background(post_id: str, content: str):
+    try:
+        if await publish_post(post_id, content) is None:
+            logger.info("Background publish of post ID %s skipped: already sent or in progress", post_id)
+        else:
+            logger.info("Successfully posted post ID: %s", post_id)
+    except Exception as e:
+        logger.error("Background publish of post ID %s failed: %s", post_id, e)
+
 @router.post("/post_now/{post_id}")
-async def post_now(post_id: str, storage: PostgreSQLStorageService = Depends(get_storage_service)):
+async def post_now(
+    post_id: str,
+    request: Request,
+    response: Response,
+    background_tasks: BackgroundTasks,
+    background: bool = Query(False, description="Return 202 immediately and publish after the response is sent"),
+    storage: PostgreSQLStorageService = Depends(get_storage_service),
+):
     """
     Immediately posts an approved post to Twitter.
+
+    The request waits at most `POST_NOW_DEADLINE_SECONDS` for Twitter, including retries and
+    rate-limit waits. With `background=true` it returns 202 right away and the result can be
+    followed at `/publish_status/{post_id}`.
     """
     try:
         post = await storage.get_post(post_id)
@@ -23,17 +59,46 @@ async def post_now(post_id: str, storage: PostgreSQLStorageService = Depends(get
         if not post.content or not post.content.strip():
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Post content is empty")
 
-        logger.info(f"Attempting to post immediately: {post.id}")
-        await post_to_twitter(post.content)
-        await storage.update_post(post_id, is_posted=True)
-        logger.info(f"Successfully posted post ID: {post_id}")
-        return {"success": True, "message": "Post sent to Twitter successfully."}
+        if background:
+            background_tasks.add_task(_publish_in_background, str(post.id), post.content)
+            response.status_code = status.HTTP_202_ACCEPTED
+            logger.info("Queued post ID %s for publishing in the background", post_id)
+            return {"success": True, "message": "Post queued for publishing.", "status_url": str(request.url_for("get_publish_status", post_id=str(post.id)))}
+
+        logger.info("Attempting to post immediately: %s", post.id)
+        with deadline(settings.POST_NOW_DEADLINE_SECONDS):
+            attempt = await publish_post(str(post.id), post.content)
+        if attempt is None:
+            # Another request sent the post since it was read above, or is still sending it
+            attempt = await get_attempt(str(post.id))
+            if attempt is not None and attempt.status == PUBLISH_SENT:
+                logger.info("Post ID %s was already sent to Twitter", post_id)
+                return {"success": True, "message": "Post was already sent to Twitter.", "tweet_id": attempt.tweet_id}
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Post is already being published")
+        logger.info("Successfully posted post ID: %s", post_id)
+        return {"success": True, "message": "Post sent to Twitter successfully.", "tweet_id": attempt.tweet_id}
     except PostNotFoundException as e:
         raise HTTPException(status_code=e.status_code, detail=e.detail)
     except TwitterAPIException as e:
         raise HTTPException(status_code=e.status_code, detail=e.detail)
     except DatabaseOperationException as e:
         raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error posting post now: {str(e)}")
+        logger.error("Error posting post now: %s", e)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.get("/publish_status/{post_id}", response_model=PublishStatus)
+async def get_publish_status(post_id: str):
+    """
+    Retrieves the outbox record of a post's publication to Twitter.
+    """
+    attempt = await get_attempt(post_id)
+    if attempt is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"No publish attempt for post with ID {post_id}")
+    return PublishStatus(
+        post_id=str(attempt.post_id), status=attempt.status, attempt_count=attempt.attempt_count,
+        last_error=attempt.last_error, next_retry_at=attempt.next_retry_at, tweet_id=attempt.tweet_id,
+    )
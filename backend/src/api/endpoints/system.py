@@ -0,0 +1,41 @@
+from fastapi import APIRouter, HTTPException, Response, status
+from typing import Dict
+from ...api.services.generation_cache import generation_cache
+from ...api.services.gemini_service import generation_flight
+from ...api.services.rate_limiter import twitter_rate_limiter
+from ...api.services import resilience
+from ...api.services.scheduling_service import publishing_executor
+from ...api.services.metrics_collector import metrics_collector
+from ...api.services.analytics_cache import analytics_cache
+from ...api.services.generation_jobs import generation_job_queue
+from ...core.database import pool_stats
+from ...core.instrumentation import instrumentation
+
+router = APIRouter()
+
+@router.get("/stats", response_model=Dict)
+async def get_stats():
+    """
+    Retrieves runtime counters for the generation and publishing pipelines and the database pool.
+    """
+    return {
+        "generation_cache": await generation_cache.stats(),
+        "generation_coalescing": generation_flight.stats(),
+        "publishing": publishing_executor.stats(),
+        "twitter_rate_limit": twitter_rate_limiter.stats(),
+        "circuit_breakers": resilience.stats(),
+        "metrics_collector": metrics_collector.stats(),
+        "analytics_cache": analytics_cache.stats(),
+        "generation_jobs": generation_job_queue.stats(),
+        "database_pool": pool_stats(),
+    }
+@router.get("/metrics", response_class=Response)
+async def get_prometheus_metrics():
+    """
+    Exposes the stage latency histograms and counters in the Prometheus text format.
+    """
+    exposition = instrumentation.exposition()
+    if exposition is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Instrumentation is disabled")
+    body, content_type = exposition
+    return Response(content=body, media_type=content_type)
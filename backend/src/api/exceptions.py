@@ -34,3 +34,18 @@ class ContentGenerationFailedException(HTTPException):
             status_code=status_code,
             detail=detail
         )
+
+class JobNotFoundException(HTTPException):
+    def __init__(self, job_id: str):
+        super().__init__(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Generation job with ID {job_id} not found"
+        )
+
+class JobQueueFullException(HTTPException):
+    def __init__(self, retry_after: int):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many generation jobs are waiting, try again later",
+            headers={"Retry-After": str(retry_after)}
+        )
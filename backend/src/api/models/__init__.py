@@ -1,2 +1,6 @@
 from .models import SocialMediaAgent
-from .post import Post
\ No newline at end of file
+from .post import Post
+from .publish_attempt import PublishAttempt
+from .post_metric_snapshot import PostMetricSnapshot
+from .generation_job import GenerationJob
+from .job_lease import JobLease
@@ -0,0 +1,48 @@
+from typing import Optional
+from datetime import datetime
+from uuid import UUID, uuid4
+from sqlmodel import Field, SQLModel
+from sqlalchemy import Column, Index, func, text
+from sqlalchemy.dialects.postgresql import TIMESTAMP
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+# Jobs in these states have their final result
+JOB_FINISHED = (JOB_SUCCEEDED, JOB_FAILED)
+
+class GenerationJob(SQLModel, table=True):
+    """
+    A content generation request accepted by `POST /content/jobs` and run in the background.
+
+    A worker claims the job by moving it to running under a lease, runs the workflow without
+    holding a database connection, then saves the post and marks the job succeeded in one
+    transaction. A job whose worker died (its lease lapsed) is claimed again by another one.
+    """
+    __tablename__ = "generation_job"
+    __table_args__ = (
+        # Unfinished jobs, for recovering the ones whose worker died
+        Index(
+            "ix_generation_job_unfinished_created_at", "created_at",
+            postgresql_where=text("status IN ('queued', 'running')"),
+            sqlite_where=text("status IN ('queued', 'running')"),
+        ),
+        # Finished jobs past their retention
+        Index("ix_generation_job_updated_at", "updated_at"),
+    )
+
+    id: Optional[UUID] = Field(default_factory=uuid4, primary_key=True)
+    status: str = Field(default=JOB_QUEUED)
+    prompt: str
+    agent_id: Optional[int] = Field(default=None, foreign_key="socialmediaagent.id")
+    bypass_cache: bool = Field(default=False)
+    candidate_count: int = Field(default=1)
+    post_id: Optional[UUID] = Field(default=None, foreign_key="post.id")
+    error: Optional[str] = None
+    attempt_count: int = Field(default=0)
+    claimed_by: Optional[str] = Field(default=None)
+    lease_expires_at: Optional[datetime] = Field(default=None, sa_column=Column(TIMESTAMP(timezone=True)))
+    created_at: datetime = Field(default=None, sa_column=Column(TIMESTAMP(timezone=True), nullable=False, server_default=func.now()))
+    updated_at: datetime = Field(default=None, sa_column=Column(TIMESTAMP(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now()))
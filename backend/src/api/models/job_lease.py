@@ -0,0 +1,19 @@
+from typing import Optional
+from datetime import datetime
+from sqlmodel import Field, SQLModel
+from sqlalchemy import Column
+from sqlalchemy.dialects.postgresql import TIMESTAMP
+
+class JobLease(SQLModel, table=True):
+    """
+    Lease that lets one worker at a time run a periodic job, e.g. metrics collection.
+
+    A worker takes the lease in a short transaction, runs the job without holding a
+    database connection and then releases it. A lease whose worker died lapses at
+    `lease_expires_at` and can be taken by another one.
+    """
+    __tablename__ = "job_lease"
+
+    name: str = Field(primary_key=True)
+    claimed_by: Optional[str] = Field(default=None)
+    lease_expires_at: Optional[datetime] = Field(default=None, sa_column=Column(TIMESTAMP(timezone=True)))
@@ -2,10 +2,22 @@ from typing import Optional
 from datetime import datetime
 from uuid import UUID, uuid4
 from sqlmodel import Field, SQLModel, Relationship
-from sqlalchemy import Column, func
+from sqlalchemy import Column, Index, func, text
 from sqlalchemy.dialects.postgresql import TIMESTAMP
 
 class Post(SQLModel, table=True):
+    __table_args__ = (
+        # Due and upcoming scheduled posts (scheduler claims, dispatcher loads)
+        Index(
+            "ix_post_pending_scheduled_at", "scheduled_at",
+            postgresql_where=text("approved = true AND is_posted = false"),
+            sqlite_where=text("approved = 1 AND is_posted = 0"),
+        ),
+        # Keyset pagination of the /posts listing, overall and per agent
+        Index("ix_post_created_at_id", "created_at", "id"),
+        Index("ix_post_agent_id_created_at_id", "agent_id", "created_at", "id"),
+    )
+
     id: Optional[UUID] = Field(default_factory=uuid4, primary_key=True)
     content: str
     approved: bool = Field(default=False)
@@ -14,6 +26,10 @@ class Post(SQLModel, table=True):
     created_at: datetime = Field(default=None, sa_column=Column(TIMESTAMP(timezone=True), nullable=False, server_default=func.now()))
     updated_at: datetime = Field(default=None, sa_column=Column(TIMESTAMP(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now()))
 
+    # Publishing lease: the worker currently publishing this post and when its claim lapses
+    claimed_by: Optional[str] = Field(default=None)
+    lease_expires_at: Optional[datetime] = Field(default=None, sa_column=Column(TIMESTAMP(timezone=True)))
+
     # Foreign key to SocialMediaAgent
     agent_id: Optional[int] = Field(default=None, foreign_key="socialmediaagent.id")
     agent: Optional["SocialMediaAgent"] = Relationship(back_populates="posts")
@@ -0,0 +1,35 @@
+from typing import Optional
+from datetime import datetime
+from uuid import UUID
+from sqlmodel import Field, SQLModel
+from sqlalchemy import BigInteger, Column, Index, Integer
+from sqlalchemy.dialects.postgresql import TIMESTAMP
+
+# The engagement counters stored in each snapshot
+METRICS = ("impressions", "likes", "retweets", "replies", "quotes")
+
+class PostMetricSnapshot(SQLModel, table=True):
+    """
+    Engagement counters of a published post's tweet at one point in time.
+
+    The table is append-only: the metrics collector inserts one row per tweet and run and
+    rows are never updated, so they are laid out on disk in `collected_at` order. That keeps
+    the BRIN index on `collected_at` a few pages in size however many snapshots accumulate,
+    while time-range aggregations still skip every block outside the range.
+    """
+    __tablename__ = "post_metric_snapshot"
+    __table_args__ = (
+        # Time-range scans over the append-only history
+        Index("ix_post_metric_snapshot_collected_at", "collected_at", postgresql_using="brin"),
+        # Latest snapshot of each post
+        Index("ix_post_metric_snapshot_post_id_collected_at", "post_id", "collected_at"),
+    )
+
+    id: Optional[int] = Field(default=None, sa_column=Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True))
+    post_id: UUID = Field(foreign_key="post.id")
+    collected_at: datetime = Field(sa_column=Column(TIMESTAMP(timezone=True), nullable=False))
+    impressions: int = Field(default=0)
+    likes: int = Field(default=0)
+    retweets: int = Field(default=0)
+    replies: int = Field(default=0)
+    quotes: int = Field(default=0)
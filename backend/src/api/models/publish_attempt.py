@@ -0,0 +1,46 @@
+from typing import Optional
+from datetime import datetime
+from uuid import UUID
+from sqlmodel import Field, SQLModel
+from sqlalchemy import Column, Index, func, text
+from sqlalchemy.dialects.postgresql import TIMESTAMP
+
+PUBLISH_PENDING = "pending"
+PUBLISH_IN_PROGRESS = "in_progress"
+PUBLISH_SENT = "sent"
+PUBLISH_FAILED = "failed"
+
+class PublishAttempt(SQLModel, table=True):
+    """
+    Outbox row tracking the publication of one post to Twitter.
+
+    There is one row per post, identified by `idempotency_key`. The row is committed as
+    in progress before the tweet is sent and as sent (with the tweet ID) in the same
+    transaction that marks the post as posted.
+    """
+    __tablename__ = "publish_attempt"
+    __table_args__ = (
+        # Retries waiting to be loaded into the dispatcher
+        Index(
+            "ix_publish_attempt_pending_next_retry_at", "next_retry_at",
+            postgresql_where=text("status = 'pending'"),
+            sqlite_where=text("status = 'pending'"),
+        ),
+        # Recently published tweets whose engagement metrics are still collected
+        Index(
+            "ix_publish_attempt_sent_updated_at", "updated_at",
+            postgresql_where=text("status = 'sent'"),
+            sqlite_where=text("status = 'sent'"),
+        ),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    post_id: UUID = Field(foreign_key="post.id", index=True)
+    idempotency_key: str = Field(unique=True)
+    status: str = Field(default=PUBLISH_PENDING)
+    attempt_count: int = Field(default=0)
+    last_error: Optional[str] = None
+    next_retry_at: Optional[datetime] = Field(default=None, sa_column=Column(TIMESTAMP(timezone=True)))
+    tweet_id: Optional[str] = None
+    created_at: datetime = Field(default=None, sa_column=Column(TIMESTAMP(timezone=True), nullable=False, server_default=func.now()))
+    updated_at: datetime = Field(default=None, sa_column=Column(TIMESTAMP(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now()))
@@ -0,0 +1,90 @@
+import hashlib
+import json
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Tuple
+from fastapi.encoders import jsonable_encoder
+from ...core.config import settings
+from ...core.logging import get_logger
+from .single_flight import SingleFlight
+
+logger = get_logger(__name__)
+
+@dataclass
+class _Entry:
+    value: Any
+    etag: str
+    version: int
+    expires_at: float
+
+class AnalyticsCache:
+    """
+    Read-through cache of the analytics aggregates served to the dashboard.
+
+    Entries are tagged with the cache version. Writes that change the aggregates (new or
+    updated posts, published posts, collected metrics) call `invalidate`, which bumps the
+    version, so the next read recomputes. Concurrent misses for the same key share one
+    computation. The version is per process, so entries also expire after `ttl_seconds`
+    to pick up changes made by other workers.
+
+    Each entry carries an ETag derived from its content, which is identical on every worker
+    for the same data, so clients can revalidate against any of them.
+    """
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self.version = 0
+        self._entries: Dict[str, _Entry] = {}
+        self._flight = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    async def get(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Tuple[Any, str]:
+        """
+        Returns the cached value of a key and its ETag, computing and caching it on a miss.
+
+        Args:
+            key (str): Identifies the aggregate and its parameters.
+            compute (Callable[[], Awaitable[Any]]): Computes the aggregate from the database.
+
+        Returns:
+            Tuple[Any, str]: The JSON-compatible value and its quoted ETag.
+        """
+        entry = self._entries.get(key)
+        if entry is not None and entry.version == self.version and entry.expires_at > time.monotonic():
+            self.hits += 1
+            return entry.value, entry.etag
+        self.misses += 1
+        return await self._flight.do(f"{self.version}:{key}", lambda: self._fill(key, compute))
+
+    async def _fill(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Tuple[Any, str]:
+        version = self.version
+        value = jsonable_encoder(await compute())
+        body = json.dumps(value, sort_keys=True, separators=(",", ":")).encode("utf-8")
+        etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        # A write during the computation may have made the value stale; serve it but do not keep it
+        if version == self.version:
+            self._entries[key] = _Entry(value, etag, version, time.monotonic() + self.ttl_seconds)
+        return value, etag
+
+    def invalidate(self):
+        """
+        Drops every cached aggregate after a write that changes them.
+        """
+        self.version += 1
+        self.invalidations += 1
+        self._entries.clear()
+        logger.debug("Analytics cache invalidated (version %s)", self.version)
+
+    def stats(self) -> Dict:
+        """
+        Returns the hit/miss/invalidation counters and the number of cached aggregates.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "entries": len(self._entries),
+        }
+
+analytics_cache = AnalyticsCache(settings.ANALYTICS_CACHE_TTL_SECONDS)
@@ -1,60 +1,273 @@
+import json
 import httpx
 import asyncio
+import time
+from typing import AsyncIterator, List
+from fastapi import status
 from ...core.config import settings
-from ...core.logging import logger
-from ...graphs.prompt_template import GENERATE_TWEET_PROMPT
-from ..api_config import MAX_RETRIES, INITIAL_BACKOFF, GEMINI_API_URL
+from ...core.logging import get_logger
+from ...core.instrumentation import ERROR, OK, UPSTREAM, instrumentation
+from ...core.twitter_text import is_valid_tweet
+from ...graphs.prompt_template import GENERATE_TWEET_PROMPT, SHORTEN_TWEET_PROMPT
+from ..api_config import MAX_RETRIES, GEMINI_API_URL, GEMINI_STREAM_API_URL
+from .http_clients import http_clients
+from .generation_cache import generation_cache, make_cache_key
+from .single_flight import SingleFlight
+from .resilience import (
+    GEMINI, CircuitOpenError, backoff_delay, call_with_retries, circuit_breakers, is_transient,
+    is_upstream_failure, remaining_time, request_timeout,
+)
+from ..exceptions import ContentGenerationFailedException
 
-async def generate_content(prompt: str) -> str:
+logger = get_logger(__name__)
+
+# Shares one in-flight Gemini request between concurrent calls with the same cache key
+generation_flight = SingleFlight()
+
+def render_prompt(prompt: str) -> str:
+    """
+    Renders the full Gemini prompt for a user prompt using the configured brand settings.
+
+    Args:
+        prompt (str): The user's prompt or topic for content generation.
+
+    Returns:
+        str: The prompt text sent to Gemini.
+    """
+    return GENERATE_TWEET_PROMPT.format(
+        brand_name=settings.BRAND_NAME,
+        product_or_offer=prompt,
+        audience_description=settings.AUDIENCE_DESCRIPTION,
+        unique_benefit=settings.UNIQUE_BENEFIT,
+        cta=settings.CTA
+    )
+
+def render_shorten_prompt(content: str, max_chars: int) -> str:
+    """
+    Renders the compact prompt that asks Gemini to shorten an over-length draft.
+
+    Args:
+        content (str): The draft to shorten.
+        max_chars (int): The target maximum length.
+
+    Returns:
+        str: The prompt text sent to Gemini.
+    """
+    return SHORTEN_TWEET_PROMPT.format(max_chars=max_chars, content=content)
+
+async def generate_content(prompt: str, bypass_cache: bool = False) -> str:
     """
     Generates engaging social media content using the Gemini API.
 
+    Successful generations are cached by the rendered prompt and model URL, so repeated
+    prompts are answered from the cache without calling Gemini; empty drafts are not cached.
+    Concurrent calls for the same rendered prompt share a single Gemini request.
+
+    Args:
+        prompt (str): The user's prompt or topic for content generation.
+        bypass_cache (bool): If True, always call Gemini (the fresh result still refreshes the cache).
+
+    Returns:
+        str: The generated content suitable for a Twitter post.
+
+    Raises:
+        ContentGenerationFailedException: If the Gemini request fails after retries or returns an unexpected response.
+    """
+    return await _generate_text(prompt, render_prompt(prompt), bypass_cache)
+
+async def shorten_content(content: str, max_chars: int, bypass_cache: bool = False) -> str:
+    """
+    Asks Gemini to shorten an over-length draft, using a compact prompt instead of the full
+    generation prompt. Cached and coalesced like `generate_content`.
+
+    Args:
+        content (str): The draft to shorten.
+        max_chars (int): The target maximum length.
+        bypass_cache (bool): If True, always call Gemini (the fresh result still refreshes the cache).
+
+    Returns:
+        str: The shortened content.
+
+    Raises:
+        ContentGenerationFailedException: If the Gemini request fails after retries or returns an unexpected response.
+    """
+    return await _generate_text(f"shorten to {max_chars} chars", render_shorten_prompt(content, max_chars), bypass_cache)
+
+async def _generate_text(prompt: str, rendered_prompt: str, bypass_cache: bool) -> str:
+    cache_key = make_cache_key(rendered_prompt, GEMINI_API_URL)
+    if not bypass_cache:
+        cached = await generation_cache.get(cache_key)
+        if cached is not None:
+            logger.info("Generation cache hit for prompt: %s", prompt)
+            return cached
+
+    return await generation_flight.do(cache_key, lambda: _generate_and_cache(prompt, rendered_prompt, cache_key))
+
+async def _generate_and_cache(prompt: str, rendered_prompt: str, cache_key: str) -> str:
+    generated_text = (await _request_candidates(prompt, rendered_prompt, 1))[0]
+    # An empty draft fails validation; caching it would fail every retry of the prompt too
+    if generated_text.strip():
+        await generation_cache.set(cache_key, generated_text)
+    return generated_text
+
+async def generate_candidates(prompt: str, candidate_count: int, bypass_cache: bool = False) -> List[str]:
+    """
+    Generates several alternative posts for one prompt in a single Gemini call (`candidateCount`).
+
+    Results are cached and coalesced like `generate_content`, keyed separately per candidate count.
+    A result without any valid candidate is not cached.
+
     Args:
         prompt (str): The user's prompt or topic for content generation.
+        candidate_count (int): The number of candidates to request.
+        bypass_cache (bool): If True, always call Gemini (the fresh result still refreshes the cache).
 
     Returns:
-        str: The generated content suitable for a Twitter post, or an error message if generation fails.
-    """
-    async with httpx.AsyncClient() as client:
-        for attempt in range(MAX_RETRIES):
-            try:
-                url = GEMINI_API_URL
-                params = {"key": settings.GOOGLE_API_KEY}
-                json_data = {
-                    "contents": [{"parts": [{"text": GENERATE_TWEET_PROMPT.format(
-                        brand_name=settings.BRAND_NAME,
-                        product_or_offer=prompt,
-                        audience_description=settings.AUDIENCE_DESCRIPTION,
-                        unique_benefit=settings.UNIQUE_BENEFIT,
-                        cta=settings.CTA
-                    )}]}],
-                }
-                response = await client.post(url, params=params, json=json_data, timeout=settings.GEMINI_API_TIMEOUT)
+        List[str]: The generated candidates, in the order returned by Gemini.
+
+    Raises:
+        ContentGenerationFailedException: If the Gemini request fails after retries or returns an unexpected response.
+    """
+    rendered_prompt = render_prompt(prompt)
+    cache_key = make_cache_key(rendered_prompt, f"{GEMINI_API_URL}?candidateCount={candidate_count}")
+    if not bypass_cache:
+        cached = await generation_cache.get(cache_key)
+        if cached is not None:
+            logger.info("Generation cache hit for %s candidates for prompt: %s", candidate_count, prompt)
+            return json.loads(cached)
+
+    return await generation_flight.do(cache_key, lambda: _generate_candidates_and_cache(prompt, rendered_prompt, candidate_count, cache_key))
+
+async def _generate_candidates_and_cache(prompt: str, rendered_prompt: str, candidate_count: int, cache_key: str) -> List[str]:
+    candidates = await _request_candidates(prompt, rendered_prompt, candidate_count)
+    # Candidates are not repaired, so a set without a valid one fails ranking and is not cached
+    if any(is_valid_tweet(candidate.strip()) for candidate in candidates):
+        await generation_cache.set(cache_key, json.dumps(candidates))
+    return candidates
+
+def _api_error(e: Exception) -> ContentGenerationFailedException:
+    """
+    Maps a failed Gemini call to the exception raised to callers.
+    """
+    if isinstance(e, CircuitOpenError):
+        return ContentGenerationFailedException(detail=f"Gemini API temporarily unavailable: {e}", status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+    if isinstance(e, httpx.HTTPStatusError):
+        error_detail = f"Status: {e.response.status_code}, Response: {e.response.text}"
+    else:
+        error_detail = f"Request error: {e}"
+    logger.error("Gemini API request failed: %s", error_detail)
+    return ContentGenerationFailedException(detail=f"Failed to generate content due to API error: {error_detail}", status_code=status.HTTP_502_BAD_GATEWAY)
+
+async def _request_candidates(prompt: str, rendered_prompt: str, candidate_count: int) -> List[str]:
+    """
+    Sends a rendered prompt to Gemini, retrying transient failures, and returns the text of each candidate.
+    Candidates without text (e.g. blocked by safety filters) are skipped.
+    """
+    client = http_clients.gemini
+    params = {"key": settings.GOOGLE_API_KEY}
+    json_data = {
+        "contents": [{"parts": [{"text": rendered_prompt}]}],
+    }
+    if candidate_count > 1:
+        json_data["generationConfig"] = {"candidateCount": candidate_count}
+
+    async def attempt():
+        with instrumentation.timer(UPSTREAM, "gemini_generate"):
+            response = await client.post(GEMINI_API_URL, params=params, json=json_data, timeout=request_timeout(settings.GEMINI_API_TIMEOUT))
+            response.raise_for_status()
+            return response.json()
+
+    try:
+        body = await call_with_retries(GEMINI, attempt, MAX_RETRIES)
+        candidates = [
+            candidate["content"]["parts"][0]["text"]
+            for candidate in body["candidates"]
+            if candidate.get("content", {}).get("parts")
+        ]
+        if not candidates:
+            raise KeyError("text")
+    except (httpx.RequestError, httpx.HTTPStatusError, CircuitOpenError) as e:
+        raise _api_error(e)
+    except KeyError as e:
+        logger.error("Unexpected response format from Gemini API: %s", e)
+        raise ContentGenerationFailedException(detail="Failed to parse API response", status_code=status.HTTP_502_BAD_GATEWAY)
+    logger.info("Generated %s candidate(s) for prompt: %s", len(candidates), prompt)
+    return candidates
+
+async def generate_content_stream(prompt: str, bypass_cache: bool = False) -> AsyncIterator[str]:
+    """
+    Generates social media content with Gemini's streaming API, yielding text chunks as they arrive.
+
+    A cached generation for the same rendered prompt is yielded as a single chunk. Failed
+    connections are retried only until the first chunk has been received.
+
+    Args:
+        prompt (str): The user's prompt or topic for content generation.
+        bypass_cache (bool): If True, always call Gemini (the fresh result still refreshes the cache).
+
+    Yields:
+        str: The next chunk of generated text.
+
+    Raises:
+        ContentGenerationFailedException: If the Gemini request fails or the stream is malformed.
+    """
+    rendered_prompt = render_prompt(prompt)
+    cache_key = make_cache_key(rendered_prompt, GEMINI_API_URL)
+    if not bypass_cache:
+        cached = await generation_cache.get(cache_key)
+        if cached is not None:
+            logger.info("Generation cache hit for prompt: %s", prompt)
+            yield cached
+            return
+
+    client = http_clients.gemini
+    params = {"key": settings.GOOGLE_API_KEY, "alt": "sse"}
+    json_data = {"contents": [{"parts": [{"text": rendered_prompt}]}]}
+    chunks = []
+    breaker = circuit_breakers[GEMINI]
+    for attempt in range(MAX_RETRIES):
+        try:
+            breaker.before_call()
+            start = time.perf_counter()
+            async with client.stream("POST", GEMINI_STREAM_API_URL, params=params, json=json_data, timeout=request_timeout(settings.GEMINI_API_TIMEOUT)) as response:
+                # Time to the response headers; the rest of the stream is paced by the consumer
+                instrumentation.observe(UPSTREAM, "gemini_stream", time.perf_counter() - start, ERROR if response.is_error else OK)
+                if response.is_error:
+                    await response.aread()
                 response.raise_for_status()
-                generated_text = response.json()["candidates"][0]["content"]["parts"][0]["text"]
-                logger.info(f"Generated content for prompt: {prompt}")
-                return generated_text
-            except httpx.RequestError as e:
-                error_detail = f"Request error: {e}"
-                logger.warning(f"Gemini API request failed (attempt {attempt + 1}/{MAX_RETRIES}): {error_detail}")
-                if attempt < MAX_RETRIES - 1:
-                    sleep_time = INITIAL_BACKOFF * (2 ** attempt)
-                    logger.info(f"Retrying in {sleep_time} seconds...")
-                    await asyncio.sleep(sleep_time)
-                else:
-                    logger.error(f"Gemini API request failed after {MAX_RETRIES} attempts: {error_detail}")
-                    return "Failed to generate content due to API error"
-            except httpx.HTTPStatusError as e:
-                error_detail = f"Status: {e.response.status_code}, Response: {e.response.text}"
-                logger.warning(f"Gemini API request failed (attempt {attempt + 1}/{MAX_RETRIES}): {error_detail}")
-                if attempt < MAX_RETRIES - 1:
-                    sleep_time = INITIAL_BACKOFF * (2 ** attempt)
-                    logger.info(f"Retrying in {sleep_time} seconds...")
-                    await asyncio.sleep(sleep_time)
-                else:
-                    logger.error(f"Gemini API request failed after {MAX_RETRIES} attempts: {error_detail}")
-                    return "Failed to generate content due to API error"
-            except KeyError as e:
-                logger.error(f"Unexpected response format from Gemini API: {str(e)}")
-                return "Failed to parse API response"
-        return "Failed to generate content after multiple retries"
+                breaker.record_success()
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    event = json.loads(line[len("data:"):])
+                    for part in event["candidates"][0].get("content", {}).get("parts", []):
+                        if part.get("text"):
+                            chunks.append(part["text"])
+                            yield part["text"]
+            break
+        except CircuitOpenError as e:
+            raise _api_error(e)
+        except (httpx.RequestError, httpx.HTTPStatusError) as e:
+            if is_upstream_failure(e):
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            if chunks or not is_transient(e) or attempt == MAX_RETRIES - 1:
+                raise _api_error(e)
+            sleep_time = backoff_delay(attempt)
+            remaining = remaining_time()
+            if remaining is not None and sleep_time >= remaining:
+                raise _api_error(e)
+            logger.info("Gemini streaming request failed, retrying in %.2f seconds...", sleep_time)
+            await asyncio.sleep(sleep_time)
+        except (KeyError, IndexError, ValueError) as e:
+            logger.error("Unexpected streaming response format from Gemini API: %s", e)
+            raise ContentGenerationFailedException(detail="Failed to parse API response", status_code=status.HTTP_502_BAD_GATEWAY)
+        except asyncio.CancelledError:
+            breaker.record_skipped()
+            raise
+
+    generated_text = "".join(chunks)
+    logger.info("Streamed generated content for prompt: %s", prompt)
+    if generated_text.strip():
+        await generation_cache.set(cache_key, generated_text)
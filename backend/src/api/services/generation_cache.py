@@ -0,0 +1,200 @@
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from ...core.config import settings
+from ...core.logging import get_logger
+
+logger = get_logger(__name__)
+
+def make_cache_key(rendered_prompt: str, model_url: str) -> str:
+    """
+    Builds the content address of a generation request.
+
+    Args:
+        rendered_prompt (str): The fully rendered prompt sent to the model.
+        model_url (str): The model endpoint the prompt is sent to.
+
+    Returns:
+        str: A hex SHA-256 digest identifying the request.
+    """
+    return hashlib.sha256(f"{model_url}\n{rendered_prompt}".encode("utf-8")).hexdigest()
+
+class GenerationCache:
+    """
+    Base class for caches of generated content, keyed by `make_cache_key`.
+
+    Subclasses implement `_get`, `_set` and `_size`; this class keeps the hit/miss counters.
+    """
+    backend = "none"
+
+    def __init__(self, max_entries: int = 0, ttl_seconds: int = 0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> Optional[str]:
+        """
+        Returns the cached content for a key, or None if it is missing or expired.
+        """
+        value = await self._get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: str):
+        """
+        Stores content under a key, evicting the least recently used entries beyond `max_entries`.
+        """
+        await self._set(key, value)
+
+    async def close(self):
+        """
+        Releases any resources held by the cache.
+        """
+
+    async def stats(self) -> Dict:
+        """
+        Returns the cache backend, hit/miss counters and current number of entries.
+        """
+        return {"backend": self.backend, "hits": self.hits, "misses": self.misses, "entries": await self._size()}
+
+    async def _get(self, key: str) -> Optional[str]:
+        return None
+
+    async def _set(self, key: str, value: str):
+        pass
+
+    async def _size(self) -> int:
+        return 0
+
+class InMemoryGenerationCache(GenerationCache):
+    """
+    Process-local LRU cache with a per-entry TTL.
+    """
+    backend = "memory"
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        super().__init__(max_entries, ttl_seconds)
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+
+    async def _get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def _set(self, key: str, value: str):
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def _size(self) -> int:
+        return len(self._entries)
+
+class SQLiteGenerationCache(GenerationCache):
+    """
+    On-disk LRU cache backed by SQLite, so cached content survives restarts and is shared
+    by workers on the same host. Queries run in a thread to keep the event loop free, and
+    the database is opened on first use, in that thread.
+    """
+    backend = "sqlite"
+
+    def __init__(self, path: str, max_entries: int, ttl_seconds: int):
+        super().__init__(max_entries, ttl_seconds)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        # Called with the lock held
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS generation_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_generation_cache_accessed_at ON generation_cache (accessed_at)")
+            self._conn = conn
+        return self._conn
+
+    def _get_sync(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT value, expires_at FROM generation_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] < now:
+                conn.execute("DELETE FROM generation_cache WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE generation_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            return row[0]
+
+    def _set_sync(self, key: str, value: str):
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO generation_cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, now + self.ttl_seconds, now),
+            )
+            conn.execute("DELETE FROM generation_cache WHERE expires_at < ?", (now,))
+            conn.execute(
+                "DELETE FROM generation_cache WHERE key NOT IN "
+                "(SELECT key FROM generation_cache ORDER BY accessed_at DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+
+    def _size_sync(self) -> int:
+        with self._lock:
+            return self._connection().execute("SELECT COUNT(*) FROM generation_cache").fetchone()[0]
+
+    def _close_sync(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    async def _get(self, key: str) -> Optional[str]:
+        return await asyncio.to_thread(self._get_sync, key)
+
+    async def _set(self, key: str, value: str):
+        await asyncio.to_thread(self._set_sync, key, value)
+
+    async def _size(self) -> int:
+        return await asyncio.to_thread(self._size_sync)
+
+    async def close(self):
+        await asyncio.to_thread(self._close_sync)
+
+def create_generation_cache() -> GenerationCache:
+    """
+    Creates the generation cache selected by `GENERATION_CACHE_BACKEND` ("memory", "sqlite" or "none").
+    """
+    backend = settings.GENERATION_CACHE_BACKEND.lower()
+    if backend == "memory":
+        cache = InMemoryGenerationCache(settings.GENERATION_CACHE_MAX_ENTRIES, settings.GENERATION_CACHE_TTL_SECONDS)
+    elif backend == "sqlite":
+        cache = SQLiteGenerationCache(settings.GENERATION_CACHE_PATH, settings.GENERATION_CACHE_MAX_ENTRIES, settings.GENERATION_CACHE_TTL_SECONDS)
+    elif backend == "none":
+        cache = GenerationCache()
+    else:
+        raise ValueError(f"Unknown GENERATION_CACHE_BACKEND: {settings.GENERATION_CACHE_BACKEND}")
+    logger.info("Using '%s' generation cache", cache.backend)
+    return cache
+
+generation_cache = create_generation_cache()
@@ -0,0 +1,386 @@
+import asyncio
+import weakref
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Set, Tuple
+from uuid import UUID
+from fastapi import HTTPException
+from sqlalchemy import and_, delete, insert, or_, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlmodel import select
+from ...core.config import settings
+from ...core.database import async_session_factory
+from ...core.logging import get_logger
+from ...core.instrumentation import JOB, instrumentation
+from ...core.tracing import tracing
+from ...graphs import generate_content_workflow
+from ..models.generation_job import GenerationJob, JOB_QUEUED, JOB_RUNNING, JOB_SUCCEEDED, JOB_FAILED, JOB_FINISHED
+from ..models.post import Post
+from ..exceptions import AgentNotFoundException, DatabaseOperationException, JobNotFoundException, JobQueueFullException
+from .analytics_cache import analytics_cache
+from .leases import worker_id
+from .post_dispatcher import as_utc
+from .postgresql_storage_service import PostgreSQLStorageService, _is_foreign_key_violation
+
+logger = get_logger(__name__)
+
+# Retry-After sent with the 503 returned while the local backlog is full
+QUEUE_FULL_RETRY_AFTER_SECONDS = 5
+
+class GenerationJobQueue:
+    """
+    Runs content generation requests in the background, off the request path.
+
+    `submit` stores the job in `generation_job` and hands its ID to a local asyncio queue
+    drained by `workers` tasks. A worker claims the job (moves it to running under a lease
+    of `GENERATION_JOB_LEASE_SECONDS`), runs the generation workflow without holding a
+    database connection, then saves the post and marks the job succeeded in one transaction.
+
+    The table is the source of truth: a periodic recovery pass picks up jobs left queued or
+    running by a worker that stopped (its lease lapsed), in this process or another one, and
+    fails them after `GENERATION_JOB_MAX_ATTEMPTS` claims. It also deletes finished jobs
+    older than `GENERATION_JOB_RETENTION_HOURS`.
+    """
+    def __init__(self, workers: int, max_queued: int):
+        self.workers = workers
+        self.max_queued = max_queued
+        self._queue: asyncio.Queue = asyncio.Queue()
+        # Job IDs in the local queue, so recovery does not queue one twice
+        self._queued: Set[UUID] = set()
+        self._tasks: List[asyncio.Task] = []
+        # Set when a job finishes in this process; only alive while a `wait` call holds it
+        self._events: "weakref.WeakValueDictionary[UUID, asyncio.Event]" = weakref.WeakValueDictionary()
+        self.running = 0
+        self.submitted = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.recovered = 0
+        self.rejected = 0
+
+    async def start(self):
+        """
+        Starts the workers and the recovery pass, which first picks up the jobs left
+        unfinished by a previous run.
+        """
+        if self._tasks:
+            return
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._recover_periodically()))
+        logger.info("Started %s generation job workers", self.workers)
+
+    async def stop(self):
+        """
+        Cancels the workers. Jobs being generated are put back in the queued state, and jobs
+        still in the local queue stay queued, for the next run (or another process) to pick up.
+        """
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        self._queued.clear()
+
+    async def submit(self, prompt: str, agent_id: Optional[int] = None, bypass_cache: bool = False, candidate_count: int = 1) -> GenerationJob:
+        """
+        Stores a new generation job and queues it for the workers.
+
+        Args:
+            prompt (str): The prompt to generate the post from.
+            agent_id (Optional[int]): The ID of the social media agent the post belongs to.
+            bypass_cache (bool): Whether to skip the generation cache.
+            candidate_count (int): The number of candidates to generate and rank.
+
+        Returns:
+            GenerationJob: The queued job.
+
+        Raises:
+            JobQueueFullException: If `max_queued` jobs are already waiting in this process.
+            AgentNotFoundException: If `agent_id` does not belong to an existing agent.
+            DatabaseOperationException: If the job cannot be stored.
+        """
+        if self._queue.qsize() >= self.max_queued:
+            self.rejected += 1
+            raise JobQueueFullException(retry_after=QUEUE_FULL_RETRY_AFTER_SECONDS)
+        async with async_session_factory() as session:
+            if agent_id is not None and not await PostgreSQLStorageService(session).get_existing_agent_ids({agent_id}):
+                raise AgentNotFoundException(agent_id=agent_id)
+            try:
+                result = await session.execute(
+                    insert(GenerationJob).values(
+                        prompt=prompt, agent_id=agent_id, bypass_cache=bypass_cache, candidate_count=candidate_count,
+                    ).returning(GenerationJob)
+                )
+                job = result.scalar_one()
+                await session.commit()
+            except SQLAlchemyError as e:
+                await session.rollback()
+                raise DatabaseOperationException(detail=f"Failed to create generation job: {e}")
+        self.submitted += 1
+        self._enqueue(job.id)
+        logger.info("Queued generation job ID: %s", job.id)
+        return job
+
+    async def get(self, job_id: str) -> Tuple[GenerationJob, Optional[Post]]:
+        """
+        Retrieves a job and, once it has succeeded, its post.
+
+        Args:
+            job_id (str): The ID of the job.
+
+        Returns:
+            Tuple[GenerationJob, Optional[Post]]: The job and its post.
+
+        Raises:
+            JobNotFoundException: If no job has this ID.
+            DatabaseOperationException: If the job cannot be read.
+        """
+        try:
+            job_uuid = UUID(job_id)
+        except ValueError:
+            raise JobNotFoundException(job_id=job_id)
+        try:
+            async with async_session_factory() as session:
+                result = await session.execute(
+                    select(GenerationJob, Post)
+                    .outerjoin(Post, Post.id == GenerationJob.post_id)
+                    .where(GenerationJob.id == job_uuid)
+                )
+                row = result.first()
+        except SQLAlchemyError as e:
+            raise DatabaseOperationException(detail=f"Failed to retrieve generation job: {e}")
+        if row is None:
+            raise JobNotFoundException(job_id=job_id)
+        return row[0], row[1]
+
+    async def wait(self, job_id: str, timeout: float) -> Tuple[GenerationJob, Optional[Post]]:
+        """
+        Long-polls a job: returns as soon as it has finished, or after `timeout` seconds.
+
+        A job finished in this process wakes the caller right away; one finished by another
+        process is seen on the next read, every `GENERATION_JOB_POLL_INTERVAL_SECONDS`.
+
+        Args:
+            job_id (str): The ID of the job.
+            timeout (float): The longest time to wait, in seconds; 0 returns immediately.
+
+        Returns:
+            Tuple[GenerationJob, Optional[Post]]: The job and its post, as in `get`.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            job, post = await self.get(job_id)
+            remaining = deadline - loop.time()
+            if job.status in JOB_FINISHED or remaining <= 0:
+                return job, post
+            event = self._events.get(job.id)
+            if event is None:
+                event = self._events[job.id] = asyncio.Event()
+            try:
+                await asyncio.wait_for(event.wait(), min(remaining, settings.GENERATION_JOB_POLL_INTERVAL_SECONDS))
+            except asyncio.TimeoutError:
+                pass
+
+    def _enqueue(self, job_id: UUID):
+        if job_id not in self._queued:
+            self._queued.add(job_id)
+            self._queue.put_nowait(job_id)
+
+    def _notify(self, job_id: UUID):
+        # Popped before being set, so waiters that find the job unfinished wait on a new event
+        event = self._events.pop(job_id, None)
+        if event is not None:
+            event.set()
+
+    async def _work(self):
+        while True:
+            job_id = await self._queue.get()
+            self._queued.discard(job_id)
+            try:
+                await self._run(job_id)
+            except Exception as e:
+                # The job stays running until its lease lapses and recovery queues it again
+                logger.error("Error running generation job ID %s: %s", job_id, e)
+
+    async def _claim(self, job_id: UUID) -> Optional[GenerationJob]:
+        """
+        Moves a queued job, or a running one whose lease has lapsed, to running under this
+        worker's lease. Returns None if it is finished, leased by a live worker or out of attempts.
+        """
+        now = datetime.now(timezone.utc)
+        async with async_session_factory() as session:
+            result = await session.execute(
+                update(GenerationJob).where(
+                    GenerationJob.id == job_id,
+                    GenerationJob.attempt_count < settings.GENERATION_JOB_MAX_ATTEMPTS,
+                    or_(
+                        GenerationJob.status == JOB_QUEUED,
+                        and_(GenerationJob.status == JOB_RUNNING, GenerationJob.lease_expires_at < now),
+                    ),
+                )
+                .values(
+                    status=JOB_RUNNING, claimed_by=worker_id(), attempt_count=GenerationJob.attempt_count + 1,
+                    lease_expires_at=now + timedelta(seconds=settings.GENERATION_JOB_LEASE_SECONDS),
+                )
+                .returning(GenerationJob)
+            )
+            job = result.scalar_one_or_none()
+            await session.commit()
+        return job
+
+    async def _run(self, job_id: UUID):
+        job = await self._claim(job_id)
+        if job is None:
+            return
+        if job.attempt_count == 1:
+            instrumentation.observe(JOB, "queue_wait", (datetime.now(timezone.utc) - as_utc(job.created_at)).total_seconds())
+        self.running += 1
+        try:
+            with tracing.span("generation job", job_id=str(job.id), attempt=job.attempt_count):
+                content = await self._generate(job)
+        except asyncio.CancelledError:
+            await self._release(job.id)
+            raise
+        except Exception as e:
+            await self._fail(job.id, e.detail if isinstance(e, HTTPException) else str(e))
+        else:
+            await self._complete(job, content)
+        finally:
+            self.running -= 1
+            self._notify(job.id)
+
+    @instrumentation.timed(JOB, "generate")
+    async def _generate(self, job: GenerationJob) -> str:
+        return await generate_content_workflow(job.prompt, bypass_cache=job.bypass_cache, candidate_count=job.candidate_count)
+
+    async def _complete(self, job: GenerationJob, content: str):
+        """
+        Saves the post and marks the job succeeded in one transaction, unless the lease was
+        lost to another worker, which then saves its own post instead.
+        """
+        async with async_session_factory() as session:
+            try:
+                result = await session.execute(
+                    insert(Post).values(content=content, agent_id=job.agent_id).returning(Post.id)
+                )
+                post_id = result.scalar_one()
+                result = await session.execute(
+                    update(GenerationJob).where(
+                        GenerationJob.id == job.id, GenerationJob.status == JOB_RUNNING, GenerationJob.claimed_by == worker_id(),
+                    )
+                    .values(status=JOB_SUCCEEDED, post_id=post_id, claimed_by=None, lease_expires_at=None)
+                )
+                if result.rowcount == 0:
+                    await session.rollback()
+                    logger.info("Discarding result of generation job ID %s: claimed by another worker", job.id)
+                    return
+                await session.commit()
+            except IntegrityError as e:
+                await session.rollback()
+                if job.agent_id is not None and _is_foreign_key_violation(e):
+                    await self._fail(job.id, AgentNotFoundException(agent_id=job.agent_id).detail)
+                    return
+                raise
+        analytics_cache.invalidate()
+        self.succeeded += 1
+        logger.info("Generation job ID %s saved post ID: %s", job.id, post_id)
+
+    async def _fail(self, job_id: UUID, error: str):
+        async with async_session_factory() as session:
+            result = await session.execute(
+                update(GenerationJob).where(GenerationJob.id == job_id, GenerationJob.claimed_by == worker_id())
+                .values(status=JOB_FAILED, error=error, claimed_by=None, lease_expires_at=None)
+            )
+            await session.commit()
+        if result.rowcount:
+            self.failed += 1
+            logger.error("Generation job ID %s failed: %s", job_id, error)
+
+    async def _release(self, job_id: UUID):
+        # An interrupted attempt (shutdown) does not count towards GENERATION_JOB_MAX_ATTEMPTS
+        async with async_session_factory() as session:
+            await session.execute(
+                update(GenerationJob).where(
+                    GenerationJob.id == job_id, GenerationJob.status == JOB_RUNNING, GenerationJob.claimed_by == worker_id(),
+                )
+                .values(status=JOB_QUEUED, claimed_by=None, lease_expires_at=None, attempt_count=GenerationJob.attempt_count - 1)
+            )
+            await session.commit()
+
+    async def recover(self) -> int:
+        """
+        Fails jobs abandoned after their last attempt, deletes finished jobs past their
+        retention, and queues jobs left queued or running by a stopped worker.
+
+        Jobs still queued after `GENERATION_JOB_LEASE_SECONDS` are taken as well; if they
+        were only waiting in another process's queue, whichever worker claims them first runs them.
+
+        Returns:
+            int: The number of jobs queued.
+        """
+        now = datetime.now(timezone.utc)
+        room = self.max_queued - self._queue.qsize()
+        async with async_session_factory() as session:
+            abandoned = await session.execute(
+                update(GenerationJob).where(
+                    GenerationJob.status == JOB_RUNNING, GenerationJob.lease_expires_at < now,
+                    GenerationJob.attempt_count >= settings.GENERATION_JOB_MAX_ATTEMPTS,
+                )
+                .values(
+                    status=JOB_FAILED, claimed_by=None, lease_expires_at=None,
+                    error=f"Abandoned after {settings.GENERATION_JOB_MAX_ATTEMPTS} interrupted attempts",
+                )
+            )
+            await session.execute(
+                delete(GenerationJob).where(
+                    GenerationJob.status.in_(JOB_FINISHED),
+                    GenerationJob.updated_at < now - timedelta(hours=settings.GENERATION_JOB_RETENTION_HOURS),
+                )
+            )
+            stale = []
+            if room > 0:
+                result = await session.execute(
+                    select(GenerationJob.id).where(
+                        GenerationJob.status.in_((JOB_QUEUED, JOB_RUNNING)),
+                        or_(
+                            and_(GenerationJob.status == JOB_QUEUED,
+                                 GenerationJob.created_at < now - timedelta(seconds=settings.GENERATION_JOB_LEASE_SECONDS)),
+                            and_(GenerationJob.status == JOB_RUNNING, GenerationJob.lease_expires_at < now),
+                        ),
+                    )
+                    .order_by(GenerationJob.created_at).limit(room)
+                )
+                stale = [job_id for job_id in result.scalars().all() if job_id not in self._queued]
+            await session.commit()
+        self.failed += abandoned.rowcount
+        for job_id in stale:
+            self._enqueue(job_id)
+        self.recovered += len(stale)
+        if stale or abandoned.rowcount:
+            logger.info("Recovered %s generation jobs, abandoned %s", len(stale), abandoned.rowcount)
+        return len(stale)
+
+    async def _recover_periodically(self):
+        while True:
+            try:
+                await self.recover()
+            except Exception as e:
+                logger.error("An error occurred while recovering generation jobs: %s", e)
+            await asyncio.sleep(settings.GENERATION_JOB_RECOVER_INTERVAL_SECONDS)
+
+    def stats(self) -> Dict:
+        """
+        Returns the local backlog, busy workers, and submitted/succeeded/failed/recovered/rejected counters.
+        """
+        return {
+            "workers": self.workers,
+            "queued": self._queue.qsize(),
+            "running": self.running,
+            "submitted": self.submitted,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "recovered": self.recovered,
+            "rejected": self.rejected,
+        }
+
+generation_job_queue = GenerationJobQueue(settings.GENERATION_JOB_WORKERS, settings.GENERATION_JOB_QUEUE_MAX)
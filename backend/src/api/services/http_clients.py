@@ -0,0 +1,72 @@
+from typing import Optional
+import httpx
+from authlib.integrations.httpx_client import AsyncOAuth1Client
+from ...core.config import settings
+from ...core.logging import get_logger
+from ..api_config import get_twitter_oauth1_client
+
+logger = get_logger(__name__)
+
+class HTTPClientManager:
+    """
+    Owns one pooled, keep-alive HTTP client per upstream API.
+
+    The clients are opened in the application lifespan and shared by every request, so
+    calls reuse warm TCP/TLS connections instead of paying for a new handshake each time.
+    """
+    def __init__(self):
+        self._gemini: Optional[httpx.AsyncClient] = None
+        self._twitter: Optional[AsyncOAuth1Client] = None
+
+    @staticmethod
+    def _client_kwargs() -> dict:
+        return {
+            "http2": settings.HTTP2_ENABLED,
+            "limits": httpx.Limits(
+                max_connections=settings.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+            ),
+        }
+
+    async def start(self):
+        """
+        Opens the upstream clients. Safe to call more than once.
+        """
+        if self._gemini is None:
+            self._gemini = httpx.AsyncClient(**self._client_kwargs())
+        if self._twitter is None:
+            self._twitter = get_twitter_oauth1_client(**self._client_kwargs())
+        logger.info("HTTP clients started.")
+
+    async def close(self):
+        """
+        Closes the upstream clients and releases their pooled connections.
+        """
+        if self._gemini is not None:
+            await self._gemini.aclose()
+            self._gemini = None
+        if self._twitter is not None:
+            await self._twitter.aclose()
+            self._twitter = None
+        logger.info("HTTP clients closed.")
+
+    @property
+    def gemini(self) -> httpx.AsyncClient:
+        """
+        The shared client for the Gemini API. Created on first use if the manager was not started.
+        """
+        if self._gemini is None:
+            self._gemini = httpx.AsyncClient(**self._client_kwargs())
+        return self._gemini
+
+    @property
+    def twitter(self) -> AsyncOAuth1Client:
+        """
+        The shared OAuth1-signed client for the Twitter API. Created on first use if the manager was not started.
+        """
+        if self._twitter is None:
+            self._twitter = get_twitter_oauth1_client(**self._client_kwargs())
+        return self._twitter
+
+http_clients = HTTPClientManager()
@@ -0,0 +1,65 @@
+import os
+import socket
+from datetime import datetime, timedelta
+from sqlalchemy import or_, text, update
+from sqlalchemy.exc import IntegrityError
+from ...core.config import settings
+from ...core.database import async_session_factory, engine
+from ..models.job_lease import JobLease
+
+def worker_id() -> str:
+    """
+    Returns the identity this process claims posts and leases under: `WORKER_ID`, or host name and PID.
+    """
+    return settings.WORKER_ID or f"{socket.gethostname()}-{os.getpid()}"
+
+async def acquire_lease(name: str, now: datetime, duration: timedelta, lock_id: int) -> bool:
+    """
+    Takes the named job lease unless a live worker holds it, in one short transaction.
+
+    On PostgreSQL the claim runs under the transaction-level advisory lock `lock_id`, so a
+    worker arriving during another one's claim gives up at once instead of waiting for it.
+    No connection is held once this returns.
+
+    Args:
+        name (str): The job's name.
+        now (datetime): The current time.
+        duration (timedelta): How long the lease lasts unless released.
+        lock_id (int): The job's advisory lock key.
+
+    Returns:
+        bool: True if this worker now holds the lease.
+    """
+    expires_at = now + duration
+    async with async_session_factory() as session:
+        try:
+            if engine.dialect.name == "postgresql" and not await session.scalar(
+                text("SELECT pg_try_advisory_xact_lock(:id)"), {"id": lock_id}
+            ):
+                return False
+            result = await session.execute(
+                update(JobLease)
+                .where(JobLease.name == name, or_(JobLease.lease_expires_at.is_(None), JobLease.lease_expires_at < now))
+                .values(claimed_by=worker_id(), lease_expires_at=expires_at)
+            )
+            if result.rowcount == 0:
+                if await session.get(JobLease, name) is not None:
+                    return False
+                session.add(JobLease(name=name, claimed_by=worker_id(), lease_expires_at=expires_at))
+            await session.commit()
+        except IntegrityError:
+            # Another worker created the lease row first
+            return False
+    return True
+
+async def release_lease(name: str):
+    """
+    Releases the named job lease if this worker still holds it.
+    """
+    async with async_session_factory() as session:
+        await session.execute(
+            update(JobLease)
+            .where(JobLease.name == name, JobLease.claimed_by == worker_id())
+            .values(claimed_by=None, lease_expires_at=None)
+        )
+        await session.commit()
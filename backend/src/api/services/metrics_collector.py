@@ -0,0 +1,219 @@
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+from fastapi import HTTPException
+from sqlalchemy import func, insert
+from sqlmodel import select
+from ...core.config import settings
+from ...core.database import async_session_factory
+from ...core.logging import get_logger
+from ...core.instrumentation import SCHEDULER, instrumentation
+from ..models.post_metric_snapshot import PostMetricSnapshot
+from ..models.publish_attempt import PublishAttempt, PUBLISH_SENT
+from . import twitter_service
+from .analytics_cache import analytics_cache
+from .leases import acquire_lease, release_lease
+
+logger = get_logger(__name__)
+
+# Arbitrary key for the PostgreSQL advisory lock held while taking the collector lease
+COLLECTOR_LOCK_ID = 7_310_318
+
+# Name of the collector's row in `job_lease`
+COLLECTOR_LEASE = "metrics_collector"
+
+# Snapshot columns and the `public_metrics` fields they are read from
+METRIC_FIELDS = {
+    "impressions": "impression_count",
+    "likes": "like_count",
+    "retweets": "retweet_count",
+    "replies": "reply_count",
+    "quotes": "quote_count",
+}
+
+class MetricsSource:
+    """
+    Base class for sources of the public engagement metrics of published tweets.
+
+    Subclasses implement `fetch`, which receives at most `batch_size` tweet IDs per call.
+    """
+    name = "none"
+    batch_size = twitter_service.LOOKUP_BATCH_SIZE
+
+    async def fetch(self, tweet_ids: List[str]) -> Dict[str, Dict[str, int]]:
+        """
+        Returns the `public_metrics` of each tweet found, by tweet ID.
+        """
+        return {}
+
+class TwitterMetricsSource(MetricsSource):
+    """
+    Reads metrics from the Twitter API, one batched tweet lookup per call.
+    """
+    name = "twitter"
+
+    async def fetch(self, tweet_ids: List[str]) -> Dict[str, Dict[str, int]]:
+        return await twitter_service.lookup_public_metrics(tweet_ids)
+
+class StubMetricsSource(MetricsSource):
+    """
+    Local stand-in for the Twitter lookup, for tests and development without API access.
+
+    Each tweet's counters start from values seeded by its ID and grow a little on every
+    fetch, so repeated runs produce a plausible, reproducible history.
+    """
+    name = "stub"
+
+    def __init__(self):
+        self.lookups = 0
+        self._tweets: Dict[str, Tuple[random.Random, Dict[str, int]]] = {}
+
+    async def fetch(self, tweet_ids: List[str]) -> Dict[str, Dict[str, int]]:
+        self.lookups += 1
+        metrics = {}
+        for tweet_id in tweet_ids:
+            if tweet_id not in self._tweets:
+                self._tweets[tweet_id] = (random.Random(tweet_id), {field: 0 for field in METRIC_FIELDS.values()})
+            rng, counters = self._tweets[tweet_id]
+            counters["impression_count"] += rng.randint(20, 500)
+            counters["like_count"] += rng.randint(0, 25)
+            counters["retweet_count"] += rng.randint(0, 8)
+            counters["reply_count"] += rng.randint(0, 4)
+            counters["quote_count"] += rng.randint(0, 2)
+            metrics[tweet_id] = dict(counters)
+        return metrics
+
+def create_metrics_source() -> MetricsSource:
+    """
+    Creates the metrics source selected by `METRICS_SOURCE` ("twitter", "stub" or "none").
+    """
+    source = settings.METRICS_SOURCE.lower()
+    if source == "twitter":
+        return TwitterMetricsSource()
+    elif source == "stub":
+        return StubMetricsSource()
+    elif source == "none":
+        return MetricsSource()
+    raise ValueError(f"Unknown METRICS_SOURCE: {settings.METRICS_SOURCE}")
+
+class MetricsCollector:
+    """
+    Appends a snapshot of the engagement metrics of recently published tweets to
+    `post_metric_snapshot` on every run.
+
+    Tweets are the ones the publish outbox recorded as sent within `METRICS_MAX_AGE_DAYS`,
+    newest first and at most `METRICS_COLLECT_MAX_TWEETS` per run, looked up in batches of
+    `source.batch_size` and written with one bulk insert per batch.
+    """
+    def __init__(self, source: MetricsSource):
+        self.source = source
+        self.runs = 0
+        self.skipped_runs = 0
+        self.snapshots = 0
+        self.failed_lookups = 0
+        self.last_run_at: Optional[datetime] = None
+
+    async def _published_tweets(self, now: datetime) -> List[Tuple[UUID, str]]:
+        async with async_session_factory() as session:
+            result = await session.execute(
+                select(PublishAttempt.post_id, PublishAttempt.tweet_id)
+                .where(
+                    PublishAttempt.status == PUBLISH_SENT,
+                    PublishAttempt.tweet_id.is_not(None),
+                    PublishAttempt.updated_at >= now - timedelta(days=settings.METRICS_MAX_AGE_DAYS),
+                )
+                .order_by(PublishAttempt.updated_at.desc())
+                .limit(settings.METRICS_COLLECT_MAX_TWEETS)
+            )
+            return [(post_id, tweet_id) for post_id, tweet_id in result.all()]
+
+    async def _collected_recently(self, now: datetime) -> bool:
+        # Reads only the newest BRIN ranges; another worker may have run within half an interval
+        since = now - timedelta(minutes=settings.METRICS_COLLECT_INTERVAL_MINUTES / 2)
+        async with async_session_factory() as session:
+            latest = await session.scalar(
+                select(func.max(PostMetricSnapshot.collected_at)).where(PostMetricSnapshot.collected_at >= since)
+            )
+        return latest is not None
+
+    @instrumentation.timed(SCHEDULER, "collect_metrics")
+    async def collect(self) -> int:
+        """
+        Runs one collection pass.
+
+        A failed lookup ends the pass; snapshots of the batches before it are kept.
+
+        Returns:
+            int: The number of snapshots written.
+        """
+        now = datetime.now(timezone.utc)
+        tweets = await self._published_tweets(now)
+        written = 0
+        for start in range(0, len(tweets), self.source.batch_size):
+            batch = tweets[start:start + self.source.batch_size]
+            try:
+                metrics = await self.source.fetch([tweet_id for _, tweet_id in batch])
+            except HTTPException as e:
+                self.failed_lookups += 1
+                logger.error("Metrics lookup failed, ending collection run: %s", e.detail)
+                break
+            collected_at = datetime.now(timezone.utc)
+            rows = [
+                {"post_id": post_id, "collected_at": collected_at,
+                 **{column: int(metrics[tweet_id].get(field, 0)) for column, field in METRIC_FIELDS.items()}}
+                for post_id, tweet_id in batch if tweet_id in metrics
+            ]
+            if rows:
+                async with async_session_factory() as session:
+                    await session.execute(insert(PostMetricSnapshot), rows)
+                    await session.commit()
+            written += len(rows)
+        if written:
+            analytics_cache.invalidate()
+        self.runs += 1
+        self.snapshots += written
+        self.last_run_at = now
+        logger.info("Collected %s metric snapshots for %s published tweets", written, len(tweets))
+        return written
+
+    async def run(self):
+        """
+        Scheduler job: runs a collection pass unless another worker is running one or has
+        just finished one, so each interval looks every tweet up once across all workers.
+
+        Only taking and releasing the lease touch the database outside the pass's own
+        short sessions, so no connection is held while tweets are looked up.
+        """
+        if self.source.name == "none":
+            return
+        try:
+            now = datetime.now(timezone.utc)
+            lease = timedelta(minutes=settings.METRICS_COLLECT_INTERVAL_MINUTES)
+            if not await acquire_lease(COLLECTOR_LEASE, now, lease, COLLECTOR_LOCK_ID):
+                self.skipped_runs += 1
+                return
+            try:
+                if await self._collected_recently(now):
+                    self.skipped_runs += 1
+                    return
+                await self.collect()
+            finally:
+                await release_lease(COLLECTOR_LEASE)
+        except Exception as e:
+            logger.error("An error occurred while collecting metrics: %s", e)
+
+    def stats(self) -> Dict:
+        """
+        Returns the source, run counters and the time of the last completed run.
+        """
+        return {
+            "source": self.source.name,
+            "runs": self.runs,
+            "skipped_runs": self.skipped_runs,
+            "snapshots": self.snapshots,
+            "failed_lookups": self.failed_lookups,
+            "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+        }
+
+metrics_collector = MetricsCollector(create_metrics_source())
@@ -0,0 +1,123 @@
+import asyncio
+import heapq
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from ...core.logging import get_logger
+
+logger = get_logger(__name__)
+
+def as_utc(moment: datetime) -> datetime:
+    """
+    Returns an aware UTC datetime. Naive datetimes are taken as UTC.
+    """
+    if moment.tzinfo is None:
+        return moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc)
+
+class PostDispatcher:
+    """
+    Dispatches scheduled posts at their exact `scheduled_at` time.
+
+    Upcoming posts are kept in an in-process min-heap ordered by scheduled time. A single
+    background task sleeps until the earliest entry is due (or until an earlier entry is
+    added) and then hands the post to the `dispatch` callback, so posts fire on time without
+    polling the database.
+    """
+    def __init__(self, dispatch: Callable[[str], Awaitable[None]]):
+        self._dispatch = dispatch
+        self._heap: List[Tuple[datetime, str]] = []
+        # Current scheduled time per post; heap entries that no longer match are stale and skipped
+        self._scheduled: Dict[str, datetime] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._in_flight: Set[asyncio.Task] = set()
+        # Posts being dispatched right now; rescheduling them would post them twice
+        self._dispatching: Set[str] = set()
+
+    def schedule(self, post_id: str, scheduled_at: datetime):
+        """
+        Adds a post to the heap, or moves it if it was already scheduled for another time.
+
+        Args:
+            post_id (str): The ID of the post to dispatch.
+            scheduled_at (datetime): When to dispatch it. Naive datetimes are taken as UTC.
+        """
+        post_id = str(post_id)
+        scheduled_at = as_utc(scheduled_at)
+        if post_id in self._dispatching or self._scheduled.get(post_id) == scheduled_at:
+            return
+        self._scheduled[post_id] = scheduled_at
+        heapq.heappush(self._heap, (scheduled_at, post_id))
+        if self._heap[0][1] == post_id:
+            self._wakeup.set()
+
+    def schedule_many(self, entries: Iterable[Tuple[str, datetime]]):
+        """
+        Schedules several (post_id, scheduled_at) pairs, e.g. loaded from the database.
+        """
+        for post_id, scheduled_at in entries:
+            self.schedule(post_id, scheduled_at)
+
+    def cancel(self, post_id: str):
+        """
+        Removes a post from the schedule. Its heap entry is dropped lazily.
+        """
+        self._scheduled.pop(str(post_id), None)
+
+    def __len__(self) -> int:
+        return len(self._scheduled)
+
+    def start(self):
+        """
+        Starts the background dispatch task.
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info("Post dispatcher started with %s scheduled posts.", len(self))
+
+    async def stop(self):
+        """
+        Stops the background dispatch task and waits for in-flight dispatches to finish.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+        logger.info("Post dispatcher stopped.")
+
+    def _pop_due(self, now: datetime) -> List[str]:
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            scheduled_at, post_id = heapq.heappop(self._heap)
+            if self._scheduled.get(post_id) == scheduled_at:
+                del self._scheduled[post_id]
+                due.append(post_id)
+        return due
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            now = datetime.now(timezone.utc)
+            for post_id in self._pop_due(now):
+                task = asyncio.create_task(self._dispatch_one(post_id))
+                self._in_flight.add(task)
+                task.add_done_callback(self._in_flight.discard)
+            timeout = (self._heap[0][0] - now).total_seconds() if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _dispatch_one(self, post_id: str):
+        self._dispatching.add(post_id)
+        try:
+            await self._dispatch(post_id)
+        except Exception as e:
+            logger.error("Failed to dispatch scheduled post with ID %s: %s", post_id, e)
+        finally:
+            self._dispatching.discard(post_id)
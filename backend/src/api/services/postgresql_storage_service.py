@@ -1,13 +1,83 @@
-import random
-from typing import List, Dict, Optional
-from datetime import datetime
+import base64
+import json
+from typing import Any, List, Dict, Optional, Sequence, Set, Tuple
+from datetime import datetime, timedelta, timezone
+from uuid import UUID
 from sqlmodel import Session, select
-from sqlalchemy.exc import SQLAlchemyError
-from ...core.logging import logger
+from sqlalchemy import and_, func, insert, tuple_, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from ...core.logging import get_logger
+from ...core.instrumentation import STORAGE, instrumentation
 from ...api.models.post import Post
 from ...api.models.models import SocialMediaAgent
+from ...api.models.post_metric_snapshot import PostMetricSnapshot, METRICS
+from ...api.models.publish_attempt import PublishAttempt, PUBLISH_SENT
+from .analytics_cache import analytics_cache
 from ..exceptions import PostNotFoundException, DatabaseOperationException, AgentNotFoundException
 
+logger = get_logger(__name__)
+
+# Columns that can be requested from `list_posts`; id and created_at are always returned
+POST_LIST_FIELDS = ("id", "content", "approved", "scheduled_at", "is_posted", "created_at", "updated_at", "agent_id")
+
+def encode_cursor(created_at: datetime, post_id: UUID) -> str:
+    """
+    Encodes the keyset position after a post as an opaque, URL-safe cursor.
+    """
+    raw = json.dumps([created_at.isoformat(), str(post_id)]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    """
+    Decodes a cursor produced by `encode_cursor`.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, post_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), UUID(post_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+def _post_uuid(post_id: str) -> UUID:
+    """
+    Parses a post ID from a request path.
+
+    Raises:
+        PostNotFoundException: If the ID is not a UUID, as no post can have it.
+    """
+    try:
+        return UUID(str(post_id))
+    except ValueError:
+        raise PostNotFoundException(post_id=post_id)
+
+def _is_foreign_key_violation(e: IntegrityError) -> bool:
+    """
+    Returns True if the integrity error is a foreign key violation (PostgreSQL SQLSTATE 23503,
+    or SQLite's FOREIGN KEY constraint message).
+    """
+    return getattr(e.orig, "sqlstate", None) == "23503" or "FOREIGN KEY constraint failed" in str(e.orig)
+
+def latest_metrics():
+    """
+    Returns a subquery of the newest snapshot of each post: 'post_id', 'collected_at' and `METRICS`.
+    """
+    newest = (
+        select(PostMetricSnapshot.post_id, func.max(PostMetricSnapshot.collected_at).label("collected_at"))
+        .group_by(PostMetricSnapshot.post_id)
+        .subquery()
+    )
+    return (
+        select(PostMetricSnapshot.post_id, PostMetricSnapshot.collected_at, *(getattr(PostMetricSnapshot, metric) for metric in METRICS))
+        .join(newest, and_(PostMetricSnapshot.post_id == newest.c.post_id, PostMetricSnapshot.collected_at == newest.c.collected_at))
+        .subquery("latest_metrics")
+    )
+
+def _engagement_totals(latest) -> List:
+    return [func.coalesce(func.sum(latest.c[metric]), 0).label(metric) for metric in METRICS]
+
 class PostgreSQLStorageService:
     """
     Manages PostgreSQL storage for social media posts.
@@ -18,32 +88,86 @@ class PostgreSQLStorageService:
         self.session = session
         logger.info("Initialized PostgreSQLStorageService")
 
-    async def save_post(self, content: str, agent_id: Optional[int] = None) -> str:
+    @instrumentation.timed(STORAGE, "save_post")
+    async def save_post(self, content: str, agent_id: Optional[int] = None) -> Post:
         """
-        Saves a new post to the PostgreSQL database.
+        Saves a new post to the PostgreSQL database with a single INSERT ... RETURNING.
 
         Args:
             content (str): The content of the post.
             agent_id (Optional[int]): The ID of the social media agent creating the post.
 
         Returns:
-            str: The unique ID of the saved post.
+            Post: The persisted post, including its generated ID and timestamps.
+
+        Raises:
+            AgentNotFoundException: If `agent_id` does not belong to an existing agent.
         """
         try:
-            if agent_id:
-                agent = await self.session.get(SocialMediaAgent, agent_id)
-                if not agent:
-                    raise AgentNotFoundException(agent_id=agent_id)
-            post = Post(content=content, agent_id=agent_id)
-            self.session.add(post)
+            result = await self.session.execute(
+                insert(Post).values(content=content, agent_id=agent_id).returning(Post)
+            )
+            post = result.scalar_one()
             await self.session.commit()
-            await self.session.refresh(post)
-            logger.info(f"Saved new post with ID: {post.id}")
-            return str(post.id)
+            analytics_cache.invalidate()
+            logger.info("Saved new post with ID: %s", post.id)
+            return post
+        except IntegrityError as e:
+            await self.session.rollback()
+            if agent_id is not None and _is_foreign_key_violation(e):
+                raise AgentNotFoundException(agent_id=agent_id)
+            raise DatabaseOperationException(detail=f"Failed to save post: {e}")
         except SQLAlchemyError as e:
             await self.session.rollback()
             raise DatabaseOperationException(detail=f"Failed to save post: {e}")
 
+    @instrumentation.timed(STORAGE, "save_posts")
+    async def save_posts(self, items: List[Tuple[str, Optional[int]]]) -> List[Post]:
+        """
+        Saves many new posts with a single bulk INSERT and one commit.
+
+        Args:
+            items (List[Tuple[str, Optional[int]]]): (content, agent_id) pairs for the new posts.
+
+        Returns:
+            List[Post]: The persisted posts, in the same order as `items`.
+        """
+        if not items:
+            return []
+        try:
+            result = await self.session.execute(
+                insert(Post).returning(Post, sort_by_parameter_order=True),
+                [{"content": content, "agent_id": agent_id} for content, agent_id in items],
+            )
+            posts = list(result.scalars().all())
+            await self.session.commit()
+            analytics_cache.invalidate()
+            logger.info("Saved %s new posts in bulk", len(posts))
+            return posts
+        except SQLAlchemyError as e:
+            await self.session.rollback()
+            raise DatabaseOperationException(detail=f"Failed to save posts: {e}")
+
+    @instrumentation.timed(STORAGE, "get_existing_agent_ids")
+    async def get_existing_agent_ids(self, agent_ids: Set[int]) -> Set[int]:
+        """
+        Returns the subset of the given social media agent IDs that exist.
+
+        Args:
+            agent_ids (Set[int]): The agent IDs to look up.
+
+        Returns:
+            Set[int]: The IDs that belong to existing agents.
+        """
+        if not agent_ids:
+            return set()
+        try:
+            result = await self.session.execute(select(SocialMediaAgent.id).where(SocialMediaAgent.id.in_(agent_ids)))
+            return set(result.scalars().all())
+        except SQLAlchemyError as e:
+            raise DatabaseOperationException(detail=f"Failed to look up agents: {e}")
+
+    @instrumentation.timed(STORAGE, "get_post")
     async def get_post(self, post_id: str) -> Post:
         """
         Retrieves a post by its ID from the PostgreSQL database.
@@ -58,14 +182,15 @@ class PostgreSQLStorageService:
             PostNotFoundException: If the post is not found.
         """
         try:
-            post = await self.session.get(Post, post_id)
+            post = await self.session.get(Post, _post_uuid(post_id))
             if not post:
                 raise PostNotFoundException(post_id=post_id)
-            logger.info(f"Retrieved post ID: {post_id}")
+            logger.debug("Retrieved post ID: %s", post_id)
             return post
         except SQLAlchemyError as e:
             raise DatabaseOperationException(detail=f"Failed to retrieve post: {e}")
 
+    @instrumentation.timed(STORAGE, "get_all_posts")
     async def get_all_posts(self) -> List[Post]:
         """
         Retrieves all posts from the PostgreSQL database.
@@ -76,14 +201,77 @@ class PostgreSQLStorageService:
         try:
             result = await self.session.execute(select(Post))
             posts = result.scalars().all()
-            logger.info(f"Retrieved {len(posts)} posts from DB")
+            logger.debug("Retrieved %s posts from DB", len(posts))
             return posts
         except SQLAlchemyError as e:
             raise DatabaseOperationException(detail=f"Failed to retrieve all posts: {e}")
 
-    async def update_post(self, post_id: str, approved: Optional[bool] = None, scheduled_at: Optional[datetime] = None, is_posted: Optional[bool] = None, agent_id: Optional[int] = None):
+    @instrumentation.timed(STORAGE, "list_posts")
+    async def list_posts(
+        self,
+        limit: int,
+        cursor: Optional[str] = None,
+        approved: Optional[bool] = None,
+        is_posted: Optional[bool] = None,
+        agent_id: Optional[int] = None,
+        scheduled_after: Optional[datetime] = None,
+        scheduled_before: Optional[datetime] = None,
+        fields: Optional[Sequence[str]] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
         """
-        Updates the approval status, scheduled time, posted status, and/or agent of a post.
+        Retrieves one page of posts, newest first, using keyset pagination on (created_at, id).
+
+        Each page is a single index-friendly range query, so its cost does not depend on how
+        deep into the table it is. Only the requested columns are selected.
+
+        Args:
+            limit (int): The maximum number of posts to return.
+            cursor (Optional[str]): The cursor returned with the previous page, if any.
+            approved (Optional[bool]): Only return posts with this approval status.
+            is_posted (Optional[bool]): Only return posts with this posted status.
+            agent_id (Optional[int]): Only return posts of this social media agent.
+            scheduled_after (Optional[datetime]): Only return posts scheduled at or after this time.
+            scheduled_before (Optional[datetime]): Only return posts scheduled before this time.
+            fields (Optional[Sequence[str]]): Columns to return, from `POST_LIST_FIELDS`. Defaults to all.
+
+        Returns:
+            Tuple[List[Dict[str, Any]], Optional[str]]: The posts as dicts, and the cursor of the next page or None on the last page.
+
+        Raises:
+            ValueError: If the cursor is malformed.
+        """
+        names = ["id", "created_at"] + [name for name in (fields or POST_LIST_FIELDS) if name not in ("id", "created_at")]
+        query = select(*(getattr(Post, name) for name in names))
+        if cursor:
+            query = query.where(tuple_(Post.created_at, Post.id) < tuple_(*decode_cursor(cursor)))
+        if approved is not None:
+            query = query.where(Post.approved == approved)
+        if is_posted is not None:
+            query = query.where(Post.is_posted == is_posted)
+        if agent_id is not None:
+            query = query.where(Post.agent_id == agent_id)
+        if scheduled_after is not None:
+            query = query.where(Post.scheduled_at >= scheduled_after)
+        if scheduled_before is not None:
+            query = query.where(Post.scheduled_at < scheduled_before)
+        query = query.order_by(Post.created_at.desc(), Post.id.desc()).limit(limit + 1)
+        try:
+            rows = (await self.session.execute(query)).all()
+        except SQLAlchemyError as e:
+            raise DatabaseOperationException(detail=f"Failed to list posts: {e}")
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+        logger.debug("Listed %s posts", len(rows))
+        return [dict(row._mapping) for row in rows], next_cursor
+
+    @instrumentation.timed(STORAGE, "update_post")
+    async def update_post(self, post_id: str, approved: Optional[bool] = None, scheduled_at: Optional[datetime] = None, is_posted: Optional[bool] = None, agent_id: Optional[int] = None) -> Post:
+        """
+        Updates the approval status, scheduled time, posted status, and/or agent of a post
+        with a single UPDATE ... RETURNING.
 
         Args:
             post_id (str): The ID of the post to update.
@@ -91,50 +279,174 @@ class PostgreSQLStorageService:
             scheduled_at (datetime, optional): New scheduled time.
             is_posted (bool, optional): New posted status.
             agent_id (Optional[int]): New agent ID.
+
+        Returns:
+            Post: The updated post.
+
+        Raises:
+            PostNotFoundException: If the post is not found.
+            AgentNotFoundException: If `agent_id` does not belong to an existing agent.
         """
+        changes = {
+            name: value for name, value in (
+                ("approved", approved), ("scheduled_at", scheduled_at), ("is_posted", is_posted), ("agent_id", agent_id),
+            ) if value is not None
+        }
+        if not changes:
+            return await self.get_post(post_id)
         try:
-            post = await self.session.get(Post, post_id)
+            result = await self.session.execute(
+                update(Post)
+                .where(Post.id == _post_uuid(post_id))
+                .values(**changes)
+                .returning(Post)
+                .execution_options(synchronize_session=False, populate_existing=True)
+            )
+            post = result.scalar_one_or_none()
             if not post:
                 raise PostNotFoundException(post_id=post_id)
-
-            if approved is not None:
-                post.approved = approved
-            if scheduled_at is not None:
-                post.scheduled_at = scheduled_at
-            if is_posted is not None:
-                post.is_posted = is_posted
-            if agent_id is not None:
-                agent = await self.session.get(SocialMediaAgent, agent_id)
-                if not agent:
-                    raise AgentNotFoundException(agent_id=agent_id)
-                post.agent_id = agent_id
-
-            self.session.add(post)
             await self.session.commit()
-            await self.session.refresh(post)
-            logger.info(f"Updated post ID: {post_id} - approved: {approved}, scheduled_at: {scheduled_at}, is_posted: {is_posted}, agent_id: {agent_id}")
+            analytics_cache.invalidate()
+            logger.info("Updated post ID: %s - approved: %s, scheduled_at: %s, is_posted: %s, agent_id: %s", post_id, approved, scheduled_at, is_posted, agent_id)
+            return post
+        except IntegrityError as e:
+            await self.session.rollback()
+            if agent_id is not None and _is_foreign_key_violation(e):
+                raise AgentNotFoundException(agent_id=agent_id)
+            raise DatabaseOperationException(detail=f"Failed to update post: {e}")
         except SQLAlchemyError as e:
             await self.session.rollback()
             raise DatabaseOperationException(detail=f"Failed to update post: {e}")
 
-    # Mock metrics remain as per SRS, not stored in DB
+    @instrumentation.timed(STORAGE, "get_metrics")
     async def get_metrics(self) -> List[Dict]:
         """
-        Generates and retrieves mock engagement metrics for all posts.
+        Retrieves the latest collected engagement metrics of every published post.
+
+        Reads only `post_metric_snapshot`: the newest snapshot of each post, found through the
+        (post_id, collected_at) index.
 
         Returns:
-            List[Dict]: A list of dictionaries, each containing 'post_id', 'likes', and 'retweets'.
+            List[Dict]: One dict per post with 'post_id', 'collected_at' and each of `METRICS`.
         """
-        # This method remains unchanged as per SRS, mock data not stored in DB
+        latest = latest_metrics()
         try:
-            result = await self.session.execute(select(Post))
-            posts = result.scalars().all()
-            metrics = []
-            for post in posts:
-                likes = random.randint(0, 100)
-                retweets = random.randint(0, 50)
-                metrics.append({"post_id": str(post.id), "likes": likes, "retweets": retweets})
-            logger.info(f"Generated mock metrics for {len(metrics)} posts")
-            return metrics
+            rows = (await self.session.execute(select(latest))).all()
+        except SQLAlchemyError as e:
+            raise DatabaseOperationException(detail=f"Failed to retrieve metrics: {e}")
+        metrics = [{**row._mapping, "post_id": str(row.post_id)} for row in rows]
+        logger.debug("Retrieved metrics for %s posts", len(metrics))
+        return metrics
+
+    @instrumentation.timed(STORAGE, "analytics_summary")
+    async def analytics_summary(self) -> Dict[str, Any]:
+        """
+        Retrieves post counts by state and engagement totals over every published post.
+
+        Returns:
+            Dict[str, Any]: 'posts' with 'total', 'approved', 'scheduled' and 'posted' counts,
+                and 'engagement' with the sum of each of `METRICS` over the latest snapshots.
+        """
+        latest = latest_metrics()
+        posts_query = select(
+            func.count(Post.id).label("total"),
+            func.count(Post.id).filter(Post.approved == True).label("approved"),
+            func.count(Post.id).filter(Post.approved == True, Post.is_posted == False, Post.scheduled_at.is_not(None)).label("scheduled"),
+            func.count(Post.id).filter(Post.is_posted == True).label("posted"),
+        )
+        try:
+            posts = (await self.session.execute(posts_query)).one()
+            engagement = (await self.session.execute(select(*_engagement_totals(latest)))).one()
+        except SQLAlchemyError as e:
+            raise DatabaseOperationException(detail=f"Failed to compute analytics summary: {e}")
+        return {"posts": dict(posts._mapping), "engagement": dict(engagement._mapping)}
+
+    @instrumentation.timed(STORAGE, "analytics_by_agent")
+    async def analytics_by_agent(self) -> List[Dict[str, Any]]:
+        """
+        Retrieves post counts and engagement totals per social media agent.
+
+        Returns:
+            List[Dict[str, Any]]: One dict per agent with 'agent_id', 'agent_name', 'posts', 'posted'
+                and the sum of each of `METRICS`. Posts without an agent are grouped under a None agent_id.
+        """
+        latest = latest_metrics()
+        query = (
+            select(
+                Post.agent_id,
+                SocialMediaAgent.name.label("agent_name"),
+                func.count(Post.id).label("posts"),
+                func.count(Post.id).filter(Post.is_posted == True).label("posted"),
+                *_engagement_totals(latest),
+            )
+            .select_from(Post)
+            .outerjoin(SocialMediaAgent, Post.agent_id == SocialMediaAgent.id)
+            .outerjoin(latest, latest.c.post_id == Post.id)
+            .group_by(Post.agent_id, SocialMediaAgent.name)
+            .order_by(Post.agent_id)
+        )
+        try:
+            rows = (await self.session.execute(query)).all()
+        except SQLAlchemyError as e:
+            raise DatabaseOperationException(detail=f"Failed to compute per-agent analytics: {e}")
+        return [dict(row._mapping) for row in rows]
+
+    @instrumentation.timed(STORAGE, "analytics_daily")
+    async def analytics_daily(self, days: int) -> List[Dict[str, Any]]:
+        """
+        Retrieves the number of posts published per day and their engagement totals.
+
+        Args:
+            days (int): How many days back from now to cover.
+
+        Returns:
+            List[Dict[str, Any]]: One dict per day with posts published, oldest first, with 'day'
+                ('YYYY-MM-DD'), 'published' and the sum of each of `METRICS` for those posts.
+        """
+        latest = latest_metrics()
+        day = func.date(PublishAttempt.updated_at).label("day")
+        since = datetime.now(timezone.utc) - timedelta(days=days)
+        query = (
+            select(day, func.count(PublishAttempt.id).label("published"), *_engagement_totals(latest))
+            .select_from(PublishAttempt)
+            .outerjoin(latest, latest.c.post_id == PublishAttempt.post_id)
+            .where(PublishAttempt.status == PUBLISH_SENT, PublishAttempt.updated_at >= since)
+            .group_by(day)
+            .order_by(day)
+        )
+        try:
+            rows = (await self.session.execute(query)).all()
+        except SQLAlchemyError as e:
+            raise DatabaseOperationException(detail=f"Failed to compute daily analytics: {e}")
+        return [{**row._mapping, "day": str(row.day)} for row in rows]
+
+    @instrumentation.timed(STORAGE, "top_posts")
+    async def top_posts(self, metric: str, limit: int) -> List[Dict[str, Any]]:
+        """
+        Retrieves the published posts with the highest latest value of an engagement metric.
+
+        Args:
+            metric (str): The metric to rank by, one of `METRICS`.
+            limit (int): The number of posts to return.
+
+        Returns:
+            List[Dict[str, Any]]: The posts, best first, with 'post_id', 'content', 'agent_id',
+                'collected_at' and each of `METRICS`.
+
+        Raises:
+            ValueError: If `metric` is not one of `METRICS`.
+        """
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric {metric!r}, expected one of: {', '.join(METRICS)}")
+        latest = latest_metrics()
+        query = (
+            select(latest, Post.content, Post.agent_id)
+            .join(Post, Post.id == latest.c.post_id)
+            .order_by(latest.c[metric].desc(), latest.c.post_id)
+            .limit(limit)
+        )
+        try:
+            rows = (await self.session.execute(query)).all()
         except SQLAlchemyError as e:
-            raise DatabaseOperationException(detail=f"Failed to generate mock metrics: {e}")
\ No newline at end of file
+            raise DatabaseOperationException(detail=f"Failed to retrieve top posts: {e}")
+        return [{**row._mapping, "post_id": str(row.post_id)} for row in rows]
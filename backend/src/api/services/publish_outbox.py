@@ -0,0 +1,193 @@
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+from uuid import UUID
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import select, update, or_, and_
+from ...core.config import settings
+from ...core.database import async_session_factory
+from ...core.logging import get_logger
+from ..models.post import Post
+from ..models.publish_attempt import (
+    PublishAttempt, PUBLISH_PENDING, PUBLISH_IN_PROGRESS, PUBLISH_SENT, PUBLISH_FAILED,
+)
+from ..exceptions import TwitterAPIException
+from . import twitter_service
+from .analytics_cache import analytics_cache
+
+logger = get_logger(__name__)
+
+def idempotency_key(post_id: str) -> str:
+    """
+    Returns the outbox key of a post's publication; a post is published at most once per key.
+    """
+    return f"post:{post_id}"
+
+def retry_delay(attempt_count: int) -> timedelta:
+    """
+    Returns the exponential backoff before retry number `attempt_count`, capped at `PUBLISH_RETRY_MAX_SECONDS`.
+    """
+    seconds = settings.PUBLISH_RETRY_BASE_SECONDS * (2 ** (attempt_count - 1))
+    return timedelta(seconds=min(seconds, settings.PUBLISH_RETRY_MAX_SECONDS))
+
+async def _begin_attempt(post_id: str) -> Optional[int]:
+    """
+    Moves the post's outbox row to in progress, creating it on first use.
+
+    Returns:
+        Optional[int]: The attempt number, or None if the post was already sent or another
+        attempt is in progress.
+    """
+    key = idempotency_key(post_id)
+    now = datetime.now(timezone.utc)
+    async with async_session_factory() as session:
+        try:
+            session.add(PublishAttempt(post_id=UUID(post_id), idempotency_key=key))
+            await session.commit()
+        except IntegrityError:
+            await session.rollback()
+
+        # An in-progress row older than a lease was abandoned by a crashed worker
+        stale = now - timedelta(seconds=settings.PUBLISH_LEASE_SECONDS)
+        result = await session.execute(
+            update(PublishAttempt)
+            .where(
+                PublishAttempt.idempotency_key == key,
+                or_(
+                    PublishAttempt.status.in_([PUBLISH_PENDING, PUBLISH_FAILED]),
+                    and_(PublishAttempt.status == PUBLISH_IN_PROGRESS, PublishAttempt.updated_at < stale),
+                ),
+            )
+            .values(status=PUBLISH_IN_PROGRESS, attempt_count=PublishAttempt.attempt_count + 1, next_retry_at=None)
+            .returning(PublishAttempt.attempt_count)
+        )
+        attempt_count = result.scalar_one_or_none()
+        await session.commit()
+    return attempt_count
+
+def _is_current(post_id: str, attempt_count: int):
+    """
+    Conditions for the outbox row still being in progress under attempt `attempt_count`, i.e.
+    not taken over by a newer attempt after this one was deemed abandoned.
+    """
+    return and_(
+        PublishAttempt.idempotency_key == idempotency_key(post_id),
+        PublishAttempt.status == PUBLISH_IN_PROGRESS,
+        PublishAttempt.attempt_count == attempt_count,
+    )
+
+async def _record_sent(post_id: str, attempt_count: int, tweet_id: Optional[str]):
+    """
+    Marks the outbox row as sent and the post as posted in a single transaction, unless a
+    newer attempt has taken the row over.
+    """
+    async with async_session_factory() as session:
+        result = await session.execute(
+            update(PublishAttempt).where(_is_current(post_id, attempt_count))
+            .values(status=PUBLISH_SENT, tweet_id=tweet_id, last_error=None)
+        )
+        if result.rowcount == 0:
+            # The newer attempt gets a duplicate reply from Twitter and records the post as sent
+            logger.warning("Attempt %s of post ID %s was taken over by a newer attempt, not recording it", attempt_count, post_id)
+            return
+        await session.execute(
+            update(Post).where(Post.id == UUID(post_id))
+            .values(is_posted=True, claimed_by=None, lease_expires_at=None)
+        )
+        await session.commit()
+    analytics_cache.invalidate()
+
+async def _record_failure(post_id: str, attempt_count: int, error: str) -> Optional[datetime]:
+    """
+    Records a failed attempt and schedules the next retry, or gives up after `PUBLISH_MAX_ATTEMPTS`.
+    Nothing is recorded if a newer attempt has taken the row over.
+
+    Returns:
+        Optional[datetime]: When the post should be retried, or None if it will not be.
+    """
+    if attempt_count >= settings.PUBLISH_MAX_ATTEMPTS:
+        status, next_retry_at = PUBLISH_FAILED, None
+    else:
+        status, next_retry_at = PUBLISH_PENDING, datetime.now(timezone.utc) + retry_delay(attempt_count)
+    async with async_session_factory() as session:
+        result = await session.execute(
+            update(PublishAttempt).where(_is_current(post_id, attempt_count))
+            .values(status=status, last_error=error, next_retry_at=next_retry_at)
+        )
+        await session.commit()
+    if result.rowcount == 0:
+        logger.warning("Attempt %s of post ID %s was taken over by a newer attempt, not recording it", attempt_count, post_id)
+        return None
+    return next_retry_at
+
+def _is_duplicate(e: TwitterAPIException) -> bool:
+    return e.status_code == 403 and "duplicate" in str(e.detail).lower()
+
+async def publish_post(post_id: str, content: str) -> Optional[PublishAttempt]:
+    """
+    Publishes a post to Twitter through the outbox.
+
+    The attempt is committed before the tweet is sent and the result right after, so a
+    crash never loses the record of a sent tweet. A failed attempt is rescheduled with
+    exponential backoff via `next_retry_at` instead of being retried inline.
+
+    Args:
+        post_id (str): The ID of the post to publish.
+        content (str): The text of the post.
+
+    Returns:
+        Optional[PublishAttempt]: The outbox row after the attempt, or None if the post was
+        already sent or is being sent by another attempt.
+
+    Raises:
+        TwitterAPIException: If the Twitter API request fails; the retry is already scheduled.
+    """
+    post_id = str(post_id)
+    attempt_count = await _begin_attempt(post_id)
+    if attempt_count is None:
+        logger.info("Post ID %s was already sent or is being sent", post_id)
+        return None
+
+    try:
+        response = await twitter_service.schedule_post(content, max_retries=1)
+        tweet_id = (response.get("data") or {}).get("id")
+    except TwitterAPIException as e:
+        if attempt_count > 1 and _is_duplicate(e):
+            # An earlier attempt did reach Twitter: its worker died, or it failed with a timeout
+            # or server error after Twitter had accepted the tweet
+            logger.info("Post ID %s was already published by an earlier attempt", post_id)
+            tweet_id = None
+        else:
+            next_retry_at = await _record_failure(post_id, attempt_count, e.detail)
+            if next_retry_at:
+                logger.warning("Publishing post ID %s failed (attempt %s), retrying at %s", post_id, attempt_count, next_retry_at)
+            else:
+                logger.error("Publishing post ID %s failed after %s attempts: %s", post_id, attempt_count, e.detail)
+            raise
+
+    await _record_sent(post_id, attempt_count, tweet_id)
+    return await get_attempt(post_id)
+
+async def get_attempt(post_id: str) -> Optional[PublishAttempt]:
+    """
+    Returns the outbox row of a post, or None if it has never been published.
+    """
+    async with async_session_factory() as session:
+        result = await session.execute(
+            select(PublishAttempt).where(PublishAttempt.idempotency_key == idempotency_key(str(post_id)))
+        )
+        return result.scalar_one_or_none()
+
+async def pending_retries(until: datetime) -> List[Tuple[str, datetime]]:
+    """
+    Returns (post_id, next_retry_at) for scheduled posts with a retry due before `until`.
+    """
+    async with async_session_factory() as session:
+        result = await session.execute(
+            select(PublishAttempt.post_id, PublishAttempt.next_retry_at)
+            .join(Post, Post.id == PublishAttempt.post_id)
+            .where(
+                PublishAttempt.status == PUBLISH_PENDING, PublishAttempt.next_retry_at <= until,
+                Post.is_posted == False, Post.scheduled_at != None,
+            )
+        )
+        return [(str(post_id), next_retry_at) for post_id, next_retry_at in result.all()]
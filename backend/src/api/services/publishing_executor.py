@@ -0,0 +1,91 @@
+import asyncio
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Hashable, Optional, Set
+from ...core.logging import get_logger
+
+logger = get_logger(__name__)
+
+class PublishingExecutor:
+    """
+    Publishes posts concurrently, with one FIFO queue per social media account.
+
+    Each account's queue is drained by its own worker, so posts for an account go out in
+    order while a slow or throttled post only holds up its own account. At most
+    `max_concurrency` posts are published at once across all accounts; the pace itself is
+    set by the shared Twitter rate limiter inside `publish`.
+    """
+    def __init__(self, publish: Callable[[str], Awaitable[None]], max_concurrency: int):
+        self._publish = publish
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._queues: Dict[Hashable, Deque[str]] = {}
+        self._workers: Dict[Hashable, asyncio.Task] = {}
+        # Queued or publishing posts; submitting one again is a no-op so it is never posted twice
+        self._pending: Set[str] = set()
+        self.published = 0
+        self.failed = 0
+
+    def submit(self, post_id: str, agent_id: Optional[int] = None) -> bool:
+        """
+        Queues a post for publishing on its account's queue.
+
+        Args:
+            post_id (str): The ID of the post to publish.
+            agent_id (Optional[int]): The agent (account) the post belongs to.
+
+        Returns:
+            bool: False if the post was already queued or being published.
+        """
+        post_id = str(post_id)
+        if post_id in self._pending:
+            return False
+        self._pending.add(post_id)
+        self._queues.setdefault(agent_id, deque()).append(post_id)
+        if agent_id not in self._workers:
+            self._workers[agent_id] = asyncio.create_task(self._drain(agent_id))
+        return True
+
+    async def _drain(self, agent_id: Hashable):
+        queue = self._queues[agent_id]
+        try:
+            while queue:
+                post_id = queue.popleft()
+                try:
+                    async with self._semaphore:
+                        await self._publish(post_id)
+                    self.published += 1
+                except Exception as e:
+                    self.failed += 1
+                    logger.error("Failed to publish post with ID %s: %s", post_id, e)
+                finally:
+                    self._pending.discard(post_id)
+        finally:
+            del self._workers[agent_id]
+            del self._queues[agent_id]
+
+    async def join(self):
+        """
+        Waits until every queued post has been published or has failed.
+        """
+        while self._workers:
+            await asyncio.gather(*self._workers.values(), return_exceptions=True)
+
+    async def stop(self):
+        """
+        Cancels the account workers, dropping posts that have not been published yet.
+        """
+        workers = list(self._workers.values())
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        self._pending.clear()
+
+    def stats(self) -> Dict:
+        """
+        Returns the number of queued posts, busy accounts, and published/failed counters.
+        """
+        return {
+            "queued": len(self._pending),
+            "accounts": len(self._workers),
+            "published": self.published,
+            "failed": self.failed,
+        }
@@ -0,0 +1,102 @@
+import asyncio
+import time
+from typing import Dict, Mapping
+from ...core.config import settings
+from ...core.logging import get_logger
+
+logger = get_logger(__name__)
+
+class TokenBucket:
+    """
+    Async token-bucket rate limiter shared by every caller of an upstream API.
+
+    The bucket refills continuously at `capacity / window_seconds` tokens per second. When the
+    upstream reports its own quota (Twitter's `x-rate-limit-remaining` / `x-rate-limit-reset`
+    headers), the bucket is resynchronised with it, and an exhausted quota blocks every caller
+    until the reported reset time instead of letting each one hit a 429.
+    """
+    def __init__(self, capacity: int, window_seconds: float):
+        self.capacity = capacity
+        self.refill_rate = capacity / window_seconds
+        self._tokens = float(capacity)
+        self._updated_at = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = asyncio.Lock()
+        self.throttled = 0
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.refill_rate)
+        self._updated_at = now
+
+    async def acquire(self):
+        """
+        Waits until a token is available and takes it. Callers are served in arrival order.
+        """
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._blocked_until:
+                    delay = self._blocked_until - now
+                else:
+                    self._refill(now)
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    delay = (1 - self._tokens) / self.refill_rate
+                self.throttled += 1
+                await asyncio.sleep(delay)
+
+    def wait_time(self) -> float:
+        """
+        Returns an estimate of how long `acquire` would wait right now, ignoring queued callers.
+        """
+        now = time.monotonic()
+        if now < self._blocked_until:
+            return self._blocked_until - now
+        self._refill(now)
+        return max(0.0, (1 - self._tokens) / self.refill_rate)
+
+    def update_from_headers(self, headers: Mapping[str, str]):
+        """
+        Resynchronises the bucket with the quota reported by the upstream response headers.
+
+        Args:
+            headers (Mapping[str, str]): The response headers.
+        """
+        remaining = headers.get("x-rate-limit-remaining")
+        reset = headers.get("x-rate-limit-reset")
+        if remaining is None:
+            return
+        try:
+            remaining = int(remaining)
+            reset_in = max(0.0, int(reset) - time.time()) if reset else None
+        except ValueError:
+            return
+        now = time.monotonic()
+        self._refill(now)
+        self._tokens = min(self._tokens, float(remaining))
+        if remaining == 0 and reset_in is not None:
+            self._blocked_until = now + reset_in
+            logger.warning("Rate limit exhausted, holding requests for %.0f seconds", reset_in)
+
+    def block_for(self, seconds: float):
+        """
+        Holds every caller for the given number of seconds, e.g. after a 429 without reset headers.
+        """
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    def stats(self) -> Dict:
+        """
+        Returns the tokens available, the remaining block time and the number of throttled waits.
+        """
+        now = time.monotonic()
+        self._refill(now)
+        return {
+            "tokens": round(self._tokens, 2),
+            "blocked_for_seconds": round(max(0.0, self._blocked_until - now), 2),
+            "throttled": self.throttled,
+        }
+
+twitter_rate_limiter = TokenBucket(settings.TWITTER_RATE_LIMIT_REQUESTS, settings.TWITTER_RATE_LIMIT_WINDOW_SECONDS)
+# Tweet lookups (engagement metrics) have their own quota, separate from posting
+twitter_lookup_rate_limiter = TokenBucket(settings.TWITTER_LOOKUP_RATE_LIMIT_REQUESTS, settings.TWITTER_LOOKUP_RATE_LIMIT_WINDOW_SECONDS)
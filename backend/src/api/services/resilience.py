@@ -0,0 +1,240 @@
+import asyncio
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Dict, Iterator, Optional, TypeVar
+import httpx
+from ...core.config import settings
+from ...core.logging import get_logger
+from ...core.instrumentation import instrumentation
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+GEMINI = "gemini"
+TWITTER = "twitter"
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling an upstream whose circuit breaker is open.
+    """
+    def __init__(self, upstream: str, retry_after: float):
+        self.upstream = upstream
+        self.retry_after = retry_after
+        super().__init__(f"{upstream} is unavailable, retry in {retry_after:.0f} seconds")
+
+class CallSkipped(Exception):
+    """
+    Raised by an operation that gave up before reaching the upstream, e.g. because its rate
+    limit would not reset before the deadline. It says nothing about the upstream's health,
+    so the circuit breaker state is left unchanged.
+    """
+
+class CircuitBreaker:
+    """
+    Per-upstream circuit breaker.
+
+    After `failure_threshold` consecutive failures the breaker opens and calls fail fast for
+    `reset_seconds`. It then goes half-open and lets a single probe call through: success
+    closes the breaker, failure opens it again.
+    """
+    def __init__(self, name: str, failure_threshold: int, reset_seconds: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self.rejected = 0
+        self._probe_in_flight = False
+
+    def before_call(self):
+        """
+        Raises `CircuitOpenError` if the call must not reach the upstream.
+        """
+        if self.state == OPEN:
+            retry_after = self.opened_at + self.reset_seconds - time.monotonic()
+            if retry_after > 0:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, retry_after)
+            self.state = HALF_OPEN
+            logger.info("Circuit breaker for %s is half-open", self.name)
+        if self.state == HALF_OPEN:
+            if self._probe_in_flight:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, self.reset_seconds)
+            self._probe_in_flight = True
+
+    def record_success(self):
+        """
+        Records a call that reached a healthy upstream.
+        """
+        if self.state != CLOSED:
+            logger.info("Circuit breaker for %s closed", self.name)
+        self.state = CLOSED
+        self.failures = 0
+        self._probe_in_flight = False
+
+    def record_skipped(self):
+        """
+        Records a call that was cancelled by its caller or skipped before reaching the upstream.
+        Frees the half-open probe slot without changing the state.
+        """
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        """
+        Records a failed call, opening the breaker at the threshold or after a failed probe.
+        """
+        self.failures += 1
+        self._probe_in_flight = False
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != OPEN:
+                self.times_opened += 1
+                logger.warning("Circuit breaker for %s opened after %s failures", self.name, self.failures)
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+
+    def stats(self) -> Dict:
+        """
+        Returns the breaker state and counters.
+        """
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+        }
+
+circuit_breakers: Dict[str, CircuitBreaker] = {
+    name: CircuitBreaker(name, settings.CIRCUIT_BREAKER_FAILURE_THRESHOLD, settings.CIRCUIT_BREAKER_RESET_SECONDS)
+    for name in (GEMINI, TWITTER)
+}
+
+_deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+@contextmanager
+def deadline(seconds: float) -> Iterator[None]:
+    """
+    Bounds the time upstream calls made inside the block may take, including retries.
+    A nested deadline can only shorten the enclosing one.
+
+    Args:
+        seconds (float): The time budget from now.
+    """
+    expires_at = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(expires_at if current is None else min(current, expires_at))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+def remaining_time() -> Optional[float]:
+    """
+    Returns the seconds left before the current deadline, or None if there is no deadline.
+    """
+    expires_at = _deadline.get()
+    return None if expires_at is None else max(0.0, expires_at - time.monotonic())
+
+def request_timeout(default: float) -> float:
+    """
+    Returns the timeout for one upstream request: `default`, shortened to the remaining deadline.
+    """
+    remaining = remaining_time()
+    return default if remaining is None else max(0.001, min(default, remaining))
+
+def backoff_delay(attempt: int) -> float:
+    """
+    Returns a full-jitter exponential backoff delay for a zero-based retry attempt, so that
+    callers failing together do not retry in lockstep.
+    """
+    return random.uniform(0, min(settings.RETRY_MAX_BACKOFF_SECONDS, settings.INITIAL_BACKOFF * (2 ** attempt)))
+
+def is_transient(e: Exception) -> bool:
+    """
+    Returns True for errors worth retrying: transport errors, 429 and 5xx responses.
+    """
+    if isinstance(e, httpx.RequestError):
+        return True
+    if isinstance(e, httpx.HTTPStatusError):
+        return e.response.status_code == 429 or e.response.status_code >= 500
+    return False
+
+def is_upstream_failure(e: Exception) -> bool:
+    """
+    Returns True for errors that count against the upstream's circuit breaker. Rate limiting
+    and other 4xx responses mean the upstream is healthy and are not counted.
+    """
+    if isinstance(e, httpx.HTTPStatusError):
+        return e.response.status_code >= 500
+    return isinstance(e, httpx.RequestError)
+
+async def call_with_retries(
+    upstream: str,
+    operation: Callable[[], Awaitable[T]],
+    max_attempts: int,
+    retry_after: Callable[[Exception], Optional[float]] = lambda e: None,
+) -> T:
+    """
+    Calls an upstream through its circuit breaker, retrying transient failures with jittered
+    exponential backoff.
+
+    Retries never wait past the current `deadline`: when the next delay would overrun it,
+    the last error is raised immediately so the caller is not parked.
+
+    Args:
+        upstream (str): The upstream name, selecting its circuit breaker.
+        operation (Callable[[], Awaitable[T]]): Makes one attempt; raises httpx errors on failure,
+            or `CallSkipped` if it gave up before reaching the upstream.
+        max_attempts (int): The maximum number of attempts.
+        retry_after (Callable[[Exception], Optional[float]]): Returns the delay the upstream asked for, if any.
+
+    Returns:
+        T: The result of the first successful attempt.
+
+    Raises:
+        CircuitOpenError: If the upstream's circuit breaker is open.
+        CallSkipped: If `operation` gave up before reaching the upstream; it is not retried.
+        Exception: The last error from `operation` if it is not transient or attempts run out.
+    """
+    breaker = circuit_breakers[upstream]
+    for attempt in range(max_attempts):
+        breaker.before_call()
+        try:
+            result = await operation()
+        except (asyncio.CancelledError, CallSkipped):
+            breaker.record_skipped()
+            raise
+        except Exception as e:
+            if is_upstream_failure(e):
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            if not is_transient(e) or attempt == max_attempts - 1:
+                raise
+            delay = retry_after(e)
+            delay = backoff_delay(attempt) if delay is None else delay
+            remaining = remaining_time()
+            if remaining is not None and delay >= remaining:
+                logger.warning("Not retrying %s request: %.2fs backoff exceeds the %.2fs left before the deadline", upstream, delay, remaining)
+                raise
+            logger.info("Retrying %s request in %.2f seconds (attempt %s/%s failed: %s)", upstream, delay, attempt + 1, max_attempts, e)
+            instrumentation.retried(upstream)
+            await asyncio.sleep(delay)
+        else:
+            breaker.record_success()
+            return result
+
+def stats() -> Dict:
+    """
+    Returns the state of every circuit breaker.
+    """
+    return {name: breaker.stats() for name, breaker in circuit_breakers.items()}
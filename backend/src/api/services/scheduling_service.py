@@ -1,66 +1,248 @@
 import asyncio
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+from uuid import UUID
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import sessionmaker
-from sqlmodel import select
-from ...core.database import engine
-from ...core.logging import logger
+from sqlmodel import select, update, or_, exists
+from ...core.config import settings
+from ...core.database import async_session_factory
+from ...core.logging import get_logger
+from ...core.instrumentation import SCHEDULER, instrumentation
 from ..models.post import Post
-from . import twitter_service
+from ..models.publish_attempt import PublishAttempt, PUBLISH_FAILED
+from . import publish_outbox
+from .leases import worker_id
+from .metrics_collector import metrics_collector
+from .post_dispatcher import PostDispatcher
+from .publishing_executor import PublishingExecutor
+from .resilience import deadline
 
-# Create a sessionmaker for the scheduler
-async_session = sessionmaker(
-    engine, class_=AsyncSession, expire_on_commit=False
-)
+logger = get_logger(__name__)
 
+# Time kept on the publishing lease after the publish deadline, for recording the result
+PUBLISH_LEASE_MARGIN_SECONDS = 30
+
+def _claimable(now: datetime):
+    """
+    Conditions for a post that is due, not leased by a live worker, and not waiting for
+    (or out of) publish retries in the outbox.
+    """
+    return (
+        Post.approved == True,
+        Post.is_posted == False,
+        Post.scheduled_at <= now,
+        or_(Post.claimed_by == None, Post.lease_expires_at < now),
+        ~exists().where(
+            PublishAttempt.post_id == Post.id,
+            or_(PublishAttempt.status == PUBLISH_FAILED, PublishAttempt.next_retry_at > now),
+        ),
+    )
+
+async def claim_due_posts(limit: int) -> List[Tuple[str, Optional[int]]]:
+    """
+    Claims up to `limit` due posts for this worker.
+
+    Candidate rows are locked with `FOR UPDATE SKIP LOCKED`, so concurrent workers claim
+    disjoint batches without waiting on each other. Posts whose lease has expired (their
+    worker crashed mid-publish) are claimable again.
+
+    Args:
+        limit (int): The maximum number of posts to claim.
+
+    Returns:
+        List[Tuple[str, Optional[int]]]: (post_id, agent_id) pairs of the claimed posts.
+    """
+    now = datetime.now(timezone.utc)
+    due = (
+        select(Post.id).where(*_claimable(now))
+        .order_by(Post.scheduled_at).limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    async with async_session_factory() as session:
+        result = await session.execute(
+            update(Post).where(Post.id.in_(due.scalar_subquery()))
+            .values(claimed_by=worker_id(), lease_expires_at=now + timedelta(seconds=settings.PUBLISH_LEASE_SECONDS))
+            .returning(Post.id, Post.agent_id)
+        )
+        claimed = [(str(post_id), agent_id) for post_id, agent_id in result.all()]
+        await session.commit()
+    return claimed
+
+async def claim_post(post_id: str) -> Optional[Tuple[str, Optional[int]]]:
+    """
+    Claims a single due post for this worker.
+
+    Args:
+        post_id (str): The ID of the post to claim.
+
+    Returns:
+        Optional[Tuple[str, Optional[int]]]: (post_id, agent_id), or None if the post is not
+        due or another worker holds its lease.
+    """
+    now = datetime.now(timezone.utc)
+    async with async_session_factory() as session:
+        result = await session.execute(
+            update(Post).where(Post.id == UUID(post_id), *_claimable(now))
+            .values(claimed_by=worker_id(), lease_expires_at=now + timedelta(seconds=settings.PUBLISH_LEASE_SECONDS))
+            .returning(Post.id, Post.agent_id)
+        )
+        row = result.first()
+        await session.commit()
+    return (str(row[0]), row[1]) if row else None
+
+async def _release_post(post_id: str, **values):
+    """
+    Clears this worker's lease on a post, applying any extra column values.
+    """
+    async with async_session_factory() as session:
+        await session.execute(
+            update(Post).where(Post.id == UUID(post_id), Post.claimed_by == worker_id())
+            .values(claimed_by=None, lease_expires_at=None, **values)
+        )
+        await session.commit()
+
+@instrumentation.timed(SCHEDULER, "publish")
+async def publish_scheduled_post(post_id: str):
+    """
+    Posts a single claimed post to Twitter through the publish outbox if it is still
+    approved, unposted and due.
+
+    The lease is renewed right before publishing and the post is read in the same statement;
+    if the lease was lost (it expired and another worker took the post) nothing is sent. No
+    database connection is held while waiting on the rate limiter or the Twitter API. The
+    publish must finish within the lease, so a rate limit that would not reset before it
+    lapses fails the attempt instead of waiting past it and letting another worker send the
+    post too. A failed attempt is put back in the dispatcher at the retry time recorded in
+    the outbox.
+
+    Args:
+        post_id (str): The ID of the post to publish.
+    """
+    now = datetime.now(timezone.utc)
+    async with async_session_factory() as session:
+        result = await session.execute(
+            update(Post).where(
+                Post.id == UUID(post_id), Post.claimed_by == worker_id(),
+                Post.approved == True, Post.is_posted == False, Post.scheduled_at <= now,
+            )
+            .values(lease_expires_at=now + timedelta(seconds=settings.PUBLISH_LEASE_SECONDS))
+            .returning(Post.content)
+        )
+        content = result.scalar_one_or_none()
+        await session.commit()
+    if content is None:
+        logger.info("Skipping dispatch of post ID %s: no longer pending or claimed by another worker", post_id)
+        await _release_post(post_id)
+        return
+    logger.info("Posting scheduled post with ID: %s", post_id)
+    try:
+        with deadline(max(settings.PUBLISH_LEASE_SECONDS - PUBLISH_LEASE_MARGIN_SECONDS, 1)):
+            await publish_outbox.publish_post(post_id, content)
+    except Exception:
+        await _release_post(post_id)
+        attempt = await publish_outbox.get_attempt(post_id)
+        if attempt and attempt.next_retry_at:
+            post_dispatcher.schedule(post_id, attempt.next_retry_at)
+        raise
+    # The outbox releases the lease together with marking the post as posted
+    logger.info("Successfully posted scheduled post with ID: %s", post_id)
+
+publishing_executor = PublishingExecutor(publish_scheduled_post, settings.PUBLISH_CONCURRENCY)
+
+async def enqueue_scheduled_post(post_id: str):
+    """
+    Claims a due post and queues it on its account's publishing queue.
+
+    Args:
+        post_id (str): The ID of the post to publish.
+    """
+    claimed = await claim_post(post_id)
+    if claimed is None:
+        logger.info("Post ID %s is not due or is claimed by another worker", post_id)
+        return
+    publishing_executor.submit(*claimed)
+
+post_dispatcher = PostDispatcher(enqueue_scheduled_post)
+
+@instrumentation.timed(SCHEDULER, "check_due")
 async def check_and_post_scheduled_posts():
     """
-    Checks for scheduled posts that are due and posts them to Twitter.
+    Claims scheduled posts that are due and queues them for publishing to Twitter.
+
+    Posts are claimed in batches of `PUBLISH_CLAIM_BATCH_SIZE` and the next batch is only
+    claimed once this worker has drained the previous one, so a backlog is split across
+    all running workers instead of being taken by whichever polls first.
     """
     logger.info("Checking for scheduled posts...")
-    async with async_session() as session:
+    while True:
         try:
-            now = datetime.now(timezone.utc)
-            result = await session.execute(
-                select(Post).where(Post.approved == True, Post.is_posted == False, Post.scheduled_at <= now)
-            )
-            posts_to_schedule = result.scalars().all()
-
-            if not posts_to_schedule:
-                logger.info("No scheduled posts to post.")
-                return
-
-            for post in posts_to_schedule:
-                try:
-                    logger.info(f"Posting scheduled post with ID: {post.id}")
-                    await twitter_service.schedule_post(post.content)
-                    post.is_posted = True
-                    session.add(post)
-                    logger.info(f"Successfully posted scheduled post with ID: {post.id}")
-                except Exception as e:
-                    logger.error(f"Failed to post scheduled post with ID {post.id}: {e}")
-
-            await session.commit()
+            claimed = await claim_due_posts(settings.PUBLISH_CLAIM_BATCH_SIZE)
         except Exception as e:
-            logger.error(f"An error occurred in check_and_post_scheduled_posts: {e}")
-            await session.rollback()
+            logger.error("An error occurred in check_and_post_scheduled_posts: %s", e)
+            return
+
+        if not claimed:
+            logger.info("No scheduled posts to post.")
+            return
+
+        queued = sum(publishing_executor.submit(post_id, agent_id) for post_id, agent_id in claimed)
+        logger.info("Claimed and queued %s scheduled posts for publishing", queued)
+        if len(claimed) < settings.PUBLISH_CLAIM_BATCH_SIZE:
+            return
+        await publishing_executor.join()
+
+@instrumentation.timed(SCHEDULER, "load_upcoming")
+async def load_upcoming_posts():
+    """
+    Loads approved, unposted posts scheduled within `SCHEDULER_HORIZON_MINUTES`, and publish
+    retries due in that window, into the dispatcher.
+    """
+    now = datetime.now(timezone.utc)
+    horizon = now + timedelta(minutes=settings.SCHEDULER_HORIZON_MINUTES)
+    async with async_session_factory() as session:
+        result = await session.execute(
+            select(Post.id, Post.scheduled_at).where(
+                Post.approved == True, Post.is_posted == False, Post.scheduled_at > now, Post.scheduled_at <= horizon
+            )
+        )
+        upcoming = [(str(post_id), scheduled_at) for post_id, scheduled_at in result.all()]
+    upcoming += await publish_outbox.pending_retries(horizon)
+    post_dispatcher.schedule_many(upcoming)
+    logger.info("Loaded %s upcoming scheduled posts into the dispatcher", len(upcoming))
+
+@instrumentation.timed(SCHEDULER, "reconcile")
+async def reconcile_scheduled_posts():
+    """
+    Safety net for the dispatcher: publishes overdue posts (approved by another worker or
+    missed during a restart) and loads posts that have come within the horizon.
+    """
+    await check_and_post_scheduled_posts()
+    try:
+        await load_upcoming_posts()
+    except Exception as e:
+        logger.error("An error occurred in reconcile_scheduled_posts: %s", e)
 
 scheduler = AsyncIOScheduler()
 
-def start_scheduler():
+async def start_scheduler():
     """
-    Starts the scheduler and adds the job to check for scheduled posts.
+    Loads upcoming posts into the dispatcher, starts it, and schedules the periodic reconciliation
+    pass and engagement metrics collection.
     """
     logger.info("Starting scheduler...")
-    scheduler.add_job(check_and_post_scheduled_posts, 'interval', minutes=1)
+    await reconcile_scheduled_posts()
+    post_dispatcher.start()
+    scheduler.add_job(reconcile_scheduled_posts, 'interval', minutes=settings.SCHEDULER_RECONCILE_INTERVAL_MINUTES)
+    scheduler.add_job(metrics_collector.run, 'interval', minutes=settings.METRICS_COLLECT_INTERVAL_MINUTES)
     scheduler.start()
     logger.info("Scheduler started.")
 
-def stop_scheduler():
+async def stop_scheduler():
     """
-    Stops the scheduler.
+    Stops the reconciliation scheduler, the dispatcher and the publishing workers.
     """
     logger.info("Stopping scheduler...")
     scheduler.shutdown()
+    await post_dispatcher.stop()
+    await publishing_executor.stop()
     logger.info("Scheduler stopped.")
@@ -0,0 +1,61 @@
+import asyncio
+from functools import partial
+from typing import Awaitable, Callable, Dict, TypeVar
+
+T = TypeVar("T")
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into a single upstream call.
+
+    The first caller for a key starts the call; callers arriving while it is in flight await
+    the same task and receive the same result or exception. A cancelled caller only stops
+    waiting: the shared call keeps running for the others and is cancelled only once every
+    caller has gone away.
+    """
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self.coalesced = 0
+
+    async def do(self, key: str, func: Callable[[], Awaitable[T]]) -> T:
+        """
+        Runs `func` for a key, or joins the call already in flight for that key.
+
+        Args:
+            key (str): Identifies equivalent calls.
+            func (Callable[[], Awaitable[T]]): Starts the upstream call; only invoked by the first caller.
+
+        Returns:
+            T: The result of the shared call.
+        """
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(func()))
+            self._calls[key] = call
+            call.task.add_done_callback(partial(self._forget, key, call))
+        else:
+            self.coalesced += 1
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                call.task.cancel()
+
+    def _forget(self, key: str, call: _Call, _task: asyncio.Task):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def stats(self) -> Dict:
+        """
+        Returns the number of calls currently in flight and the number of calls coalesced so far.
+        """
+        return {"in_flight": len(self._calls), "coalesced": self.coalesced}
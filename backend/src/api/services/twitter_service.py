@@ -1,19 +1,45 @@
 import asyncio
 import time
+from typing import Dict, List, Optional
 import httpx
-from ...core.logging import logger
-from ..api_config import MAX_RETRIES, INITIAL_BACKOFF, TWITTER_API_URL, get_twitter_oauth1_client
+from ...core.logging import get_logger
+from ...core.instrumentation import UPSTREAM, instrumentation
+from ..api_config import MAX_RETRIES, TWITTER_API_URL
 from ...core.config import settings
+from ...core.twitter_text import truncate
 from ..exceptions import TwitterAPIException
+from .http_clients import http_clients
+from .rate_limiter import TokenBucket, twitter_lookup_rate_limiter, twitter_rate_limiter
+from .resilience import TWITTER, CallSkipped, CircuitOpenError, backoff_delay, call_with_retries, remaining_time, request_timeout
 
-async def schedule_post(content: str):
+logger = get_logger(__name__)
+
+def _retry_after(e: Exception, limiter: TokenBucket = twitter_rate_limiter) -> Optional[float]:
+    """
+    Returns the wait Twitter asked for on a 429, and holds every caller of `limiter` for that long.
+    """
+    if isinstance(e, httpx.HTTPStatusError) and e.response.status_code == 429:
+        reset_time_str = e.response.headers.get("x-rate-limit-reset")
+        sleep_time = max(0, int(reset_time_str) - time.time()) if reset_time_str else backoff_delay(0)
+        logger.info("Rate limit exceeded. Retrying in %.2f seconds...", sleep_time)
+        limiter.block_for(sleep_time)
+        return sleep_time
+    return None
+
+async def schedule_post(content: str, max_retries: int = MAX_RETRIES):
     """
     Schedules a Twitter post using the Twitter API v2.
 
-    Includes a retry mechanism with exponential backoff for transient API errors.
+    Transient API errors are retried with jittered exponential backoff through the shared
+    resilience layer, behind the Twitter circuit breaker, and never past the caller's
+    deadline. Every attempt takes a token from the shared `twitter_rate_limiter`, which
+    follows the quota reported in Twitter's rate-limit headers, so a 429 holds back all
+    publishers until the window resets rather than each one retrying into it.
 
     Args:
         content (str): The text content of the tweet to be scheduled.
+        max_retries (int): The number of attempts to make. The publish outbox passes 1 and
+            schedules retries itself.
 
     Returns:
         dict: The JSON response from the Twitter API if successful.
@@ -21,52 +47,88 @@ async def schedule_post(content: str):
     Raises:
         TwitterAPIException: If the Twitter API request fails after multiple retries.
     """
-    client = get_twitter_oauth1_client()
-    for attempt in range(MAX_RETRIES):
+    client = http_clients.twitter
+    # Sanitize content for Twitter API
+    sanitized_content = content.replace("[link to website]", "https://example.com").strip()
+    sanitized_content = truncate(sanitized_content, settings.TWITTER_MAX_CHARS)
+    json_data = {"text": sanitized_content}
+
+    async def attempt():
+        logger.debug("Sending tweet of %d characters to Twitter API", len(sanitized_content))
+        remaining = remaining_time()
         try:
-            url = TWITTER_API_URL
-            # Sanitize content for Twitter API
-            sanitized_content = content.replace("[link to website]", "https://example.com").strip()
-            if len(sanitized_content) > settings.TWITTER_MAX_CHARS:
-                sanitized_content = sanitized_content[:settings.TWITTER_MAX_CHARS - 3] + "..." # Truncate and add ellipsis
-            json_data = {"text": sanitized_content}
-            logger.debug(f"Sending to Twitter API: {json_data}")
-            response = await client.post(url, json=json_data, timeout=settings.TWITTER_API_TIMEOUT)
+            if remaining is not None and twitter_rate_limiter.wait_time() > remaining:
+                raise asyncio.TimeoutError
+            await asyncio.wait_for(twitter_rate_limiter.acquire(), timeout=remaining)
+        except asyncio.TimeoutError:
+            raise CallSkipped("Twitter rate limit would not reset before the request deadline")
+        with instrumentation.timer(UPSTREAM, "twitter_post"):
+            response = await client.post(TWITTER_API_URL, json=json_data, timeout=request_timeout(settings.TWITTER_API_TIMEOUT))
+            twitter_rate_limiter.update_from_headers(response.headers)
             response.raise_for_status()
-            logger.info(f"Scheduled post: {content[:50]}...")
             return response.json()
-        except httpx.RequestError as e:
-            error_detail = f"Request error: {e}"
-            logger.warning(f"Twitter API request failed (attempt {attempt + 1}/{MAX_RETRIES}): {error_detail}")
-            if attempt < MAX_RETRIES - 1:
-                sleep_time = INITIAL_BACKOFF * (2 ** attempt)
-                logger.info(f"Retrying in {sleep_time} seconds...")
-                await asyncio.sleep(sleep_time)
-            else:
-                logger.error(f"Twitter API request failed after {MAX_RETRIES} attempts: {error_detail}")
-                raise TwitterAPIException(detail=f"Twitter API request failed: {error_detail}")
-        except httpx.HTTPStatusError as e:
-            error_detail = f"Status: {e.response.status_code}, Response: {e.response.text}"
-            logger.warning(f"Twitter API request failed (attempt {attempt + 1}/{MAX_RETRIES}): {error_detail}")
-            if attempt < MAX_RETRIES - 1:
-                if e.response.status_code == 429:
-                    reset_time_str = e.response.headers.get("x-rate-limit-reset")
-                    if reset_time_str:
-                        reset_time = int(reset_time_str)
-                        sleep_time = max(0, reset_time - time.time())
-                        logger.info(f"Rate limit exceeded. Retrying in {sleep_time:.2f} seconds...")
-                        await asyncio.sleep(sleep_time)
-                    else:
-                        sleep_time = INITIAL_BACKOFF * (2 ** attempt)
-                        logger.info(f"Rate limit reset time not available. Retrying in {sleep_time} seconds...")
-                        await asyncio.sleep(sleep_time)
-                else:
-                    sleep_time = INITIAL_BACKOFF * (2 ** attempt)
-                    logger.info(f"Retrying in {sleep_time} seconds...")
-                    await asyncio.sleep(sleep_time)
-            else:
-                logger.error(f"Twitter API request failed after {MAX_RETRIES} attempts: {error_detail}")
-                raise TwitterAPIException(detail=f"Twitter API request failed: {error_detail}", status_code=e.response.status_code)
-        except Exception as e:
-            logger.error(f"Unexpected error in Twitter scheduling: {str(e)}")
-            raise TwitterAPIException(detail=f"Unexpected error during Twitter scheduling: {str(e)}")
\ No newline at end of file
+
+    try:
+        result = await call_with_retries(TWITTER, attempt, max_retries, retry_after=_retry_after)
+        logger.info("Scheduled post: %s...", content[:50])
+        return result
+    except TwitterAPIException:
+        raise
+    except CallSkipped as e:
+        raise TwitterAPIException(detail=str(e), status_code=429)
+    except CircuitOpenError as e:
+        raise TwitterAPIException(detail=f"Twitter API temporarily unavailable: {e}", status_code=503)
+    except httpx.RequestError as e:
+        error_detail = f"Request error: {e}"
+        logger.error("Twitter API request failed: %s", error_detail)
+        raise TwitterAPIException(detail=f"Twitter API request failed: {error_detail}")
+    except httpx.HTTPStatusError as e:
+        error_detail = f"Status: {e.response.status_code}, Response: {e.response.text}"
+        logger.error("Twitter API request failed: %s", error_detail)
+        raise TwitterAPIException(detail=f"Twitter API request failed: {error_detail}", status_code=e.response.status_code)
+    except Exception as e:
+        logger.error("Unexpected error in Twitter scheduling: %s", e)
+        raise TwitterAPIException(detail=f"Unexpected error during Twitter scheduling: {str(e)}")
+
+# Maximum number of tweet IDs per lookup request allowed by the Twitter API
+LOOKUP_BATCH_SIZE = 100
+
+async def lookup_public_metrics(tweet_ids: List[str]) -> Dict[str, Dict[str, int]]:
+    """
+    Looks up the public engagement metrics of up to `LOOKUP_BATCH_SIZE` tweets in one request.
+
+    Lookups take tokens from `twitter_lookup_rate_limiter`, not from the posting quota, and go
+    through the Twitter circuit breaker with the shared retry policy.
+
+    Args:
+        tweet_ids (List[str]): The IDs of the tweets to look up.
+
+    Returns:
+        Dict[str, Dict[str, int]]: The `public_metrics` object of each tweet found, by tweet ID.
+            Deleted or protected tweets are left out.
+
+    Raises:
+        TwitterAPIException: If the lookup fails after retries or the circuit breaker is open.
+    """
+    if len(tweet_ids) > LOOKUP_BATCH_SIZE:
+        raise ValueError(f"At most {LOOKUP_BATCH_SIZE} tweet IDs can be looked up per request")
+    client = http_clients.twitter
+    params = {"ids": ",".join(tweet_ids), "tweet.fields": "public_metrics"}
+
+    async def attempt():
+        await twitter_lookup_rate_limiter.acquire()
+        with instrumentation.timer(UPSTREAM, "twitter_lookup"):
+            response = await client.get(TWITTER_API_URL, params=params, timeout=request_timeout(settings.TWITTER_API_TIMEOUT))
+            twitter_lookup_rate_limiter.update_from_headers(response.headers)
+            response.raise_for_status()
+            return response.json()
+
+    try:
+        result = await call_with_retries(TWITTER, attempt, MAX_RETRIES, retry_after=lambda e: _retry_after(e, twitter_lookup_rate_limiter))
+    except CircuitOpenError as e:
+        raise TwitterAPIException(detail=f"Twitter API temporarily unavailable: {e}", status_code=503)
+    except httpx.RequestError as e:
+        raise TwitterAPIException(detail=f"Twitter metrics lookup failed: Request error: {e}")
+    except httpx.HTTPStatusError as e:
+        raise TwitterAPIException(detail=f"Twitter metrics lookup failed: Status: {e.response.status_code}, Response: {e.response.text}", status_code=e.response.status_code)
+    return {tweet["id"]: tweet.get("public_metrics", {}) for tweet in result.get("data", [])}
@@ -1,3 +1,4 @@
+from typing import Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
@@ -9,11 +10,31 @@ class Settings(BaseSettings):
     DATABASE_URL: str
     CORS_ORIGINS: str = "*"
     DATABASE_ECHO: bool = False
-    LOG_LEVEL: str = "DEBUG"
+    DB_SCHEMA_MODE: str = "check"
+    DATABASE_POOL_SIZE: int = 10
+    DATABASE_MAX_OVERFLOW: int = 10
+    DATABASE_POOL_TIMEOUT_SECONDS: float = 30.0
+    DATABASE_POOL_RECYCLE_SECONDS: int = 1800
+    DATABASE_POOL_PRE_PING: bool = True
+    DATABASE_STATEMENT_CACHE_SIZE: int = 100
+    LOG_LEVEL: str = "INFO"
+    LOG_LEVELS: str = "httpx=WARNING"
+    LOG_JSON: bool = False
+    INSTRUMENTATION_ENABLED: bool = True
+    TRACING_ENABLED: bool = False
+    TRACING_EXPORTER: str = "otlp"
+    TRACING_SAMPLE_RATIO: float = 0.1
+    TRACING_SERVICE_NAME: str = "esma-backend"
     GEMINI_API_BASE_URL: str = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent"
+    GEMINI_API_STREAM_URL: str = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:streamGenerateContent"
     TWITTER_API_BASE_URL: str = "https://api.twitter.com/2/tweets"
     MAX_RETRIES: int = 3
     INITIAL_BACKOFF: int = 1
+    RETRY_MAX_BACKOFF_SECONDS: float = 30.0
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD: int = 5
+    CIRCUIT_BREAKER_RESET_SECONDS: float = 30.0
+    GENERATION_DEADLINE_SECONDS: float = 30.0
+    POST_NOW_DEADLINE_SECONDS: float = 15.0
     BRAND_NAME: str = "Your E-commerce Brand"
     AUDIENCE_DESCRIPTION: str = "online shoppers"
     UNIQUE_BENEFIT: str = "unbeatable quality"
@@ -21,6 +42,46 @@ class Settings(BaseSettings):
     GEMINI_API_TIMEOUT: int = 10
     TWITTER_API_TIMEOUT: int = 10
     TWITTER_MAX_CHARS: int = 280
+    TWITTER_RATE_LIMIT_REQUESTS: int = 200
+    TWITTER_RATE_LIMIT_WINDOW_SECONDS: int = 900
+    PUBLISH_CONCURRENCY: int = 4
+    PUBLISH_CLAIM_BATCH_SIZE: int = 50
+    PUBLISH_LEASE_SECONDS: int = 600
+    PUBLISH_MAX_ATTEMPTS: int = 5
+    PUBLISH_RETRY_BASE_SECONDS: int = 60
+    PUBLISH_RETRY_MAX_SECONDS: int = 3600
+    WORKER_ID: Optional[str] = None
+    MAX_REPAIR_ATTEMPTS: int = 2
+    SCHEDULER_RECONCILE_INTERVAL_MINUTES: int = 5
+    SCHEDULER_HORIZON_MINUTES: int = 1440
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0
+    HTTP2_ENABLED: bool = True
+    GENERATION_CONCURRENCY: int = 5
+    GENERATION_BATCH_MAX_SIZE: int = 100
+    GENERATION_JOB_WORKERS: int = 4
+    GENERATION_JOB_QUEUE_MAX: int = 1000
+    GENERATION_JOB_LEASE_SECONDS: int = 120
+    GENERATION_JOB_MAX_ATTEMPTS: int = 3
+    GENERATION_JOB_RECOVER_INTERVAL_SECONDS: int = 60
+    GENERATION_JOB_RETENTION_HOURS: int = 24
+    GENERATION_JOB_MAX_WAIT_SECONDS: int = 30
+    GENERATION_JOB_POLL_INTERVAL_SECONDS: float = 1.0
+    GENERATION_CACHE_BACKEND: str = "memory"
+    GENERATION_CACHE_MAX_ENTRIES: int = 1024
+    GENERATION_CACHE_TTL_SECONDS: int = 86400
+    GENERATION_CACHE_PATH: str = "generation_cache.sqlite3"
+    METRICS_SOURCE: str = "twitter"
+    METRICS_COLLECT_INTERVAL_MINUTES: int = 15
+    METRICS_COLLECT_MAX_TWEETS: int = 1000
+    METRICS_MAX_AGE_DAYS: int = 30
+    ANALYTICS_CACHE_TTL_SECONDS: int = 60
+    ANALYTICS_CACHE_MAX_AGE_SECONDS: int = 15
+    TWITTER_LOOKUP_RATE_LIMIT_REQUESTS: int = 15
+    TWITTER_LOOKUP_RATE_LIMIT_WINDOW_SECONDS: int = 900
+    POSTS_PAGE_DEFAULT_LIMIT: int = 100
+    POSTS_PAGE_MAX_LIMIT: int = 500
 
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
 
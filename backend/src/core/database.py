@@ -1,15 +1,106 @@
-from typing import AsyncGenerator
+import time
+from collections import deque
+from typing import AsyncGenerator, Dict
 
-from sqlmodel import SQLModel, create_engine
+from sqlmodel import SQLModel
 from sqlmodel.ext.asyncio.session import AsyncSession
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from .config import settings
-from .logging import logger
+from .logging import get_logger
+
+logger = get_logger(__name__)
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Connection pool that records how long each checkout takes, including waiting for a free
+    connection, opening a new one and the pre-ping, and how many checkouts timed out.
+    """
+    # Number of recent checkout times kept for the percentiles
+    WAIT_SAMPLES = 1024
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.max_checked_out = 0
+        self._waits = deque(maxlen=self.WAIT_SAMPLES)
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except PoolTimeoutError:
+            self.timeouts += 1
+            logger.warning("Database pool exhausted: %s connections checked out, timed out after %ss", self.checkedout(), self._timeout)
+            raise
+        self._waits.append(time.perf_counter() - start)
+        self.checkouts += 1
+        self.max_checked_out = max(self.max_checked_out, self.checkedout())
+        return connection
+
+    def stats(self) -> Dict:
+        """
+        Returns the pool occupancy and checkout wait times in milliseconds.
+        """
+        capacity = self.size() + max(0, self._max_overflow)
+        waits = sorted(self._waits)
+        def percentile(p: float) -> float:
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))] * 1000, 2) if waits else 0.0
+        return {
+            "pool_size": self.size(),
+            "max_overflow": self._max_overflow,
+            "checked_out": self.checkedout(),
+            "idle": self.checkedin(),
+            "overflow": max(0, self.overflow()),
+            "saturation": round(self.checkedout() / capacity, 3) if capacity else 0.0,
+            "max_checked_out": self.max_checked_out,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "checkout_wait_ms": {"p50": percentile(0.5), "p95": percentile(0.95), "max": percentile(1.0)},
+        }
+
+def engine_options(url: str) -> Dict:
+    """
+    Returns the `create_async_engine` pool and driver options for a database URL.
+
+    Args:
+        url (str): The database URL.
+
+    Returns:
+        Dict: Keyword arguments for `create_async_engine`.
+    """
+    database_url = make_url(url)
+    if database_url.get_backend_name() == "sqlite" and database_url.database in (None, "", ":memory:"):
+        # In-memory SQLite needs its single static connection
+        return {}
+    options = {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": settings.DATABASE_POOL_SIZE,
+        "max_overflow": settings.DATABASE_MAX_OVERFLOW,
+        "pool_timeout": settings.DATABASE_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": settings.DATABASE_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": settings.DATABASE_POOL_PRE_PING,
+    }
+    if database_url.get_driver_name() == "asyncpg":
+        # SQLAlchemy's prepared statement cache and asyncpg's own statement cache; both must be 0
+        # behind a transaction-pooling PgBouncer
+        options["connect_args"] = {
+            "prepared_statement_cache_size": settings.DATABASE_STATEMENT_CACHE_SIZE,
+            "statement_cache_size": settings.DATABASE_STATEMENT_CACHE_SIZE,
+        }
+    return options
 
 # Use create_async_engine for async database operations
-engine = create_async_engine(settings.DATABASE_URL, echo=settings.DATABASE_ECHO, future=True)
+engine = create_async_engine(
+    settings.DATABASE_URL, echo=settings.DATABASE_ECHO, future=True, **engine_options(settings.DATABASE_URL)
+)
+
+# The session factory shared by the request handlers, the scheduler and the outbox
+async_session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
 async def create_db_and_tables():
     """
@@ -23,11 +114,17 @@ async def create_db_and_tables():
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
     """
     Provides an asynchronous session for database interactions.
+    Commits after the handler only if it left a transaction open; storage writes commit themselves.
     """
-    async_session = sessionmaker(
-        engine, class_=AsyncSession, expire_on_commit=False
-    )
-    async with async_session() as session:
+    async with async_session_factory() as session:
         yield session
-        await session.commit()
-        logger.debug("Database session committed.")
+        if session.in_transaction():
+            await session.commit()
+            logger.debug("Database session committed.")
+
+def pool_stats() -> Dict:
+    """
+    Returns the connection pool occupancy and checkout wait times, if the pool is instrumented.
+    """
+    pool = engine.sync_engine.pool
+    return pool.stats() if isinstance(pool, InstrumentedQueuePool) else {"pool": type(pool).__name__}
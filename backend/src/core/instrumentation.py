@@ -0,0 +1,178 @@
+import asyncio
+import functools
+import os
+import time
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
+from .config import settings
+from .logging import get_logger
+
+logger = get_logger(__name__)
+
+F = TypeVar("F", bound=Callable)
+
+# Components of the `stage` label values
+NODE = "node"
+WORKFLOW = "workflow"
+UPSTREAM = "upstream"
+STORAGE = "storage"
+SCHEDULER = "scheduler"
+JOB = "job"
+
+OK = "ok"
+ERROR = "error"
+CANCELLED = "cancelled"
+
+# Histogram buckets in seconds: sub-millisecond storage reads up to slow upstream calls
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+class _NoopTimer:
+    """
+    Timer returned while instrumentation is disabled; entering and leaving it does nothing.
+    """
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NOOP_TIMER = _NoopTimer()
+
+class _Timer:
+    __slots__ = ("_instrumentation", "_labels", "_start")
+
+    def __init__(self, instrumentation: "Instrumentation", labels: Tuple[str, str]):
+        self._instrumentation = instrumentation
+        self._labels = labels
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            outcome = OK
+        elif issubclass(exc_type, asyncio.CancelledError):
+            outcome = CANCELLED
+        else:
+            outcome = ERROR
+        self._instrumentation.observe(*self._labels, time.perf_counter() - self._start, outcome)
+        return False
+
+class Instrumentation:
+    """
+    Latency histograms and counters for the hot paths, exported in the Prometheus text format.
+
+    Every timed stage is one series of `esma_stage_duration_seconds`, labelled with its
+    component (node, workflow, upstream, storage, scheduler, job), stage name and outcome, so the
+    histogram's `_count` doubles as the call and error counter. Upstream retries are counted
+    separately in `esma_upstream_retries_total`.
+
+    When disabled, or when `prometheus_client` is not installed, `timed` returns functions
+    unchanged and `timer` returns a shared no-op context manager, so instrumented code pays
+    nothing beyond one attribute check.
+    """
+    def __init__(self, enabled: bool):
+        self.enabled = False
+        self.registry = None
+        # Histogram children by label values, skipping prometheus_client's locked label lookup
+        self._series: Dict[Tuple[str, str, str], Any] = {}
+        if not enabled:
+            return
+        try:
+            import prometheus_client
+        except ImportError:
+            logger.warning("INSTRUMENTATION_ENABLED is set but prometheus_client is not installed; instrumentation is disabled")
+            return
+        self._prometheus = prometheus_client
+        self.registry = prometheus_client.CollectorRegistry()
+        self._durations = prometheus_client.Histogram(
+            "esma_stage_duration_seconds", "Duration of an instrumented stage.",
+            ["component", "stage", "outcome"], buckets=DURATION_BUCKETS, registry=self.registry,
+        )
+        self._retries = prometheus_client.Counter(
+            "esma_upstream_retries_total", "Upstream requests retried after a transient failure.",
+            ["upstream"], registry=self.registry,
+        )
+        self.enabled = True
+
+    def observe(self, component: str, stage: str, seconds: float, outcome: str = OK):
+        """
+        Records the duration of one run of a stage.
+
+        Args:
+            component (str): The component the stage belongs to, e.g. `UPSTREAM`.
+            stage (str): The stage name within the component.
+            seconds (float): How long the stage took.
+            outcome (str): `OK`, `ERROR` or `CANCELLED`.
+        """
+        if self.enabled:
+            labels = (component, stage, outcome)
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = self._durations.labels(*labels)
+            series.observe(seconds)
+
+    def retried(self, upstream: str):
+        """
+        Counts one retry of an upstream request.
+        """
+        if self.enabled:
+            self._retries.labels(upstream).inc()
+
+    def timer(self, component: str, stage: str):
+        """
+        Returns a context manager that records the duration of its block. The outcome is
+        `ERROR` if the block raises and `CANCELLED` if it is cancelled.
+        """
+        if not self.enabled:
+            return _NOOP_TIMER
+        return _Timer(self, (component, stage))
+
+    def timed(self, component: str, stage: str) -> Callable[[F], F]:
+        """
+        Decorator recording the duration of every call of a function or coroutine function.
+
+        Args:
+            component (str): The component the stage belongs to, e.g. `STORAGE`.
+            stage (str): The stage name within the component.
+
+        Returns:
+            Callable[[F], F]: The decorator. It returns the function itself while instrumentation is disabled.
+        """
+        def decorate(func: F) -> F:
+            if not self.enabled:
+                return func
+            if asyncio.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    with _Timer(self, (component, stage)):
+                        return await func(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with _Timer(self, (component, stage)):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def exposition(self) -> Optional[Tuple[bytes, str]]:
+        """
+        Renders the current values in the Prometheus text format.
+
+        When `PROMETHEUS_MULTIPROC_DIR` is set (several Gunicorn workers), the values of
+        every worker are read from that directory and merged.
+
+        Returns:
+            Optional[Tuple[bytes, str]]: The body and its content type, or None if instrumentation is disabled.
+        """
+        if not self.enabled:
+            return None
+        registry = self.registry
+        if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+            from prometheus_client import multiprocess
+            registry = self._prometheus.CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        return self._prometheus.generate_latest(registry), self._prometheus.CONTENT_TYPE_LATEST
+
+instrumentation = Instrumentation(settings.INSTRUMENTATION_ENABLED)
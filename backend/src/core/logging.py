@@ -1,9 +1,154 @@
+import atexit
+import json
 import logging
+import queue
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, TextIO
 from .config import settings
 
-logging.basicConfig(
-    level=settings.LOG_LEVEL,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+# Used instead of LOG_FORMAT for records carrying trace context (see `core.tracing`)
+TRACE_LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - [trace_id=%(trace_id)s span_id=%(span_id)s] - %(message)s"
 
-logger = logging.getLogger("ESMA")
+# Parent of the application's module loggers
+ROOT_LOGGER = "ESMA"
+
+# The writer thread started by `configure_logging`
+_listener: Optional[QueueListener] = None
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+class TextFormatter(logging.Formatter):
+    """
+    Formats records with `LOG_FORMAT`, or `TRACE_LOG_FORMAT` when they carry a trace ID.
+    """
+    def __init__(self):
+        super().__init__(LOG_FORMAT)
+        self._trace_style = logging.PercentStyle(TRACE_LOG_FORMAT)
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        if hasattr(record, "trace_id"):
+            return self._trace_style.format(record)
+        return super().formatMessage(record)
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats each record as one JSON object per line: timestamp, level, logger, message,
+    the exception if any, and every field passed through `extra` (including the trace IDs).
+    """
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+class _QueueHandler(QueueHandler):
+    """
+    Hands records to the listener thread.
+
+    The message is merged with its arguments here, while the arguments still have the
+    values they had when the call was made, but the record keeps its fields for the
+    formatter. Records below the logger's level never reach this handler, so their
+    arguments are never formatted.
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+def parse_levels(levels: str) -> Dict[str, str]:
+    """
+    Parses `LOG_LEVELS`, e.g. "ESMA.scheduling_service=DEBUG,sqlalchemy.engine=INFO".
+
+    Args:
+        levels (str): Comma-separated `logger=LEVEL` pairs.
+
+    Returns:
+        Dict[str, str]: The level of each logger.
+
+    Raises:
+        ValueError: If a pair is malformed or names an unknown level.
+    """
+    parsed = {}
+    for pair in filter(None, (item.strip() for item in levels.split(","))):
+        name, separator, level = pair.partition("=")
+        level = level.strip().upper()
+        if not separator or not name.strip() or not isinstance(logging.getLevelName(level), int):
+            raise ValueError(f"Invalid LOG_LEVELS entry: {pair!r}")
+        parsed[name.strip()] = level
+    return parsed
+
+def configure_logging(stream: TextIO = sys.stderr) -> QueueListener:
+    """
+    Routes every record through a queue to a listener thread that formats and writes it to
+    `stream`, so the event loop never blocks on log I/O.
+
+    The root level is `LOG_LEVEL` and `LOG_LEVELS` overrides it per logger. Output is one
+    line of text per record, or one JSON object per record with `LOG_JSON`.
+
+    Args:
+        stream (TextIO): Where the listener writes; stderr by default.
+
+    Returns:
+        QueueListener: The started listener. It replaces the one started by a previous call
+        and is stopped, after writing the records still queued, by `stop_logging` or at exit.
+    """
+    global _listener
+    stop_logging()
+    stream_handler = logging.StreamHandler(stream)
+    stream_handler.setFormatter(JsonFormatter() if settings.LOG_JSON else TextFormatter())
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(_QueueHandler(log_queue))
+    root.setLevel(settings.LOG_LEVEL.upper())
+    for name, level in parse_levels(settings.LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+
+    listener.start()
+    _listener = listener
+    return listener
+
+def stop_logging():
+    """
+    Writes the records still queued and stops the writer thread.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+def get_logger(name: str) -> logging.Logger:
+    """
+    Returns the logger of an application module, named after the module under `ROOT_LOGGER`
+    (e.g. "ESMA.twitter_service"), so its level can be set on its own through `LOG_LEVELS`.
+
+    Args:
+        name (str): The module's `__name__`.
+    """
+    return logging.getLogger(f"{ROOT_LOGGER}.{name.rsplit('.', 1)[-1]}")
+
+configure_logging()
+atexit.register(stop_logging)
+
+logger = logging.getLogger(ROOT_LOGGER)
@@ -0,0 +1,79 @@
+import asyncio
+from pathlib import Path
+from typing import Optional
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+
+from .config import settings
+from .database import create_db_and_tables, engine
+from .logging import get_logger
+
+logger = get_logger(__name__)
+
+MIGRATIONS_PATH = Path(__file__).resolve().parents[1] / "migrations"
+
+SCHEMA_CHECK = "check"
+SCHEMA_UPGRADE = "upgrade"
+SCHEMA_CREATE_ALL = "create_all"
+SCHEMA_SKIP = "skip"
+
+def alembic_config() -> Config:
+    """
+    Returns the Alembic configuration for the migrations shipped with the application,
+    independent of the working directory and of `alembic.ini`.
+    """
+    config = Config()
+    config.set_main_option("script_location", str(MIGRATIONS_PATH))
+    # The application has already configured logging
+    config.attributes["configure_logger"] = False
+    return config
+
+def head_revision() -> Optional[str]:
+    """
+    Returns the latest migration revision. Reads the migration scripts only, no database access.
+    """
+    return ScriptDirectory.from_config(alembic_config()).get_current_head()
+
+async def current_revision() -> Optional[str]:
+    """
+    Returns the revision the database is at, or None if it has never been migrated.
+    """
+    async with engine.connect() as conn:
+        return await conn.run_sync(lambda sync_conn: MigrationContext.configure(sync_conn).get_current_revision())
+
+async def ensure_schema():
+    """
+    Makes sure the database schema is usable at startup, according to `DB_SCHEMA_MODE`:
+
+    - `check` (default): reads the stored revision (a single query) and refuses to start if it
+      is not the latest one. Migrations are applied beforehand with `alembic upgrade head`.
+    - `upgrade`: applies any pending migrations, serialised across processes on PostgreSQL.
+    - `create_all`: creates missing tables from the models, for throwaway databases.
+    - `skip`: does nothing.
+
+    Raises:
+        RuntimeError: In `check` mode, if the database is not at the latest revision.
+        ValueError: If `DB_SCHEMA_MODE` is not one of the modes above.
+    """
+    mode = settings.DB_SCHEMA_MODE
+    if mode == SCHEMA_SKIP:
+        return
+    if mode == SCHEMA_CREATE_ALL:
+        await create_db_and_tables()
+        return
+    if mode == SCHEMA_UPGRADE:
+        await asyncio.to_thread(command.upgrade, alembic_config(), "head")
+        logger.info("Database schema upgraded to revision %s.", head_revision())
+        return
+    if mode != SCHEMA_CHECK:
+        raise ValueError(f"Invalid DB_SCHEMA_MODE {mode!r}, expected one of: check, upgrade, create_all, skip")
+    head = head_revision()
+    current = await current_revision()
+    if current != head:
+        raise RuntimeError(
+            f"Database schema is at revision {current}, expected {head}. "
+            "Run `alembic upgrade head` from the backend directory (or set DB_SCHEMA_MODE=upgrade)."
+        )
+    logger.info("Database schema is at revision %s.", head)
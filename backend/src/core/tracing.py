@@ -0,0 +1,182 @@
+import asyncio
+import functools
+import logging
+import re
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, TypeVar
+from .config import settings
+from .logging import get_logger
+
+logger = get_logger(__name__)
+
+F = TypeVar("F", bound=Callable)
+
+# Query parameters whose values must not reach the tracing backend (the Gemini API key)
+_SECRET_QUERY_PARAMS = re.compile(r"([?&](?:key|access_token)=)[^&#]*")
+
+def redact_url(url: str) -> str:
+    """
+    Replaces the values of secret query parameters in a URL.
+    """
+    return _SECRET_QUERY_PARAMS.sub(r"\1REDACTED", url)
+
+async def _redact_request_url(span, request):
+    # httpx request hook: the instrumentation records the full URL, including the API key
+    if span.is_recording():
+        for attribute in ("http.url", "url.full"):
+            if attribute in span.attributes:
+                span.set_attribute(attribute, redact_url(span.attributes[attribute]))
+
+class TraceContextFilter(logging.Filter):
+    """
+    Adds the current trace and span IDs to log records as `trace_id` and `span_id`
+    ("-" outside a span), so log lines can be joined with their trace.
+    """
+    def filter(self, record: logging.LogRecord) -> bool:
+        from opentelemetry import trace
+        context = trace.get_current_span().get_span_context()
+        if context.is_valid:
+            record.trace_id = format(context.trace_id, "032x")
+            record.span_id = format(context.span_id, "016x")
+        else:
+            record.trace_id = record.span_id = "-"
+        return True
+
+class Tracing:
+    """
+    Optional OpenTelemetry tracing of requests, langgraph nodes, upstream calls and SQL.
+
+    The tracer provider samples `sample_ratio` of new traces; child spans follow their
+    parent's decision, so a trace is either recorded whole or not at all. Spans go to the
+    exporter selected by `TRACING_EXPORTER`: "otlp" (configured through the standard
+    `OTEL_EXPORTER_OTLP_*` variables), "console", or "memory" for tests. `instrument` adds
+    spans for the FastAPI routes, every httpx client (Gemini and Twitter calls) and every
+    SQL statement, and the trace ID to log lines.
+
+    The OpenTelemetry packages are imported only when enabled. When disabled, or when they
+    are not installed, `traced` returns functions unchanged and `span` does nothing.
+    """
+    def __init__(self, enabled: bool, exporter: str, sample_ratio: float):
+        self.enabled = False
+        self.memory_exporter = None
+        self._provider = None
+        self._tracer = None
+        if not enabled:
+            return
+        try:
+            from opentelemetry import trace
+            from opentelemetry.sdk.resources import SERVICE_NAME, Resource
+            from opentelemetry.sdk.trace import TracerProvider
+            from opentelemetry.sdk.trace.export import BatchSpanProcessor, SimpleSpanProcessor
+            from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+        except ImportError:
+            logger.warning("TRACING_ENABLED is set but the OpenTelemetry SDK is not installed; tracing is disabled")
+            return
+        provider = TracerProvider(
+            resource=Resource.create({SERVICE_NAME: settings.TRACING_SERVICE_NAME}),
+            sampler=ParentBased(TraceIdRatioBased(sample_ratio)),
+        )
+        exporter = exporter.lower()
+        if exporter == "otlp":
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+            provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+        elif exporter == "console":
+            from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+            provider.add_span_processor(SimpleSpanProcessor(ConsoleSpanExporter()))
+        elif exporter == "memory":
+            from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+            self.memory_exporter = InMemorySpanExporter()
+            provider.add_span_processor(SimpleSpanProcessor(self.memory_exporter))
+        else:
+            raise ValueError(f"Unknown TRACING_EXPORTER: {exporter}")
+        trace.set_tracer_provider(provider)
+        self._provider = provider
+        self._tracer = trace.get_tracer("esma")
+        self.enabled = True
+        logger.info("Tracing enabled: %s exporter, sampling %.0f%% of traces", exporter, sample_ratio * 100)
+
+    def instrument(self, app, engine):
+        """
+        Adds spans for the app's routes, outgoing httpx requests and the engine's SQL
+        statements, and the trace and span IDs to every log line. Must be called before
+        the app starts and before the HTTP clients are opened.
+
+        Args:
+            app (FastAPI): The application whose routes are traced.
+            engine (AsyncEngine): The engine whose statements are traced.
+        """
+        if not self.enabled:
+            return
+        try:
+            from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+            from opentelemetry.instrumentation.httpx import HTTPXClientInstrumentor
+            from opentelemetry.instrumentation.sqlalchemy import SQLAlchemyInstrumentor
+        except ImportError as e:
+            logger.warning("OpenTelemetry instrumentation is not installed (%s); only graph node spans are recorded", e)
+            return
+        FastAPIInstrumentor.instrument_app(app, tracer_provider=self._provider)
+        HTTPXClientInstrumentor().instrument(tracer_provider=self._provider, async_request_hook=_redact_request_url)
+        # The engine event hooks it relies on are stable across SQLAlchemy 2.x; its declared version range lags behind
+        SQLAlchemyInstrumentor().instrument(engine=engine.sync_engine, tracer_provider=self._provider, skip_dep_check=True)
+
+        # Runs in the calling thread, before the record is queued for the writer thread
+        trace_filter = TraceContextFilter()
+        for handler in logging.getLogger().handlers:
+            handler.addFilter(trace_filter)
+
+    def shutdown(self):
+        """
+        Exports the spans still buffered and stops the exporter.
+        """
+        if self._provider is not None:
+            self._provider.shutdown()
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[None]:
+        """
+        Runs the block in a child span of the current span.
+
+        Args:
+            name (str): The span name.
+            **attributes: Attributes set on the span.
+        """
+        if not self.enabled:
+            yield
+            return
+        with self._tracer.start_as_current_span(name, attributes=attributes):
+            yield
+
+    def traced(self, name: str) -> Callable[[F], F]:
+        """
+        Decorator running every call of a function or coroutine function in its own span.
+
+        Args:
+            name (str): The span name.
+
+        Returns:
+            Callable[[F], F]: The decorator. It returns the function itself while tracing is disabled.
+        """
+        def decorate(func: F) -> F:
+            if not self.enabled:
+                return func
+            if asyncio.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    with self._tracer.start_as_current_span(name):
+                        return await func(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self._tracer.start_as_current_span(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def finished_spans(self) -> List:
+        """
+        Returns the spans exported so far by the "memory" exporter, for tests.
+        """
+        return list(self.memory_exporter.get_finished_spans()) if self.memory_exporter is not None else []
+
+tracing = Tracing(settings.TRACING_ENABLED, settings.TRACING_EXPORTER, settings.TRACING_SAMPLE_RATIO)
@@ -0,0 +1,145 @@
+"""
+Twitter-accurate weighted tweet length.
+
+Implements the counting rules of twitter-text v3 that matter for our posts: text is NFC
+normalized, URLs count as 23 characters, code points in the Latin/general punctuation ranges
+count as 1 and every other code point (CJK, most symbols) counts as 2, and each emoji
+sequence (including ZWJ sequences, skin tones, flags and keycaps) counts as 2 in total.
+"""
+import re
+import unicodedata
+from typing import List, Tuple
+from .config import settings
+
+URL_LENGTH = 23
+
+# Code point ranges weighted 1; everything else is weighted 2
+_LIGHT_RANGES = "\u0000-\u10ff\u2000-\u200d\u2010-\u201f\u2032-\u2037"
+_HEAVY_PATTERN = re.compile(f"[^{_LIGHT_RANGES}]")
+
+# Characters that extend the preceding grapheme: combining marks, variation selectors,
+# emoji skin-tone modifiers and tag characters
+_EXTEND = (
+    "\u0300-\u036f\u0483-\u0489\u0591-\u05bd\u0610-\u061a\u064b-\u065f\u0e31\u0e34-\u0e3a\u0e47-\u0e4e"
+    "\u1ab0-\u1aff\u1dc0-\u1dff\u200c\u20d0-\u20ff\ufe00-\ufe0f\ufe20-\ufe2f"
+    "\U0001f3fb-\U0001f3ff\U000e0020-\U000e007f\U000e0100-\U000e01ef"
+)
+_GRAPHEME_PATTERN = re.compile(
+    f"\r\n|[\U0001f1e6-\U0001f1ff]{{2}}|[^{_EXTEND}][{_EXTEND}]*(?:\u200d[^{_EXTEND}][{_EXTEND}]*)*|[{_EXTEND}]+",
+    re.DOTALL,
+)
+
+_EMOJI_BASE = "\u2190-\u21ff\u2300-\u23ff\u2600-\u27bf\u2b00-\u2bff\U0001f000-\U0001faff"
+_EMOJI_PATTERN = re.compile(
+    f"[\U0001f1e6-\U0001f1ff]{{2}}"
+    f"|[#*0-9]\ufe0f?\u20e3"
+    f"|(?:[{_EMOJI_BASE}]|[\u00a9\u00ae\u203c\u2049\u2122\u2139]\ufe0f)[{_EXTEND}]*"
+    f"(?:\u200d[{_EMOJI_BASE}][{_EXTEND}]*)*"
+)
+
+# A lone emoji code point already weighs 2, so only text with multi-code-point sequences
+# (ZWJ, variation selector, keycap, skin tone, tag or flag characters) needs the emoji scan
+_EMOJI_HINT_PATTERN = re.compile("[\u200d\u20e3\ufe0f\U0001f1e6-\U0001f1ff\U0001f3fb-\U0001f3ff\U000e0020-\U000e007f]")
+
+_URL_PATTERN = re.compile(
+    r"(?<![@\w.])(?:https?://|www\.)[^\s<>\"]*[^\s<>\".,:;!?)\]'}]"
+    r"|(?<![@\w.])(?:[a-z0-9-]+\.)+(?:com|net|org|io|co|shop|store|app|dev|ai|me|ly|us|uk)\b(?:/[^\s<>\"]*[^\s<>\".,:;!?)\]'}])?",
+    re.IGNORECASE,
+)
+# Cheap test for text that may contain a URL at all
+_URL_HINT_PATTERN = re.compile(r"://|www\.|\.(?:com|net|org|io|co|shop|store|app|dev|ai|me|ly|us|uk)\b", re.IGNORECASE)
+
+def _text_length(text: str) -> int:
+    if text.isascii():
+        return len(text)
+    length = len(text) + len(_HEAVY_PATTERN.findall(text))
+    if _EMOJI_HINT_PATTERN.search(text):
+        for match in _EMOJI_PATTERN.finditer(text):
+            emoji = match.group()
+            length -= len(emoji) + len(_HEAVY_PATTERN.findall(emoji)) - 2
+    return length
+
+def weighted_length(text: str) -> int:
+    """
+    Returns the length of a tweet as counted by Twitter.
+
+    Args:
+        text (str): The tweet text.
+
+    Returns:
+        int: The weighted length, comparable to `TWITTER_MAX_CHARS`.
+    """
+    text = unicodedata.normalize("NFC", text)
+    if not _URL_HINT_PATTERN.search(text):
+        return _text_length(text)
+    length = 0
+    position = 0
+    for match in _URL_PATTERN.finditer(text):
+        length += _text_length(text[position:match.start()]) + URL_LENGTH
+        position = match.end()
+    return length + _text_length(text[position:])
+
+def _tokens(text: str) -> List[Tuple[str, int]]:
+    """
+    Splits text into indivisible (token, weight) pairs: whole URLs and grapheme clusters.
+    """
+    tokens = []
+    position = 0
+    for match in _URL_PATTERN.finditer(text):
+        tokens.extend((cluster, _text_length(cluster)) for cluster in _GRAPHEME_PATTERN.findall(text, position, match.start()))
+        tokens.append((match.group(), URL_LENGTH))
+        position = match.end()
+    tokens.extend((cluster, _text_length(cluster)) for cluster in _GRAPHEME_PATTERN.findall(text, position))
+    return tokens
+
+def is_valid_tweet(text: str, max_length: int = None) -> bool:
+    """
+    Returns True if the text is not blank and its weighted length fits in `max_length`.
+
+    Args:
+        text (str): The text to check.
+        max_length (int, optional): The maximum weighted length. Defaults to `TWITTER_MAX_CHARS`.
+    """
+    if max_length is None:
+        max_length = settings.TWITTER_MAX_CHARS
+    return bool(text.strip()) and weighted_length(text) <= max_length
+
+def truncate(text: str, max_length: int = None, ellipsis: str = "...") -> str:
+    """
+    Truncates text so its weighted length fits in `max_length`, appending an ellipsis.
+
+    The cut never splits a grapheme cluster (so emoji sequences and accented letters stay
+    whole) and never splits a URL. It is moved back to the last whitespace when one exists in
+    the second half of the kept text, so words and hashtags are not cut either.
+
+    Args:
+        text (str): The text to truncate.
+        max_length (int, optional): The maximum weighted length. Defaults to `TWITTER_MAX_CHARS`.
+        ellipsis (str): Appended to truncated text; counted in the budget, and dropped when
+            it alone would not fit in `max_length`.
+
+    Returns:
+        str: The text unchanged if it already fits, otherwise the truncated text.
+    """
+    if max_length is None:
+        max_length = settings.TWITTER_MAX_CHARS
+    text = unicodedata.normalize("NFC", text)
+    if weighted_length(text) <= max_length:
+        return text
+
+    budget = max_length - weighted_length(ellipsis)
+    if budget < 0:
+        ellipsis, budget = "", max_length
+    kept = []
+    used = 0
+    boundary = 0
+    for token, weight in _tokens(text):
+        if used + weight > budget:
+            break
+        if token.isspace():
+            boundary = len(kept)
+        kept.append(token)
+        used += weight
+    if boundary > len(kept) // 2:
+        kept = kept[:boundary]
+    return "".join(kept).rstrip(" ,;:-\n") + ellipsis
@@ -1 +1 @@
-from .workflow import generate_content_workflow
\ No newline at end of file
+from .workflow import generate_content_workflow, generate_candidates_workflow, generate_content_batch, repair_content_workflow, compile_workflows, workflow_registry
\ No newline at end of file
@@ -1,9 +1,21 @@
+import re
 from fastapi import HTTPException
-from ..api.services.gemini_service import generate_content
-from ..core.logging import logger
+from ..api.services.gemini_service import generate_content, generate_candidates, shorten_content, render_prompt, render_shorten_prompt
+from ..core.logging import get_logger
 from ..core.config import settings
-from .state import ContentState
+from ..core.instrumentation import NODE, instrumentation
+from ..core.tracing import tracing
+from ..core.twitter_text import is_valid_tweet, weighted_length, truncate
+from .state import ContentState, Candidate
 
+logger = get_logger(__name__)
+
+HASHTAG_PATTERN = re.compile(r"#\w+")
+# Rough characters-per-token ratio used to estimate the tokens saved by the shorten prompt
+CHARS_PER_TOKEN = 4
+
+@instrumentation.timed(NODE, "generate")
+@tracing.traced("node generate")
 async def generate_node(state: ContentState) -> ContentState:
     """
     Langgraph node to generate content using the Gemini service.
@@ -14,32 +26,158 @@ async def generate_node(state: ContentState) -> ContentState:
     Returns:
         ContentState: The updated state with generated content or an error.
     """
-    logger.info(f"Executing generate_node with prompt: {state['prompt']}")
+    logger.debug("Executing generate_node with prompt: %s", state['prompt'])
     try:
-        content = await generate_content(state["prompt"])
-        return {"prompt": state["prompt"], "content": content, "error": None}
+        content = await generate_content(state["prompt"], bypass_cache=state.get("bypass_cache", False))
+        return {"prompt": state["prompt"], "content": content, "error": None, "error_status": None}
     except HTTPException as e:
-        logger.error(f"Error in generate_node: {e.detail}")
-        return {"prompt": state["prompt"], "content": None, "error": e.detail}
+        logger.error("Error in generate_node: %s", e.detail)
+        return {"prompt": state["prompt"], "content": None, "error": e.detail, "error_status": e.status_code}
     except Exception as e:
-        logger.error(f"Unexpected error in generate_node: {str(e)}")
+        logger.error("Unexpected error in generate_node: %s", e)
         return {"prompt": state["prompt"], "content": None, "error": str(e)}
 
+@instrumentation.timed(NODE, "validate")
+@tracing.traced("node validate")
 def validate_node(state: ContentState) -> ContentState:
     """
     Langgraph node to validate the generated content (e.g., character limit).
 
+    Over-length content is kept in the state so the repair loop can shorten it.
+
     Args:
         state (ContentState): The current state of the content generation workflow.
 
     Returns:
         ContentState: The updated state, potentially with an error if validation fails.
     """
-    logger.info("Executing validate_node")
-    if state["content"] and len(state["content"]) <= settings.TWITTER_MAX_CHARS:
+    logger.debug("Executing validate_node")
+    length = weighted_length(state["content"]) if state["content"] else 0
+    if state["content"] and length <= settings.TWITTER_MAX_CHARS:
         return state
-    logger.warning(f"Invalid content: too long ({len(state["content"]) if state["content"] else 0} chars) or empty")
-    return {"prompt": state["prompt"], "content": None, "error": f"Content exceeds {settings.TWITTER_MAX_CHARS} characters or is empty"}
+    if state["content"]:
+        logger.warning("Invalid content: too long (%s weighted chars)", length)
+        return {"prompt": state["prompt"], "content": state["content"], "error": f"Content exceeds {settings.TWITTER_MAX_CHARS} characters"}
+    logger.warning("Invalid content: empty")
+    return {"prompt": state["prompt"], "content": None, "error": "Generated content is empty"}
+
+@instrumentation.timed(NODE, "shorten")
+@tracing.traced("node shorten")
+async def shorten_node(state: ContentState) -> ContentState:
+    """
+    Langgraph node that asks Gemini to shorten an over-length draft with a compact prompt.
+    Falls back to deterministic trimming if the Gemini call fails.
+
+    Args:
+        state (ContentState): The current state of the content generation workflow.
+
+    Returns:
+        ContentState: The state with the shortened draft, the repair attempt count and the
+        estimated tokens saved compared to regenerating with the full prompt.
+    """
+    attempt = state.get("repair_attempts", 0) + 1
+    draft = state["content"]
+    logger.debug("Executing shorten_node (attempt %s/%s) on %s weighted chars", attempt, settings.MAX_REPAIR_ATTEMPTS, weighted_length(draft))
+    tokens_saved = state.get("tokens_saved", 0)
+    try:
+        shortened = (await shorten_content(draft, settings.TWITTER_MAX_CHARS, bypass_cache=state.get("bypass_cache", False))).strip()
+        saved_chars = len(render_prompt(state["prompt"])) - len(render_shorten_prompt(draft, settings.TWITTER_MAX_CHARS))
+        tokens_saved += max(saved_chars, 0) // CHARS_PER_TOKEN
+    except Exception as e:
+        logger.warning("Shortening failed, trimming instead: %s", getattr(e, 'detail', e))
+        shortened = truncate(draft, settings.TWITTER_MAX_CHARS)
+    return {"content": shortened, "error": None, "repair_attempts": attempt, "tokens_saved": tokens_saved}
+
+@instrumentation.timed(NODE, "trim")
+@tracing.traced("node trim")
+def trim_node(state: ContentState) -> ContentState:
+    """
+    Langgraph node that trims a draft at a word boundary once the shorten attempts are used up.
+    The cut is grapheme- and URL-safe (see `core.twitter_text.truncate`). Trimming is the
+    last repair step, so a result that still fails validation ends the workflow with an error.
+
+    Args:
+        state (ContentState): The current state of the content generation workflow.
+
+    Returns:
+        ContentState: The state with the trimmed content, or an error if it is still invalid.
+    """
+    logger.debug("Executing trim_node on %s weighted chars", weighted_length(state['content']))
+    trimmed = truncate(state["content"], settings.TWITTER_MAX_CHARS)
+    if not trimmed.strip() or weighted_length(trimmed) > settings.TWITTER_MAX_CHARS:
+        logger.warning("Invalid content: could not be trimmed to %s weighted chars", settings.TWITTER_MAX_CHARS)
+        return {"content": None, "error": f"Content could not be trimmed to {settings.TWITTER_MAX_CHARS} characters"}
+    return {"content": trimmed, "error": None}
+
+@instrumentation.timed(NODE, "generate_candidates")
+@tracing.traced("node generate_candidates")
+async def generate_candidates_node(state: ContentState) -> ContentState:
+    """
+    Langgraph node to generate several candidate posts in a single Gemini call.
+
+    Args:
+        state (ContentState): The current state of the content generation workflow.
+
+    Returns:
+        ContentState: The updated state with the unranked candidates or an error.
+    """
+    logger.debug("Executing generate_candidates_node with prompt: %s", state['prompt'])
+    try:
+        texts = await generate_candidates(state["prompt"], state["candidate_count"], bypass_cache=state.get("bypass_cache", False))
+        candidates = [Candidate(content=text, valid=False, score=0.0) for text in texts]
+        return {"prompt": state["prompt"], "content": None, "error": None, "error_status": None, "candidates": candidates}
+    except HTTPException as e:
+        logger.error("Error in generate_candidates_node: %s", e.detail)
+        return {"prompt": state["prompt"], "content": None, "error": e.detail, "error_status": e.status_code, "candidates": None}
+    except Exception as e:
+        logger.error("Unexpected error in generate_candidates_node: %s", e)
+        return {"prompt": state["prompt"], "content": None, "error": str(e), "candidates": None}
+
+def score_candidate(content: str) -> float:
+    """
+    Scores a valid candidate post; higher is better.
+
+    Rewards mentioning the configured CTA, using one to three hashtags, and making use of the
+    available characters (a fuller post carries more of the value proposition).
+
+    Args:
+        content (str): The candidate post.
+
+    Returns:
+        float: The candidate's score.
+    """
+    score = min(weighted_length(content) / settings.TWITTER_MAX_CHARS, 1.0)
+    if settings.CTA.lower().rstrip("!.") in content.lower():
+        score += 1.0
+    hashtags = len(HASHTAG_PATTERN.findall(content))
+    if 1 <= hashtags <= 3:
+        score += 1.0
+    return score
+
+@instrumentation.timed(NODE, "rank")
+@tracing.traced("node rank")
+def rank_node(state: ContentState) -> ContentState:
+    """
+    Langgraph node to validate and score every candidate and pick the best valid one.
+
+    Args:
+        state (ContentState): The current state of the content generation workflow.
+
+    Returns:
+        ContentState: The state with the candidates ranked best-first and the best valid
+        candidate as content, or an error if no candidate is valid.
+    """
+    logger.debug("Executing rank_node over %s candidates", len(state['candidates']))
+    ranked = []
+    for candidate in state["candidates"]:
+        content = candidate["content"].strip()
+        valid = is_valid_tweet(content)
+        ranked.append(Candidate(content=content, valid=valid, score=score_candidate(content) if valid else 0.0))
+    ranked.sort(key=lambda candidate: (candidate["valid"], candidate["score"]), reverse=True)
+    if not ranked or not ranked[0]["valid"]:
+        logger.warning("No valid candidate: all too long or empty")
+        return {"prompt": state["prompt"], "content": None, "error": f"All candidates exceed {settings.TWITTER_MAX_CHARS} characters or are empty", "candidates": ranked}
+    return {"prompt": state["prompt"], "content": ranked[0]["content"], "error": None, "candidates": ranked}
 
 def error_node(state: ContentState) -> ContentState:
     """
@@ -51,7 +189,7 @@ def error_node(state: ContentState) -> ContentState:
     Returns:
         ContentState: The state with the error information.
     """
-    logger.info("Executing error_node")
+    logger.debug("Executing error_node")
     return state
 
 def router(state: ContentState) -> str:
@@ -67,3 +205,36 @@ def router(state: ContentState) -> str:
     if state["error"]:
         return "error"
     return "validate"
+
+def repair_router(state: ContentState) -> str:
+    """
+    Langgraph router that runs after validation and drives the bounded repair loop.
+
+    Args:
+        state (ContentState): The current state of the content generation workflow.
+
+    Returns:
+        str: 'done' if the content is valid, 'shorten' while repair attempts remain, 'trim'
+        once they are used up, or 'error' if there is no content to repair.
+    """
+    if not state["error"]:
+        return "done"
+    if not state["content"]:
+        return "error"
+    if state.get("repair_attempts", 0) < settings.MAX_REPAIR_ATTEMPTS:
+        return "shorten"
+    return "trim"
+
+def candidates_router(state: ContentState) -> str:
+    """
+    Langgraph router for the multi-candidate workflow.
+
+    Args:
+        state (ContentState): The current state of the content generation workflow.
+
+    Returns:
+        str: The name of the next node ('rank' or 'error').
+    """
+    if state["error"]:
+        return "error"
+    return "rank"
@@ -19,3 +19,10 @@ Write **exactly one** tweet. No threads. Keep it under 280 characters.
 Example output:  
 “ Meet the {product_or_offer} from {brand_name} — {unique_benefit}! Transform your {audience_description} experience. Limited stock available. Grab yours now → {cta} #YourBrand”  
 """
+
+SHORTEN_TWEET_PROMPT = """Shorten this tweet to at most {max_chars} characters.
+Keep the hook, the key benefit, the call to action and the hashtags where possible.
+Reply with the shortened tweet only.
+
+{content}
+"""
@@ -1,6 +1,18 @@
-from typing import TypedDict, Optional
+from typing import TypedDict, Optional, List
+
+class Candidate(TypedDict):
+    content: str
+    valid: bool
+    score: float
 
 class ContentState(TypedDict):
     prompt: str
     content: Optional[str]
     error: Optional[str]
+    # HTTP status of an upstream failure behind `error`, e.g. 503 while Gemini is unavailable
+    error_status: Optional[int]
+    bypass_cache: bool
+    candidate_count: int
+    candidates: Optional[List[Candidate]]
+    repair_attempts: int
+    tokens_saved: int
@@ -1,15 +1,162 @@
+import asyncio
+from typing import Callable, Dict, List, Tuple, Union
 from langgraph.graph import StateGraph, END
-from ..core.logging import logger
-from .state import ContentState
-from .nodes import generate_node, validate_node, error_node, router
+from langgraph.graph.state import CompiledStateGraph
+from ..core.config import settings
+from ..core.logging import get_logger
+from ..core.instrumentation import WORKFLOW, instrumentation
+from ..core.tracing import tracing
+from .state import ContentState, Candidate
+from .nodes import (
+    generate_node, validate_node, error_node, router, shorten_node, trim_node, repair_router,
+    generate_candidates_node, rank_node, candidates_router,
+)
 from ..api.exceptions import ContentGenerationFailedException
+from ..api.services.resilience import deadline
 
-async def generate_content_workflow(prompt: str) -> str:
+logger = get_logger(__name__)
+
+DEFAULT_WORKFLOW = "default"
+MULTI_CANDIDATE_WORKFLOW = "multi_candidate"
+REPAIR_WORKFLOW = "repair"
+
+def build_default_workflow() -> StateGraph:
+    """
+    Builds the generate -> validate graph used by the content endpoints.
+
+    Over-length drafts go through a bounded repair loop: up to `MAX_REPAIR_ATTEMPTS` rounds
+    of `shorten` (a compact Gemini prompt), then a deterministic `trim` as a last resort,
+    which ends the workflow.
+
+    Returns:
+        StateGraph: The uncompiled workflow graph.
+    """
+    workflow = StateGraph(ContentState)
+    workflow.add_node("generate", generate_node)
+    _add_repair_loop(workflow)
+    workflow.set_entry_point("generate")
+    workflow.add_conditional_edges("generate", router, {"validate": "validate", "error": "error"})
+    return workflow
+
+def build_repair_workflow() -> StateGraph:
+    """
+    Builds the validate graph with the default workflow's repair loop, for content generated
+    outside the graph (e.g. streamed to the client), so it is repaired the same way.
+
+    Returns:
+        StateGraph: The uncompiled workflow graph.
+    """
+    workflow = StateGraph(ContentState)
+    _add_repair_loop(workflow)
+    workflow.set_entry_point("validate")
+    return workflow
+
+def _add_repair_loop(workflow: StateGraph):
+    """
+    Adds the validate -> shorten / trim repair loop and the error node to a graph.
+    """
+    workflow.add_node("validate", validate_node)
+    workflow.add_node("shorten", shorten_node)
+    workflow.add_node("trim", trim_node)
+    workflow.add_node("error", error_node)
+    workflow.add_conditional_edges("validate", repair_router, {"done": END, "shorten": "shorten", "trim": "trim", "error": "error"})
+    workflow.add_edge("shorten", "validate")
+    workflow.add_edge("trim", END)
+    workflow.add_edge("error", END)
+
+def build_multi_candidate_workflow() -> StateGraph:
+    """
+    Builds the generate-candidates -> rank graph, which requests several candidates in one
+    Gemini call and keeps the best valid one instead of failing on a single invalid draft.
+
+    Returns:
+        StateGraph: The uncompiled workflow graph.
+    """
+    workflow = StateGraph(ContentState)
+    workflow.add_node("generate_candidates", generate_candidates_node)
+    workflow.add_node("rank", rank_node)
+    workflow.add_node("error", error_node)
+    workflow.set_entry_point("generate_candidates")
+    workflow.add_conditional_edges("generate_candidates", candidates_router, {"rank": "rank", "error": "error"})
+    workflow.add_edge("rank", END)
+    workflow.add_edge("error", END)
+    return workflow
+
+class WorkflowRegistry:
+    """
+    Holds one compiled instance of every workflow variant.
+
+    Compiling a `StateGraph` is comparatively expensive and the result is stateless,
+    so each variant is compiled once (at startup) and shared by all requests.
+    """
+    def __init__(self):
+        self._builders: Dict[str, Callable[[], StateGraph]] = {}
+        self._compiled: Dict[str, CompiledStateGraph] = {}
+
+    def register(self, name: str, builder: Callable[[], StateGraph]):
+        """
+        Registers a workflow variant under the given name.
+
+        Args:
+            name (str): The name of the variant.
+            builder (Callable[[], StateGraph]): Function returning the uncompiled graph.
+        """
+        self._builders[name] = builder
+        self._compiled.pop(name, None)
+
+    def compile_all(self):
+        """
+        Compiles every registered variant that has not been compiled yet.
+        """
+        for name in self._builders:
+            self.get(name)
+        logger.info("Compiled workflows: %s", ', '.join(self._compiled))
+
+    def get(self, name: str = DEFAULT_WORKFLOW) -> CompiledStateGraph:
+        """
+        Returns the compiled workflow for a variant, compiling it on first use.
+
+        Args:
+            name (str): The name of the variant.
+
+        Returns:
+            CompiledStateGraph: The compiled, reusable workflow.
+        """
+        compiled = self._compiled.get(name)
+        if compiled is None:
+            compiled = self._builders[name]().compile()
+            self._compiled[name] = compiled
+        return compiled
+
+workflow_registry = WorkflowRegistry()
+workflow_registry.register(DEFAULT_WORKFLOW, build_default_workflow)
+workflow_registry.register(MULTI_CANDIDATE_WORKFLOW, build_multi_candidate_workflow)
+workflow_registry.register(REPAIR_WORKFLOW, build_repair_workflow)
+
+def compile_workflows():
+    """
+    Compiles all registered workflow variants. Called once from the application lifespan.
+    """
+    workflow_registry.compile_all()
+
+def _workflow_error(result: ContentState) -> ContentGenerationFailedException:
+    """
+    Returns the exception for a failed workflow run, keeping the status of an upstream failure
+    (e.g. 503 while Gemini's circuit breaker is open) and defaulting to 500 otherwise.
+    """
+    if result.get("error_status"):
+        return ContentGenerationFailedException(detail=result["error"], status_code=result["error_status"])
+    return ContentGenerationFailedException(detail=result["error"])
+
+async def generate_content_workflow(prompt: str, bypass_cache: bool = False, candidate_count: int = 1) -> str:
     """
-    Defines and executes the Langgraph workflow for generating and validating social media content.
+    Executes the Langgraph workflow for generating and validating social media content.
+    Gemini calls and their retries are bounded by `GENERATION_DEADLINE_SECONDS`.
 
     Args:
         prompt (str): The initial prompt for content generation.
+        bypass_cache (bool): If True, skip the generation cache and always call Gemini.
+        candidate_count (int): If greater than 1, generate this many candidates and return the best valid one.
 
     Returns:
         str: The validated generated content.
@@ -17,19 +164,99 @@ async def generate_content_workflow(prompt: str) -> str:
     Raises:
         ContentGenerationFailedException: If the content generation workflow fails.
     """
-    workflow = StateGraph(ContentState)
-    workflow.add_node("generate", generate_node)
-    workflow.add_node("validate", validate_node)
-    workflow.add_node("error", error_node)
-    workflow.set_entry_point("generate")
-    workflow.add_conditional_edges("generate", router, {"validate": "validate", "error": "error"})
-    workflow.add_edge("validate", END)
-    workflow.add_edge("error", END)
+    if candidate_count > 1:
+        ranked = await generate_candidates_workflow(prompt, candidate_count, bypass_cache=bypass_cache)
+        return ranked[0]["content"]
+
+    app = workflow_registry.get(DEFAULT_WORKFLOW)
+    with deadline(settings.GENERATION_DEADLINE_SECONDS), instrumentation.timer(WORKFLOW, DEFAULT_WORKFLOW), tracing.span(f"workflow {DEFAULT_WORKFLOW}"):
+        result = await app.ainvoke({
+            "prompt": prompt, "content": None, "error": None, "error_status": None, "bypass_cache": bypass_cache,
+            "repair_attempts": 0, "tokens_saved": 0,
+        })
 
-    app = workflow.compile()
-    result = await app.ainvoke({"prompt": prompt, "content": None, "error": None})
-    
     if result["error"]:
-        logger.error(f"Workflow failed: {result['error']}")
-        raise ContentGenerationFailedException(detail=result["error"])
+        logger.error("Workflow failed: %s", result['error'])
+        raise _workflow_error(result)
+    if result["repair_attempts"]:
+        logger.info("Content repaired after %s shorten attempt(s), ~%s prompt tokens saved", result['repair_attempts'], result['tokens_saved'])
     return result["content"]
+
+async def generate_candidates_workflow(prompt: str, candidate_count: int, bypass_cache: bool = False) -> List[Candidate]:
+    """
+    Executes the multi-candidate workflow and returns every candidate, ranked best-first.
+
+    Args:
+        prompt (str): The initial prompt for content generation.
+        candidate_count (int): The number of candidates to request from Gemini.
+        bypass_cache (bool): If True, skip the generation cache and always call Gemini.
+
+    Returns:
+        List[Candidate]: The candidates ranked best-first; the first one is valid.
+
+    Raises:
+        ContentGenerationFailedException: If generation fails or no candidate is valid.
+    """
+    app = workflow_registry.get(MULTI_CANDIDATE_WORKFLOW)
+    with deadline(settings.GENERATION_DEADLINE_SECONDS), instrumentation.timer(WORKFLOW, MULTI_CANDIDATE_WORKFLOW), tracing.span(f"workflow {MULTI_CANDIDATE_WORKFLOW}", candidate_count=candidate_count):
+        result = await app.ainvoke({
+            "prompt": prompt, "content": None, "error": None, "error_status": None, "bypass_cache": bypass_cache,
+            "candidate_count": candidate_count, "candidates": None,
+        })
+
+    if result["error"]:
+        logger.error("Workflow failed: %s", result['error'])
+        raise _workflow_error(result)
+    return result["candidates"]
+
+async def repair_content_workflow(prompt: str, content: str, bypass_cache: bool = False) -> str:
+    """
+    Validates already generated content and repairs it like the default workflow: an
+    over-length draft is shortened, then trimmed as a last resort.
+
+    Args:
+        prompt (str): The prompt the content was generated for.
+        content (str): The generated content.
+        bypass_cache (bool): If True, skip the generation cache when shortening.
+
+    Returns:
+        str: The validated, possibly repaired content.
+
+    Raises:
+        ContentGenerationFailedException: If the content is empty or cannot be repaired.
+    """
+    app = workflow_registry.get(REPAIR_WORKFLOW)
+    with deadline(settings.GENERATION_DEADLINE_SECONDS), instrumentation.timer(WORKFLOW, REPAIR_WORKFLOW), tracing.span(f"workflow {REPAIR_WORKFLOW}"):
+        result = await app.ainvoke({
+            "prompt": prompt, "content": content, "error": None, "error_status": None, "bypass_cache": bypass_cache,
+            "repair_attempts": 0, "tokens_saved": 0,
+        })
+
+    if result["error"]:
+        logger.error("Workflow failed: %s", result['error'])
+        raise _workflow_error(result)
+    if result["repair_attempts"]:
+        logger.info("Content repaired after %s shorten attempt(s), ~%s prompt tokens saved", result['repair_attempts'], result['tokens_saved'])
+    return result["content"]
+
+# Caps concurrent workflow runs started by batch generation, process-wide
+_generation_semaphore = asyncio.Semaphore(settings.GENERATION_CONCURRENCY)
+
+async def _generate_bounded(prompt: str, bypass_cache: bool, candidate_count: int) -> str:
+    async with _generation_semaphore:
+        return await generate_content_workflow(prompt, bypass_cache=bypass_cache, candidate_count=candidate_count)
+
+async def generate_content_batch(items: List[Tuple[str, bool, int]]) -> List[Union[str, BaseException]]:
+    """
+    Runs the content workflow for many prompts concurrently, with at most
+    `GENERATION_CONCURRENCY` workflows in flight at a time.
+
+    Args:
+        items (List[Tuple[str, bool, int]]): (prompt, bypass_cache, candidate_count) tuples to generate content for.
+
+    Returns:
+        List[Union[str, BaseException]]: The generated content, or the raised exception, for each
+        item in order. An item cancelled on its own is returned as its `CancelledError`;
+        cancelling the caller cancels every item and raises in the caller.
+    """
+    return await asyncio.gather(*(_generate_bounded(*item) for item in items), return_exceptions=True)
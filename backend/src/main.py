@@ -3,24 +3,47 @@ from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from sqlmodel import Session
 
-from .api.endpoints import analytics, content, scheduling
-from .core.database import create_db_and_tables
+from .api.endpoints import analytics, content, scheduling, system
+from .core.migrations import ensure_schema
 from .api.dependencies import get_storage_service
 from .core.config import settings
+from .core.database import engine
+from .core.tracing import tracing
 from .api.services.scheduling_service import start_scheduler, stop_scheduler
+from .api.services.http_clients import http_clients
+from .api.services.generation_cache import generation_cache
+from .api.services.generation_jobs import generation_job_queue
+from .graphs import compile_workflows
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Create tables on startup
-    await create_db_and_tables()
+    # Check (or apply, depending on DB_SCHEMA_MODE) the schema migrations
+    await ensure_schema()
+    # Compile the langgraph workflows once for all requests
+    compile_workflows()
+    # Open the shared upstream HTTP clients
+    await http_clients.start()
     # Start the scheduler
-    start_scheduler()
+    await start_scheduler()
+    # Start the generation job workers
+    await generation_job_queue.start()
     yield
+    # Stop the generation job workers, returning unfinished jobs to the queue
+    await generation_job_queue.stop()
     # Stop the scheduler
-    stop_scheduler()
+    await stop_scheduler()
+    # Close the shared upstream HTTP clients
+    await http_clients.close()
+    # Release the generation cache
+    await generation_cache.close()
+    # Export the spans still buffered
+    tracing.shutdown()
 
 app = FastAPI(title="E-Commerce Social Media Agent Backend", version="1.0.0", lifespan=lifespan)
 
+# Trace requests, upstream calls and SQL statements if TRACING_ENABLED is set
+tracing.instrument(app, engine)
+
 
 app.add_middleware(
     CORSMiddleware,
@@ -28,9 +51,11 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Location", "Retry-After"],
 )
 
 # Include routers from modularized endpoint files
 app.include_router(content.router, prefix="/api/v1/content", tags=["Content Management"])
 app.include_router(scheduling.router, prefix="/api/v1/scheduling", tags=["Scheduling"])
-app.include_router(analytics.router, prefix="/api/v1/analytics", tags=["Analytics"])
\ No newline at end of file
+app.include_router(analytics.router, prefix="/api/v1/analytics", tags=["Analytics"])
+app.include_router(system.router, prefix="/api/v1/system", tags=["System"])
\ No newline at end of file
@@ -0,0 +1,54 @@
+import asyncio
+from logging.config import fileConfig
+from alembic import context
+from sqlalchemy import pool
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel
+from src.core.config import settings
+from src.api.models import SocialMediaAgent, Post, PublishAttempt, PostMetricSnapshot, GenerationJob, JobLease  # noqa: F401  (register tables on the metadata)
+
+config = context.config
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name)
+
+target_metadata = SQLModel.metadata
+
+def run_migrations_offline():
+    """
+    Emits the migration SQL without connecting to the database (`alembic upgrade head --sql`).
+    """
+    context.configure(
+        url=settings.DATABASE_URL,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+# Arbitrary key for the PostgreSQL advisory lock held while migrating
+MIGRATION_LOCK_ID = 7_310_317
+
+def do_run_migrations(connection: Connection):
+    context.configure(connection=connection, target_metadata=target_metadata)
+    with context.begin_transaction():
+        if connection.dialect.name == "postgresql":
+            # Processes starting together with DB_SCHEMA_MODE=upgrade migrate one at a time;
+            # the others then find the schema at head and have nothing to do
+            connection.exec_driver_sql(f"SELECT pg_advisory_xact_lock({MIGRATION_LOCK_ID})")
+        context.run_migrations()
+
+async def run_migrations_online():
+    """
+    Runs the migrations over an async connection to `DATABASE_URL`.
+    """
+    connectable = create_async_engine(settings.DATABASE_URL, poolclass=pool.NullPool)
+    async with connectable.connect() as connection:
+        await connection.run_sync(do_run_migrations)
+    await connectable.dispose()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    asyncio.run(run_migrations_online())
@@ -0,0 +1,72 @@
+"""initial schema: agents, posts with publishing leases, publish outbox and hot-query indexes
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-18 00:00:00
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    op.create_table('socialmediaagent',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('description', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('created_at', postgresql.TIMESTAMP(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.Column('updated_at', postgresql.TIMESTAMP(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_socialmediaagent_name'), 'socialmediaagent', ['name'], unique=False)
+    op.create_table('post',
+    sa.Column('id', sa.Uuid(), nullable=False),
+    sa.Column('content', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('approved', sa.Boolean(), nullable=False),
+    sa.Column('scheduled_at', postgresql.TIMESTAMP(timezone=True), nullable=True),
+    sa.Column('is_posted', sa.Boolean(), nullable=False),
+    sa.Column('created_at', postgresql.TIMESTAMP(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.Column('updated_at', postgresql.TIMESTAMP(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.Column('claimed_by', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('lease_expires_at', postgresql.TIMESTAMP(timezone=True), nullable=True),
+    sa.Column('agent_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['agent_id'], ['socialmediaagent.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_post_agent_id_created_at_id', 'post', ['agent_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_post_created_at_id', 'post', ['created_at', 'id'], unique=False)
+    op.create_index('ix_post_pending_scheduled_at', 'post', ['scheduled_at'], unique=False, postgresql_where=sa.text('approved = true AND is_posted = false'), sqlite_where=sa.text('approved = 1 AND is_posted = 0'))
+    op.create_table('publish_attempt',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('post_id', sa.Uuid(), nullable=False),
+    sa.Column('idempotency_key', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('status', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('attempt_count', sa.Integer(), nullable=False),
+    sa.Column('last_error', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('next_retry_at', postgresql.TIMESTAMP(timezone=True), nullable=True),
+    sa.Column('tweet_id', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('created_at', postgresql.TIMESTAMP(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.Column('updated_at', postgresql.TIMESTAMP(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.ForeignKeyConstraint(['post_id'], ['post.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('idempotency_key')
+    )
+    op.create_index('ix_publish_attempt_pending_next_retry_at', 'publish_attempt', ['next_retry_at'], unique=False, postgresql_where=sa.text("status = 'pending'"), sqlite_where=sa.text("status = 'pending'"))
+    op.create_index(op.f('ix_publish_attempt_post_id'), 'publish_attempt', ['post_id'], unique=False)
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_publish_attempt_post_id'), table_name='publish_attempt')
+    op.drop_index('ix_publish_attempt_pending_next_retry_at', table_name='publish_attempt', postgresql_where=sa.text("status = 'pending'"), sqlite_where=sa.text("status = 'pending'"))
+    op.drop_table('publish_attempt')
+    op.drop_index('ix_post_pending_scheduled_at', table_name='post', postgresql_where=sa.text('approved = true AND is_posted = false'), sqlite_where=sa.text('approved = 1 AND is_posted = 0'))
+    op.drop_index('ix_post_created_at_id', table_name='post')
+    op.drop_index('ix_post_agent_id_created_at_id', table_name='post')
+    op.drop_table('post')
+    op.drop_index(op.f('ix_socialmediaagent_name'), table_name='socialmediaagent')
+    op.drop_table('socialmediaagent')
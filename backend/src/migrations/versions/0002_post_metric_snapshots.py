@@ -0,0 +1,38 @@
+"""post metric snapshots: append-only engagement history with a BRIN time index
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 00:00:00
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    op.create_table('post_metric_snapshot',
+    sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), autoincrement=True, nullable=False),
+    sa.Column('post_id', sa.Uuid(), nullable=False),
+    sa.Column('collected_at', postgresql.TIMESTAMP(timezone=True), nullable=False),
+    sa.Column('impressions', sa.Integer(), nullable=False),
+    sa.Column('likes', sa.Integer(), nullable=False),
+    sa.Column('retweets', sa.Integer(), nullable=False),
+    sa.Column('replies', sa.Integer(), nullable=False),
+    sa.Column('quotes', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['post_id'], ['post.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_post_metric_snapshot_collected_at', 'post_metric_snapshot', ['collected_at'], unique=False, postgresql_using='brin')
+    op.create_index('ix_post_metric_snapshot_post_id_collected_at', 'post_metric_snapshot', ['post_id', 'collected_at'], unique=False)
+    op.create_index('ix_publish_attempt_sent_updated_at', 'publish_attempt', ['updated_at'], unique=False, postgresql_where=sa.text("status = 'sent'"), sqlite_where=sa.text("status = 'sent'"))
+
+def downgrade() -> None:
+    op.drop_index('ix_publish_attempt_sent_updated_at', table_name='publish_attempt', postgresql_where=sa.text("status = 'sent'"), sqlite_where=sa.text("status = 'sent'"))
+    op.drop_index('ix_post_metric_snapshot_post_id_collected_at', table_name='post_metric_snapshot')
+    op.drop_index('ix_post_metric_snapshot_collected_at', table_name='post_metric_snapshot', postgresql_using='brin')
+    op.drop_table('post_metric_snapshot')
@@ -0,0 +1,59 @@
+import asyncio
+import os
+import tempfile
+import pytest
+
+# Placeholders for the required settings; must be set before anything from `src` is imported
+for name in ("GOOGLE_API_KEY", "TWITTER_API_KEY", "TWITTER_API_SECRET",
+             "TWITTER_ACCESS_TOKEN", "TWITTER_ACCESS_TOKEN_SECRET"):
+    os.environ.setdefault(name, "test")
+# A throwaway SQLite file unless DATABASE_URL points the tests elsewhere
+TEST_DATABASE_PATH = os.path.join(tempfile.gettempdir(), f"esma-tests-{os.getpid()}.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{TEST_DATABASE_PATH}")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("INSTRUMENTATION_ENABLED", "false")
+
+from sqlmodel import SQLModel  # noqa: E402
+from src.core.database import engine  # noqa: E402
+import src.api.models  # noqa: E402,F401  (register tables on the metadata)
+
+def pytest_configure(config):
+    # The services use SQLAlchemy's `session.execute` on SQLModel sessions throughout
+    config.addinivalue_line("filterwarnings", r"ignore:\s*\W+ You probably want to use `session.exec\(\)`:DeprecationWarning")
+
+def pytest_unconfigure(config):
+    for suffix in ("", "-wal", "-shm", "-journal"):
+        if os.path.exists(TEST_DATABASE_PATH + suffix):
+            os.remove(TEST_DATABASE_PATH + suffix)
+
+@pytest.fixture
+def run():
+    """
+    Runs a coroutine in a new event loop and closes the pooled connections it opened, which
+    are bound to that loop.
+    """
+    def run(coro):
+        async def main():
+            try:
+                return await coro
+            finally:
+                await engine.dispose()
+        return asyncio.run(main())
+    return run
+
+@pytest.fixture
+def database(run):
+    """
+    Creates every table in the test database, and drops them after the test.
+    """
+    async def create_all():
+        async with engine.begin() as conn:
+            await conn.run_sync(SQLModel.metadata.create_all)
+
+    async def drop_all():
+        async with engine.begin() as conn:
+            await conn.run_sync(SQLModel.metadata.drop_all)
+
+    run(create_all())
+    yield
+    run(drop_all())
@@ -1 +1,185 @@
 # Unit tests for analytics
+from datetime import datetime, timedelta, timezone
+from src.api.services.metrics_collector import COLLECTOR_LEASE, MetricsCollector, StubMetricsSource
+
+class _Source(StubMetricsSource):
+    """
+    Stub source that records how many database connections were checked out during each lookup.
+    """
+    def __init__(self):
+        super().__init__()
+        self.checked_out = []
+
+    async def fetch(self, tweet_ids):
+        from src.core.database import engine
+        self.checked_out.append(engine.sync_engine.pool.checkedout())
+        return await super().fetch(tweet_ids)
+
+async def _publish_tweet(tweet_id: str):
+    from src.api.models.post import Post
+    from src.api.models.publish_attempt import PublishAttempt, PUBLISH_SENT
+    from src.core.database import async_session_factory
+    async with async_session_factory() as session:
+        post = Post(content="Shop Now! #Winter", approved=True, is_posted=True)
+        session.add(post)
+        await session.flush()
+        session.add(PublishAttempt(post_id=post.id, idempotency_key=str(post.id), status=PUBLISH_SENT, tweet_id=tweet_id))
+        await session.commit()
+
+async def _snapshot_count() -> int:
+    from sqlalchemy import func
+    from sqlmodel import select
+    from src.api.models.post_metric_snapshot import PostMetricSnapshot
+    from src.core.database import async_session_factory
+    async with async_session_factory() as session:
+        return await session.scalar(select(func.count(PostMetricSnapshot.id)))
+
+async def _lease():
+    from src.api.models.job_lease import JobLease
+    from src.core.database import async_session_factory
+    async with async_session_factory() as session:
+        return await session.get(JobLease, COLLECTOR_LEASE)
+
+async def _hold_lease(claimed_by: str, lease_expires_at: datetime):
+    from src.api.models.job_lease import JobLease
+    from src.core.database import async_session_factory
+    async with async_session_factory() as session:
+        session.add(JobLease(name=COLLECTOR_LEASE, claimed_by=claimed_by, lease_expires_at=lease_expires_at))
+        await session.commit()
+
+def test_collector_holds_no_connection_during_lookups_and_releases_its_lease(run, database):
+    source = _Source()
+    collector = MetricsCollector(source)
+
+    async def exercise():
+        await _publish_tweet("1001")
+        await _publish_tweet("1002")
+        await collector.run()
+        return await _snapshot_count(), await _lease()
+
+    count, lease = run(exercise())
+    assert count == 2
+    assert source.checked_out == [0]
+    assert lease.claimed_by is None and lease.lease_expires_at is None
+
+def test_collector_skips_a_run_right_after_another_one(run, database):
+    collector = MetricsCollector(StubMetricsSource())
+
+    async def exercise():
+        await _publish_tweet("1001")
+        await collector.run()
+        await collector.run()
+        return await _snapshot_count()
+
+    assert run(exercise()) == 1
+    assert (collector.runs, collector.skipped_runs) == (1, 1)
+
+def test_collector_skips_while_another_worker_holds_the_lease(run, database):
+    collector = MetricsCollector(StubMetricsSource())
+
+    async def exercise():
+        await _publish_tweet("1001")
+        await _hold_lease("other-worker", datetime.now(timezone.utc) + timedelta(minutes=5))
+        await collector.run()
+        return await _snapshot_count(), await _lease()
+
+    count, lease = run(exercise())
+    assert count == 0
+    assert collector.skipped_runs == 1
+    assert lease.claimed_by == "other-worker"
+
+def test_collector_takes_over_a_lapsed_lease(run, database):
+    collector = MetricsCollector(StubMetricsSource())
+
+    async def exercise():
+        await _publish_tweet("1001")
+        await _hold_lease("crashed-worker", datetime.now(timezone.utc) - timedelta(minutes=1))
+        await collector.run()
+        return await _snapshot_count()
+
+    assert run(exercise()) == 1
+    assert collector.runs == 1
+
+def _summary_client(monkeypatch, summary):
+    """
+    Returns a client whose `/summary` serves `summary` through a fresh analytics cache.
+    """
+    from fastapi.testclient import TestClient
+    from src.api.endpoints import analytics
+    from src.api.services.analytics_cache import AnalyticsCache
+    from src.api.services.postgresql_storage_service import PostgreSQLStorageService
+    from src.main import app
+
+    async def analytics_summary(self):
+        return dict(summary)
+
+    monkeypatch.setattr(analytics, "analytics_cache", AnalyticsCache(ttl_seconds=60))
+    monkeypatch.setattr(PostgreSQLStorageService, "analytics_summary", analytics_summary)
+    return TestClient(app)
+
+def test_summary_is_not_modified_for_a_matching_etag(monkeypatch):
+    client = _summary_client(monkeypatch, {"posted": 1})
+    response = client.get("/api/v1/analytics/summary")
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    assert response.headers["cache-control"].startswith("private, max-age=")
+
+    for if_none_match in (etag, f"W/{etag}", f'"stale", {etag}', f'"stale",W/{etag}', "*"):
+        response = client.get("/api/v1/analytics/summary", headers={"If-None-Match": if_none_match})
+        assert response.status_code == 304, if_none_match
+        assert response.headers["etag"] == etag
+        assert response.content == b""
+
+    response = client.get("/api/v1/analytics/summary", headers={"If-None-Match": '"stale", W/"other"'})
+    assert response.status_code == 200
+    assert response.json() == {"posted": 1}
+
+def test_summary_gets_a_new_etag_after_invalidation(monkeypatch):
+    from src.api.endpoints import analytics
+    summary = {"posted": 1}
+    client = _summary_client(monkeypatch, summary)
+    etag = client.get("/api/v1/analytics/summary").headers["etag"]
+
+    # Without an invalidation the cached aggregate is served
+    summary["posted"] = 2
+    response = client.get("/api/v1/analytics/summary", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+    analytics.analytics_cache.invalidate()
+    response = client.get("/api/v1/analytics/summary", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json() == {"posted": 2}
+    assert response.headers["etag"] != etag
+
+def test_value_computed_during_an_invalidation_is_served_but_not_kept(run):
+    import asyncio
+    from src.api.services.analytics_cache import AnalyticsCache
+    cache = AnalyticsCache(ttl_seconds=60)
+    computed = []
+
+    async def exercise():
+        started = asyncio.Event()
+        release = asyncio.Event()
+
+        async def compute():
+            computed.append(len(computed) + 1)
+            started.set()
+            await release.wait()
+            return {"posted": len(computed)}
+
+        pending = asyncio.create_task(cache.get("summary", compute))
+        await started.wait()
+        # A write lands while the aggregate is being computed
+        cache.invalidate()
+        release.set()
+        stale, _ = await pending
+        assert cache.stats()["entries"] == 0
+        fresh, _ = await cache.get("summary", compute)
+        cached, _ = await cache.get("summary", compute)
+        return stale, fresh, cached
+
+    stale, fresh, cached = run(exercise())
+    assert stale == {"posted": 1}
+    assert fresh == cached == {"posted": 2}
+    assert computed == [1, 2]
+    assert cache.stats() == {"hits": 1, "misses": 2, "invalidations": 1, "entries": 1}
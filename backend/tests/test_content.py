@@ -1 +1,479 @@
 # Unit tests for content generation
+import pytest
+from src.core.twitter_text import URL_LENGTH, is_valid_tweet, truncate, weighted_length
+
+def test_ascii_counts_one_per_character():
+    assert weighted_length("Shop Now! #Winter") == 17
+
+def test_urls_count_as_url_length():
+    assert weighted_length("https://example.com/a/very/long/path?with=query") == URL_LENGTH
+    assert weighted_length("See shop.example.com now") == len("See ") + URL_LENGTH + len(" now")
+    assert weighted_length("Go to www.example.org.") == len("Go to ") + URL_LENGTH + len(".")
+
+def test_cjk_counts_two_per_character():
+    assert weighted_length("日本語") == 6
+    assert weighted_length("café 日本") == 5 + 4
+
+def test_emoji_sequences_count_two_each():
+    assert weighted_length("👍") == 2
+    assert weighted_length("👍🏽") == 2
+    assert weighted_length("👨‍👩‍👧") == 2
+    assert weighted_length("🇫🇷") == 2
+
+def test_text_is_nfc_normalized():
+    assert weighted_length("café") == weighted_length("café") == 4
+
+def test_truncate_leaves_text_that_fits():
+    assert truncate("Shop Now!", 280) == "Shop Now!"
+
+def test_truncate_fits_and_cuts_at_a_word_boundary():
+    text = "Our winter collection is here with cozy knits and warm coats"
+    result = truncate(text, 30)
+    assert weighted_length(result) <= 30
+    assert result.endswith("...")
+    assert text.startswith(result[:-3])
+    assert text[len(result) - 3] == " "
+
+def test_truncate_never_splits_a_url_or_an_emoji():
+    text = "Deals 👨‍👩‍👧 https://example.com/winter-sale-2025 " + "x" * 300
+    for max_length in range(1, 60):
+        result = truncate(text, max_length)
+        assert weighted_length(result) <= max_length
+        assert "‍" not in result or "👨‍👩‍👧" in result
+        assert "https://" not in result or "https://example.com/winter-sale-2025" in result
+
+@pytest.mark.parametrize("max_length", [0, 1, 2, 3])
+def test_truncate_fits_below_the_ellipsis_length(max_length):
+    assert weighted_length(truncate("日本語のテキスト", max_length)) <= max_length
+
+@pytest.mark.parametrize("text, valid", [("Shop Now! #Winter", True), ("", False), ("  \n", False), ("日" * 140, True), ("日" * 141, False)])
+def test_is_valid_tweet(text, valid):
+    assert is_valid_tweet(text) is valid
+
+def _run_default_workflow(run, monkeypatch, draft, truncated):
+    from src.graphs import nodes
+    from src.graphs.workflow import build_default_workflow
+
+    async def generate_content(prompt, bypass_cache=False):
+        return draft
+
+    async def shorten_content(content, max_chars, bypass_cache=False):
+        raise RuntimeError("Gemini is unavailable")
+
+    monkeypatch.setattr(nodes, "generate_content", generate_content)
+    monkeypatch.setattr(nodes, "shorten_content", shorten_content)
+    monkeypatch.setattr(nodes, "truncate", lambda text, max_length: truncated)
+    return run(build_default_workflow().compile().ainvoke({
+        "prompt": "winter sale", "content": None, "error": None, "error_status": None, "bypass_cache": False,
+        "repair_attempts": 0, "tokens_saved": 0,
+    }))
+
+def test_trim_ends_the_repair_loop(run, monkeypatch):
+    result = _run_default_workflow(run, monkeypatch, "x" * 400, "x" * 200 + "...")
+    assert result["error"] is None
+    assert result["content"] == "x" * 200 + "..."
+
+def test_trim_that_still_does_not_fit_fails_cleanly(run, monkeypatch):
+    result = _run_default_workflow(run, monkeypatch, "x" * 400, "x" * 300)
+    assert result["content"] is None
+    assert "could not be trimmed" in result["error"]
+
+@pytest.mark.parametrize("candidate_count", [1, 3])
+def test_workflow_keeps_the_status_of_an_upstream_failure(run, monkeypatch, candidate_count):
+    from src.api.exceptions import ContentGenerationFailedException
+    from src.graphs import nodes
+    from src.graphs.workflow import generate_content_workflow
+
+    async def unavailable(*args, **kwargs):
+        raise ContentGenerationFailedException(detail="Gemini API temporarily unavailable", status_code=503)
+
+    monkeypatch.setattr(nodes, "generate_content", unavailable)
+    monkeypatch.setattr(nodes, "generate_candidates", unavailable)
+    with pytest.raises(ContentGenerationFailedException) as excinfo:
+        run(generate_content_workflow("winter sale", candidate_count=candidate_count))
+    assert excinfo.value.status_code == 503
+    assert excinfo.value.detail == "Gemini API temporarily unavailable"
+
+def test_workflow_reports_invalid_content_as_a_server_error(run, monkeypatch):
+    from src.api.exceptions import ContentGenerationFailedException
+    from src.graphs import nodes
+    from src.graphs.workflow import generate_content_workflow
+
+    async def generate_content(prompt, bypass_cache=False):
+        return ""
+
+    monkeypatch.setattr(nodes, "generate_content", generate_content)
+    with pytest.raises(ContentGenerationFailedException) as excinfo:
+        run(generate_content_workflow("winter sale"))
+    assert excinfo.value.status_code == 500
+
+class _FakeStorage:
+    def __init__(self):
+        self.saved = []
+
+    async def get_existing_agent_ids(self, agent_ids):
+        return set(agent_ids)
+
+    async def save_posts(self, items):
+        from src.api.models.post import Post
+        self.saved.extend(items)
+        return [Post(content=content, agent_id=agent_id) for content, agent_id in items]
+
+    async def save_post(self, content, agent_id=None):
+        return (await self.save_posts([(content, agent_id)]))[0]
+
+def test_batch_reports_cancelled_items_as_errors(monkeypatch):
+    import asyncio
+    from fastapi.testclient import TestClient
+    from src.api.dependencies import get_storage_service
+    from src.api.endpoints import content
+    from src.main import app
+
+    async def generate_content_batch(items):
+        return ["Shop Now! #Winter", asyncio.CancelledError(), ValueError("Gemini failed")]
+
+    storage = _FakeStorage()
+    monkeypatch.setattr(content, "generate_content_batch", generate_content_batch)
+    app.dependency_overrides[get_storage_service] = lambda: storage
+    try:
+        response = TestClient(app).post("/api/v1/content/generate/batch", json={"prompts": [{"prompt": "a"}, {"prompt": "b"}, {"prompt": "c"}]})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert [item["success"] for item in response.json()] == [True, False, False]
+    assert response.json()[1]["error"] == "Generation was cancelled"
+    assert response.json()[2]["error"] == "Gemini failed"
+    assert storage.saved == [("Shop Now! #Winter", None)]
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+def _caches(tmp_path):
+    from src.api.services.generation_cache import InMemoryGenerationCache, SQLiteGenerationCache
+    return [
+        InMemoryGenerationCache(max_entries=2, ttl_seconds=60),
+        SQLiteGenerationCache(str(tmp_path / "cache.db"), max_entries=2, ttl_seconds=60),
+    ]
+
+def test_generation_cache_hits_misses_and_ttl(run, monkeypatch, tmp_path):
+    from src.api.services import generation_cache as module
+    clock = _Clock()
+    monkeypatch.setattr(module, "time", clock)
+
+    async def exercise(cache):
+        assert await cache.get("key") is None
+        await cache.set("key", "Shop Now!")
+        assert await cache.get("key") == "Shop Now!"
+        clock.now += 61
+        assert await cache.get("key") is None
+        stats = await cache.stats()
+        await cache.close()
+        return stats
+
+    for cache in _caches(tmp_path):
+        stats = run(exercise(cache))
+        assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 2, 0), cache.backend
+
+def test_generation_cache_evicts_least_recently_used(run, monkeypatch, tmp_path):
+    from src.api.services import generation_cache as module
+    clock = _Clock()
+    monkeypatch.setattr(module, "time", clock)
+
+    async def exercise(cache):
+        for key in ("a", "b"):
+            await cache.set(key, key)
+            clock.now += 1
+        await cache.get("a")
+        clock.now += 1
+        await cache.set("c", "c")
+        values = [await cache.get(key) for key in ("a", "b", "c")]
+        await cache.close()
+        return values
+
+    for cache in _caches(tmp_path):
+        assert run(exercise(cache)) == ["a", None, "c"], cache.backend
+
+def test_sqlite_generation_cache_opens_on_first_use(run, tmp_path):
+    from src.api.services.generation_cache import SQLiteGenerationCache
+    path = tmp_path / "lazy.db"
+    cache = SQLiteGenerationCache(str(path), max_entries=10, ttl_seconds=60)
+    assert not path.exists()
+    assert run(cache.stats())["entries"] == 0
+    assert path.exists()
+    run(cache.close())
+
+def test_single_flight_coalesces_concurrent_calls(run):
+    import asyncio
+    from src.api.services.single_flight import SingleFlight
+    flight = SingleFlight()
+    calls = []
+
+    async def upstream(key):
+        calls.append(key)
+        await asyncio.sleep(0.01)
+        return f"result {key}"
+
+    async def exercise():
+        return await asyncio.gather(
+            *(flight.do("a", lambda: upstream("a")) for _ in range(10)),
+            flight.do("b", lambda: upstream("b")),
+        )
+
+    results = run(exercise())
+    assert results == ["result a"] * 10 + ["result b"]
+    assert sorted(calls) == ["a", "b"]
+    assert flight.stats() == {"in_flight": 0, "coalesced": 9}
+
+def test_single_flight_shares_exceptions(run):
+    import asyncio
+    from src.api.services.single_flight import SingleFlight
+    flight = SingleFlight()
+
+    async def upstream():
+        await asyncio.sleep(0.01)
+        raise ValueError("Gemini failed")
+
+    async def exercise():
+        return await asyncio.gather(*(flight.do("a", upstream) for _ in range(3)), return_exceptions=True)
+
+    assert [str(outcome) for outcome in run(exercise())] == ["Gemini failed"] * 3
+
+def test_single_flight_cancels_the_call_only_when_every_caller_left(run):
+    import asyncio
+    from src.api.services.single_flight import SingleFlight
+    flight = SingleFlight()
+    started = []
+
+    async def upstream():
+        started.append(asyncio.current_task())
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def exercise():
+        first = asyncio.create_task(flight.do("a", upstream))
+        second = asyncio.create_task(flight.do("a", upstream))
+        await asyncio.sleep(0)
+        first.cancel()
+        assert await second == "done"
+        assert not started[0].cancelled()
+
+        third = asyncio.create_task(flight.do("b", upstream))
+        await asyncio.sleep(0)
+        third.cancel()
+        await asyncio.gather(third, return_exceptions=True)
+        await asyncio.sleep(0)
+        return started[1].cancelled()
+
+    assert run(exercise()) is True
+
+def test_concurrent_identical_prompts_make_one_gemini_request(run):
+    import asyncio
+    import httpx
+    from src.api.services import gemini_service
+    from src.api.services.http_clients import http_clients
+    requests = []
+
+    async def handler(request):
+        requests.append(request)
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json={"candidates": [{"content": {"parts": [{"text": "Shop Now! #Winter"}]}}]})
+
+    async def exercise():
+        http_clients._gemini = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        try:
+            return await asyncio.gather(*(gemini_service.generate_content("winter sale", bypass_cache=True) for _ in range(5)))
+        finally:
+            await http_clients._gemini.aclose()
+            http_clients._gemini = None
+
+    assert run(exercise()) == ["Shop Now! #Winter"] * 5
+    assert len(requests) == 1
+
+def _stream_events(monkeypatch, draft):
+    """
+    Calls `/generate/stream` with Gemini streaming `draft` in two chunks and returns the
+    (event, data) pairs received and the storage the post was saved to.
+    """
+    import json
+    from fastapi.testclient import TestClient
+    from src.api.dependencies import get_storage_service
+    from src.api.endpoints import content
+    from src.graphs import nodes
+    from src.main import app
+
+    async def generate_content_stream(prompt, bypass_cache=False):
+        yield draft[:len(draft) // 2]
+        yield draft[len(draft) // 2:]
+
+    async def shorten_content(content, max_chars, bypass_cache=False):
+        return "Shop Now! #Winter"
+
+    storage = _FakeStorage()
+    monkeypatch.setattr(content, "generate_content_stream", generate_content_stream)
+    monkeypatch.setattr(nodes, "shorten_content", shorten_content)
+    app.dependency_overrides[get_storage_service] = lambda: storage
+    try:
+        response = TestClient(app).post("/api/v1/content/generate/stream", json={"prompt": "winter sale"})
+    finally:
+        app.dependency_overrides.clear()
+    events = []
+    for block in response.text.strip().split("\n\n"):
+        event, data = block.split("\n")
+        events.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    return events, storage
+
+def test_stream_repairs_an_over_length_draft_like_generate(monkeypatch):
+    events, storage = _stream_events(monkeypatch, "x" * 400)
+    assert [event for event, _ in events] == ["token", "token", "done"]
+    assert events[-1][1]["content"] == "Shop Now! #Winter"
+    assert storage.saved == [("Shop Now! #Winter", None)]
+
+def test_stream_reports_an_empty_draft_as_an_error(monkeypatch):
+    events, storage = _stream_events(monkeypatch, "")
+    assert events[-1] == ("error", {"detail": "Generated content is empty"})
+    assert storage.saved == []
+
+def _count_gemini_requests(run, monkeypatch, texts, call):
+    """
+    Runs `call` twice against a Gemini stub answering with `texts` as candidates and an empty
+    generation cache, and returns the number of requests that reached the stub.
+    """
+    import httpx
+    from src.api.services import gemini_service
+    from src.api.services.generation_cache import InMemoryGenerationCache
+    from src.api.services.http_clients import http_clients
+    requests = []
+
+    async def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json={"candidates": [{"content": {"parts": [{"text": text}]}} for text in texts]})
+
+    async def exercise():
+        http_clients._gemini = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        try:
+            for _ in range(2):
+                await call(gemini_service)
+        finally:
+            await http_clients._gemini.aclose()
+            http_clients._gemini = None
+
+    monkeypatch.setattr(gemini_service, "generation_cache", InMemoryGenerationCache(max_entries=16, ttl_seconds=60))
+    run(exercise())
+    return len(requests)
+
+@pytest.mark.parametrize("texts, requests", [(["Shop Now! #Winter"], 1), ([""], 2)])
+def test_empty_drafts_are_not_cached(run, monkeypatch, texts, requests):
+    assert _count_gemini_requests(run, monkeypatch, texts, lambda service: service.generate_content("winter sale")) == requests
+
+@pytest.mark.parametrize("texts, requests", [(["x" * 300, "Shop Now! #Winter"], 1), (["x" * 300, "y" * 300], 2)])
+def test_candidates_are_cached_only_with_a_valid_one(run, monkeypatch, texts, requests):
+    assert _count_gemini_requests(run, monkeypatch, texts, lambda service: service.generate_candidates("winter sale", 2)) == requests
+
+async def _seed_posts():
+    """
+    Inserts seven posts, several of them sharing a created_at, and returns their ids newest first.
+    """
+    from datetime import datetime, timezone
+    from src.api.models.models import SocialMediaAgent
+    from src.api.models.post import Post
+    from src.core.database import async_session_factory
+    base = datetime(2025, 12, 15, 10, 0, tzinfo=timezone.utc)
+    async with async_session_factory() as session:
+        session.add(SocialMediaAgent(id=1, name="Winter"))
+        posts = [
+            Post(content=f"Post {i}", created_at=base.replace(minute=minute), approved=i % 2 == 0, agent_id=1 if i < 3 else None)
+            for i, minute in enumerate((0, 0, 0, 5, 5, 5, 9))
+        ]
+        session.add_all(posts)
+        await session.commit()
+        return [post.id for post in sorted(posts, key=lambda post: (post.created_at, post.id), reverse=True)]
+
+async def _list_all(limit, **filters):
+    """
+    Pages through `list_posts` and returns every page.
+    """
+    from src.api.services.postgresql_storage_service import PostgreSQLStorageService
+    from src.core.database import async_session_factory
+    pages, cursor = [], None
+    async with async_session_factory() as session:
+        storage = PostgreSQLStorageService(session)
+        while True:
+            page, cursor = await storage.list_posts(limit, cursor=cursor, **filters)
+            pages.append(page)
+            if cursor is None:
+                return pages
+
+def test_cursor_round_trips():
+    from datetime import datetime, timezone
+    from uuid import uuid4
+    from src.api.services.postgresql_storage_service import decode_cursor, encode_cursor
+    position = (datetime(2025, 12, 15, 10, 0, 0, 123456, tzinfo=timezone.utc), uuid4())
+    cursor = encode_cursor(*position)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == position
+
+@pytest.mark.parametrize("cursor", ["not a cursor", "e30", "WyJub3QgYSBkYXRlIiwgIngiXQ"])
+def test_malformed_cursor_is_rejected(cursor):
+    from src.api.services.postgresql_storage_service import decode_cursor
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor(cursor)
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 7])
+def test_listing_pages_through_shared_timestamps_without_duplicates_or_gaps(run, database, limit):
+    async def exercise():
+        return await _seed_posts(), await _list_all(limit)
+
+    ids, pages = run(exercise())
+    assert [post["id"] for page in pages for post in page] == ids
+    assert all(len(page) == limit for page in pages[:-1])
+    assert len(pages) == -(-len(ids) // limit)
+
+@pytest.mark.parametrize("filters, expected", [
+    ({"approved": True}, {0, 2, 4, 6}),
+    ({"approved": False, "agent_id": 1}, {1}),
+    ({"agent_id": 1}, {0, 1, 2}),
+    ({"is_posted": True}, set()),
+])
+def test_listing_filters(run, database, filters, expected):
+    async def exercise():
+        await _seed_posts()
+        return await _list_all(2, **filters)
+
+    pages = run(exercise())
+    assert {int(post["content"].removeprefix("Post ")) for page in pages for post in page} == expected
+
+def test_listing_returns_only_the_requested_fields(run, database):
+    async def exercise():
+        await _seed_posts()
+        return await _list_all(3, fields=["approved"])
+
+    pages = run(exercise())
+    assert {tuple(post) for page in pages for post in page} == {("id", "created_at", "approved")}
+
+def test_posts_endpoint_rejects_a_malformed_cursor_and_unknown_fields(monkeypatch):
+    from fastapi.testclient import TestClient
+    from src.api.dependencies import get_storage_service
+    from src.api.services.postgresql_storage_service import PostgreSQLStorageService
+    from src.main import app
+
+    # Both are rejected before any query runs
+    app.dependency_overrides[get_storage_service] = lambda: PostgreSQLStorageService(session=None)
+    try:
+        client = TestClient(app)
+        bad_cursor = client.get("/api/v1/content/posts", params={"cursor": "not a cursor"})
+        bad_fields = client.get("/api/v1/content/posts", params={"fields": "content,password"})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert bad_cursor.status_code == 400
+    assert bad_cursor.json()["detail"] == "Invalid cursor: not a cursor"
+    assert bad_fields.status_code == 400
+    assert bad_fields.json()["detail"] == "Unknown fields: password"
@@ -0,0 +1,133 @@
+# Unit tests for background generation jobs
+import asyncio
+from datetime import datetime, timedelta, timezone
+import pytest
+from src.api.models.generation_job import JOB_FAILED, JOB_QUEUED, JOB_RUNNING, JOB_SUCCEEDED
+from src.api.services import generation_jobs
+from src.api.services.generation_jobs import GenerationJobQueue
+
+def _use_workflow(monkeypatch, workflow):
+    monkeypatch.setattr(generation_jobs, "generate_content_workflow", workflow)
+
+async def _generated(prompt, bypass_cache=False, candidate_count=1):
+    return "Shop Now! #Winter"
+
+async def _update_job(job_id, **values):
+    from sqlmodel import update
+    from src.api.models.generation_job import GenerationJob
+    from src.core.database import async_session_factory
+    async with async_session_factory() as session:
+        await session.execute(update(GenerationJob).where(GenerationJob.id == job_id).values(**values))
+        await session.commit()
+
+async def _post_count() -> int:
+    from sqlalchemy import func
+    from sqlmodel import select
+    from src.api.models.post import Post
+    from src.core.database import async_session_factory
+    async with async_session_factory() as session:
+        return await session.scalar(select(func.count(Post.id)))
+
+def _lapsed():
+    return datetime.now(timezone.utc) - timedelta(minutes=1)
+
+def test_job_saves_its_post(run, database, monkeypatch):
+    _use_workflow(monkeypatch, _generated)
+
+    async def exercise():
+        queue = GenerationJobQueue(workers=1, max_queued=10)
+        job = await queue.submit("winter sale")
+        await queue._run(job.id)
+        return queue, await queue.get(str(job.id))
+
+    queue, (job, post) = run(exercise())
+    assert (job.status, job.attempt_count, job.claimed_by) == (JOB_SUCCEEDED, 1, None)
+    assert post.content == "Shop Now! #Winter"
+    assert (queue.succeeded, queue.failed) == (1, 0)
+
+def test_job_result_is_discarded_after_losing_the_lease(run, database, monkeypatch):
+    async def exercise():
+        queue = GenerationJobQueue(workers=1, max_queued=10)
+        job = await queue.submit("winter sale")
+
+        async def slow_workflow(prompt, bypass_cache=False, candidate_count=1):
+            # The lease lapsed meanwhile and another worker claimed the job
+            await _update_job(job.id, claimed_by="other-worker")
+            return "Shop Now! #Winter"
+
+        _use_workflow(monkeypatch, slow_workflow)
+        await queue._run(job.id)
+        return queue, await queue.get(str(job.id)), await _post_count()
+
+    queue, (job, post), posts = run(exercise())
+    assert (job.status, job.claimed_by, post) == (JOB_RUNNING, "other-worker", None)
+    assert posts == 0
+    assert queue.succeeded == 0
+
+def test_recover_requeues_a_lapsed_job_then_fails_it_after_the_last_attempt(run, database, monkeypatch):
+    from src.core.config import settings
+    monkeypatch.setattr(settings, "GENERATION_JOB_MAX_ATTEMPTS", 2)
+
+    async def exercise():
+        queue = GenerationJobQueue(workers=1, max_queued=10)
+        job = await queue.submit("winter sale")
+        outcomes = []
+        for _ in range(2):
+            # A worker claimed the job and stopped before finishing it
+            queue._queue.get_nowait()
+            queue._queued.clear()
+            assert await queue._claim(job.id)
+            await _update_job(job.id, lease_expires_at=_lapsed())
+            recovered = await queue.recover()
+            job, _ = await queue.get(str(job.id))
+            outcomes.append((recovered, job.status, job.attempt_count))
+            if job.status == JOB_FAILED:
+                return outcomes, job
+            # The next claim goes through the recovered entry in the local queue
+            queue._enqueue(job.id)
+
+    outcomes, job = run(exercise())
+    assert outcomes == [(1, JOB_RUNNING, 1), (0, JOB_FAILED, 2)]
+    assert job.error == "Abandoned after 2 interrupted attempts"
+
+def test_cancelled_job_is_released_without_counting_the_attempt(run, database, monkeypatch):
+    async def exercise():
+        started = asyncio.Event()
+
+        async def endless_workflow(prompt, bypass_cache=False, candidate_count=1):
+            started.set()
+            await asyncio.Event().wait()
+
+        _use_workflow(monkeypatch, endless_workflow)
+        queue = GenerationJobQueue(workers=1, max_queued=10)
+        job = await queue.submit("winter sale")
+        task = asyncio.create_task(queue._run(job.id))
+        await started.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return await queue.get(str(job.id))
+
+    job, _ = run(exercise())
+    assert (job.status, job.attempt_count, job.claimed_by) == (JOB_QUEUED, 0, None)
+
+def test_wait_returns_as_soon_as_the_job_finishes_in_this_process(run, database, monkeypatch):
+    from src.core.config import settings
+    monkeypatch.setattr(settings, "GENERATION_JOB_POLL_INTERVAL_SECONDS", 30.0)
+
+    async def exercise():
+        loop = asyncio.get_running_loop()
+        queue = GenerationJobQueue(workers=1, max_queued=10)
+        job = await queue.submit("winter sale")
+        start = loop.time()
+        waiter = asyncio.create_task(queue.wait(str(job.id), timeout=30))
+        await asyncio.sleep(0.05)
+        assert not waiter.done()
+        await _update_job(job.id, status=JOB_SUCCEEDED)
+        queue._notify(job.id)
+        job, _ = await asyncio.wait_for(waiter, 5)
+        return job, loop.time() - start
+
+    job, elapsed = run(exercise())
+    assert job.status == JOB_SUCCEEDED
+    assert elapsed < 1
@@ -0,0 +1,71 @@
+# Checks that the hot queries use the indexes declared on the models
+from datetime import datetime, timedelta, timezone
+import pytest
+from sqlalchemy import event
+from sqlmodel import select
+from src.core.database import async_session_factory, engine
+
+NOW = datetime(2025, 12, 15, 10, 0, tzinfo=timezone.utc)
+
+async def _query_plans(run) -> str:
+    """
+    Runs a coroutine factory and returns the SQLite EXPLAIN QUERY PLAN of every statement it sent.
+    """
+    captured = []
+    def listener(conn, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters))
+    event.listen(engine.sync_engine, "before_cursor_execute", listener)
+    try:
+        await run()
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", listener)
+    plans = []
+    async with engine.connect() as conn:
+        for statement, parameters in captured:
+            result = await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+            plans.extend(str(row[-1]) for row in result.all())
+    return "\n".join(plans)
+
+async def _claim_query():
+    # The SELECT part of `claim_due_posts`, without claiming anything
+    from src.api.models.post import Post
+    from src.api.services import scheduling_service
+    async with async_session_factory() as session:
+        await session.execute(
+            select(Post.id).where(*scheduling_service._claimable(NOW)).order_by(Post.scheduled_at).limit(50)
+        )
+
+async def _listing(**filters):
+    from src.api.services.postgresql_storage_service import PostgreSQLStorageService
+    async with async_session_factory() as session:
+        await PostgreSQLStorageService(session).list_posts(100, **filters)
+
+async def _analytics_summary():
+    from src.api.services.postgresql_storage_service import PostgreSQLStorageService
+    async with async_session_factory() as session:
+        await PostgreSQLStorageService(session).analytics_summary()
+
+def _upcoming_posts():
+    from src.api.services import scheduling_service
+    return scheduling_service.load_upcoming_posts()
+
+def _pending_retries():
+    from src.api.services import publish_outbox
+    return publish_outbox.pending_retries(NOW + timedelta(days=1))
+
+def _published_tweets():
+    from src.api.services.metrics_collector import metrics_collector
+    return metrics_collector._published_tweets(NOW)
+
+@pytest.mark.parametrize("query, index", [
+    (_claim_query, "ix_post_pending_scheduled_at"),
+    (_upcoming_posts, "ix_post_pending_scheduled_at"),
+    (_pending_retries, "ix_publish_attempt_pending_next_retry_at"),
+    (_listing, "ix_post_created_at_id"),
+    (lambda: _listing(agent_id=1), "ix_post_agent_id_created_at_id"),
+    (_analytics_summary, "ix_post_metric_snapshot_post_id_collected_at"),
+    (_published_tweets, "ix_publish_attempt_sent_updated_at"),
+], ids=["claim due posts", "upcoming posts", "outbox retries", "listing", "agent listing", "analytics summary", "tweets to collect"])
+def test_hot_query_uses_its_index(run, database, query, index):
+    plan = run(_query_plans(query))
+    assert index in plan, plan
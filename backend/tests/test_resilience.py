@@ -0,0 +1,108 @@
+# Unit tests for the upstream circuit breakers
+import pytest
+from src.api.services import resilience
+from src.api.services.resilience import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(resilience, "time", clock)
+    return clock
+
+def _open_breaker() -> CircuitBreaker:
+    breaker = CircuitBreaker("upstream", failure_threshold=3, reset_seconds=30)
+    for _ in range(3):
+        breaker.before_call()
+        breaker.record_failure()
+    return breaker
+
+def test_breaker_opens_at_the_threshold_and_rejects_calls(clock):
+    breaker = CircuitBreaker("upstream", failure_threshold=3, reset_seconds=30)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    assert breaker.state == CLOSED
+
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    clock.now += 10
+    with pytest.raises(CircuitOpenError) as excinfo:
+        breaker.before_call()
+    assert excinfo.value.retry_after == pytest.approx(20)
+    assert breaker.stats() == {"state": OPEN, "consecutive_failures": 3, "times_opened": 1, "rejected": 1}
+
+def test_success_resets_the_failure_count(clock):
+    breaker = CircuitBreaker("upstream", failure_threshold=2, reset_seconds=30)
+    breaker.before_call()
+    breaker.record_failure()
+    breaker.before_call()
+    breaker.record_success()
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+
+def test_half_open_breaker_lets_a_single_probe_through(clock):
+    breaker = _open_breaker()
+    clock.now += 31
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+def test_failed_probe_reopens_the_breaker(clock):
+    breaker = _open_breaker()
+    clock.now += 31
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+def test_successful_probe_closes_the_breaker(clock):
+    breaker = _open_breaker()
+    clock.now += 31
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    breaker.before_call()
+    breaker.before_call()
+
+def test_skipped_probe_leaves_the_breaker_half_open(clock):
+    breaker = _open_breaker()
+    clock.now += 31
+    breaker.before_call()
+    breaker.record_skipped()
+    assert breaker.state == HALF_OPEN
+    # The probe slot is free again
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+def test_twitter_rate_limit_skip_does_not_close_the_breaker(run, clock, monkeypatch):
+    from src.api.exceptions import TwitterAPIException
+    from src.api.services import twitter_service
+    from src.api.services.rate_limiter import twitter_rate_limiter
+
+    breaker = _open_breaker()
+    monkeypatch.setitem(resilience.circuit_breakers, resilience.TWITTER, breaker)
+    monkeypatch.setattr(twitter_rate_limiter, "wait_time", lambda: 60.0)
+    clock.now += 31
+
+    async def exercise():
+        with resilience.deadline(5):
+            await twitter_service.schedule_post("Shop Now! #Winter")
+
+    with pytest.raises(TwitterAPIException) as excinfo:
+        run(exercise())
+    assert excinfo.value.status_code == 429
+    assert breaker.state == HALF_OPEN
+    assert breaker.failures == 3
@@ -1 +1,329 @@
 # Unit tests for scheduling
+import asyncio
+from datetime import datetime, timedelta, timezone
+from src.api.services.post_dispatcher import PostDispatcher, as_utc
+
+NOW = datetime(2025, 12, 15, 10, 0, tzinfo=timezone.utc)
+
+async def _ignore(post_id):
+    pass
+
+def test_dispatcher_pops_due_posts_in_time_order():
+    dispatcher = PostDispatcher(_ignore)
+    dispatcher.schedule_many([
+        ("late", NOW + timedelta(minutes=3)),
+        ("early", NOW + timedelta(minutes=1)),
+        ("middle", NOW + timedelta(minutes=2)),
+        ("future", NOW + timedelta(hours=1)),
+    ])
+    assert dispatcher._pop_due(NOW) == []
+    assert dispatcher._pop_due(NOW + timedelta(minutes=5)) == ["early", "middle", "late"]
+    assert len(dispatcher) == 1
+
+def test_dispatcher_reschedules_and_cancels():
+    dispatcher = PostDispatcher(_ignore)
+    dispatcher.schedule("moved", NOW + timedelta(minutes=1))
+    dispatcher.schedule("moved", NOW + timedelta(minutes=10))
+    dispatcher.schedule("cancelled", NOW + timedelta(minutes=2))
+    dispatcher.cancel("cancelled")
+    dispatcher.schedule("kept", NOW + timedelta(minutes=3))
+
+    assert dispatcher._pop_due(NOW + timedelta(minutes=5)) == ["kept"]
+    assert dispatcher._pop_due(NOW + timedelta(minutes=10)) == ["moved"]
+    assert len(dispatcher) == 0
+
+def test_dispatcher_takes_naive_times_as_utc():
+    dispatcher = PostDispatcher(_ignore)
+    dispatcher.schedule("naive", NOW.replace(tzinfo=None))
+    dispatcher.schedule("naive", NOW)
+    assert dispatcher._pop_due(NOW) == ["naive"]
+
+def test_dispatcher_fires_at_scheduled_times_and_wakes_for_earlier_posts(run):
+    dispatched = []
+
+    async def dispatch(post_id):
+        dispatched.append(post_id)
+
+    async def exercise():
+        dispatcher = PostDispatcher(dispatch)
+        now = datetime.now(timezone.utc)
+        dispatcher.schedule("third", now + timedelta(milliseconds=150))
+        dispatcher.start()
+        await asyncio.sleep(0.01)
+        # Added while the dispatcher sleeps until "third"
+        dispatcher.schedule("first", now + timedelta(milliseconds=50))
+        dispatcher.schedule("second", now + timedelta(milliseconds=100))
+        await asyncio.sleep(0.08)
+        fired_early = list(dispatched)
+        await asyncio.sleep(0.15)
+        await dispatcher.stop()
+        return fired_early
+
+    assert run(exercise()) == ["first"]
+    assert dispatched == ["first", "second", "third"]
+
+class _Twitter:
+    """
+    Stands in for `twitter_service.schedule_post`, failing with the queued errors first.
+    """
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.sent = []
+
+    async def schedule_post(self, content, max_retries=None):
+        self.sent.append(content)
+        if self.errors:
+            raise self.errors.pop(0)
+        return {"data": {"id": f"tweet-{len(self.sent)}"}}
+
+def _use_twitter(monkeypatch, twitter):
+    from src.api.services import twitter_service
+    monkeypatch.setattr(twitter_service, "schedule_post", twitter.schedule_post)
+
+async def _create_post() -> str:
+    from src.api.models.post import Post
+    from src.core.database import async_session_factory
+    async with async_session_factory() as session:
+        post = Post(content="Shop Now! #Winter", approved=True, scheduled_at=NOW)
+        session.add(post)
+        await session.commit()
+        return str(post.id)
+
+async def _post_is_posted(post_id: str) -> bool:
+    from uuid import UUID
+    from src.api.models.post import Post
+    from src.core.database import async_session_factory
+    async with async_session_factory() as session:
+        return (await session.get(Post, UUID(post_id))).is_posted
+
+def test_outbox_publishes_once(run, database, monkeypatch):
+    from src.api.services import publish_outbox
+    twitter = _Twitter()
+    _use_twitter(monkeypatch, twitter)
+
+    async def exercise():
+        post_id = await _create_post()
+        first = await publish_outbox.publish_post(post_id, "Shop Now! #Winter")
+        second = await publish_outbox.publish_post(post_id, "Shop Now! #Winter")
+        return first, second, await _post_is_posted(post_id)
+
+    first, second, posted = run(exercise())
+    assert (first.status, first.tweet_id, first.attempt_count) == ("sent", "tweet-1", 1)
+    assert second is None
+    assert posted
+    assert len(twitter.sent) == 1
+
+def test_outbox_schedules_retries_with_backoff_then_gives_up(run, database, monkeypatch):
+    import pytest
+    from src.api.exceptions import TwitterAPIException
+    from src.api.services import publish_outbox
+    from src.core.config import settings
+    monkeypatch.setattr(settings, "PUBLISH_MAX_ATTEMPTS", 2)
+    twitter = _Twitter(TwitterAPIException("Service Unavailable", 503), TwitterAPIException("Service Unavailable", 503))
+    _use_twitter(monkeypatch, twitter)
+
+    async def exercise():
+        post_id = await _create_post()
+        attempts = []
+        for _ in range(2):
+            with pytest.raises(TwitterAPIException):
+                await publish_outbox.publish_post(post_id, "Shop Now! #Winter")
+            attempts.append(await publish_outbox.get_attempt(post_id))
+        retries = await publish_outbox.pending_retries(datetime.now(timezone.utc) + timedelta(days=1))
+        return post_id, attempts, retries, await _post_is_posted(post_id)
+
+    post_id, (first, second), retries, posted = run(exercise())
+    assert (first.status, first.attempt_count, first.last_error) == ("pending", 1, "Service Unavailable")
+    assert first.next_retry_at is not None
+    assert retries == []
+    assert (second.status, second.attempt_count, second.next_retry_at) == ("failed", 2, None)
+    assert not posted
+
+def test_outbox_retries_after_a_failure(run, database, monkeypatch):
+    from src.api.exceptions import TwitterAPIException
+    from src.api.services import publish_outbox
+    twitter = _Twitter(TwitterAPIException("Service Unavailable", 503))
+    _use_twitter(monkeypatch, twitter)
+
+    async def exercise():
+        post_id = await _create_post()
+        try:
+            await publish_outbox.publish_post(post_id, "Shop Now! #Winter")
+        except TwitterAPIException:
+            pass
+        retries = await publish_outbox.pending_retries(datetime.now(timezone.utc) + timedelta(days=1))
+        attempt = await publish_outbox.publish_post(post_id, "Shop Now! #Winter")
+        return post_id, retries, attempt
+
+    post_id, retries, attempt = run(exercise())
+    assert [retry_post_id for retry_post_id, _ in retries] == [post_id]
+    assert (attempt.status, attempt.attempt_count, attempt.tweet_id) == ("sent", 2, "tweet-2")
+
+def _crashed_attempt(updated_at: datetime):
+    """
+    Leaves an in-progress outbox row behind, as a worker that died while sending would.
+    """
+    async def crash(post_id: str):
+        from uuid import UUID
+        from sqlmodel import update
+        from src.api.models.publish_attempt import PublishAttempt, PUBLISH_IN_PROGRESS
+        from src.api.services import publish_outbox
+        from src.core.database import async_session_factory
+        async with async_session_factory() as session:
+            session.add(PublishAttempt(
+                post_id=UUID(post_id), idempotency_key=publish_outbox.idempotency_key(post_id),
+                status=PUBLISH_IN_PROGRESS, attempt_count=1,
+            ))
+            await session.commit()
+            await session.execute(update(PublishAttempt).values(updated_at=updated_at))
+            await session.commit()
+    return crash
+
+def test_outbox_leaves_a_live_in_progress_attempt_alone(run, database, monkeypatch):
+    from src.api.services import publish_outbox
+    twitter = _Twitter()
+    _use_twitter(monkeypatch, twitter)
+
+    async def exercise():
+        post_id = await _create_post()
+        await _crashed_attempt(datetime.now(timezone.utc))(post_id)
+        return await publish_outbox.publish_post(post_id, "Shop Now! #Winter")
+
+    assert run(exercise()) is None
+    assert twitter.sent == []
+
+def test_outbox_recovers_an_abandoned_attempt_that_already_reached_twitter(run, database, monkeypatch):
+    from src.api.exceptions import TwitterAPIException
+    from src.api.services import publish_outbox
+    twitter = _Twitter(TwitterAPIException("You are not allowed to create a Tweet with duplicate content.", 403))
+    _use_twitter(monkeypatch, twitter)
+
+    async def exercise():
+        post_id = await _create_post()
+        await _crashed_attempt(datetime.now(timezone.utc) - timedelta(days=1))(post_id)
+        attempt = await publish_outbox.publish_post(post_id, "Shop Now! #Winter")
+        return attempt, await _post_is_posted(post_id)
+
+    attempt, posted = run(exercise())
+    assert (attempt.status, attempt.attempt_count, attempt.tweet_id) == ("sent", 2, None)
+    assert posted
+
+def test_outbox_treats_a_duplicate_after_an_ambiguous_failure_as_sent(run, database, monkeypatch):
+    from src.api.exceptions import TwitterAPIException
+    from src.api.services import publish_outbox
+    # The first attempt timed out after Twitter had accepted the tweet
+    twitter = _Twitter(
+        TwitterAPIException("Failed to connect to Twitter API: ReadTimeout", 503),
+        TwitterAPIException("You are not allowed to create a Tweet with duplicate content.", 403),
+    )
+    _use_twitter(monkeypatch, twitter)
+
+    async def exercise():
+        post_id = await _create_post()
+        try:
+            await publish_outbox.publish_post(post_id, "Shop Now! #Winter")
+        except TwitterAPIException:
+            pass
+        attempt = await publish_outbox.publish_post(post_id, "Shop Now! #Winter")
+        return attempt, await _post_is_posted(post_id)
+
+    attempt, posted = run(exercise())
+    assert (attempt.status, attempt.attempt_count, attempt.tweet_id) == ("sent", 2, None)
+    assert posted
+
+def test_outbox_records_a_duplicate_on_the_first_attempt_as_a_failure(run, database, monkeypatch):
+    import pytest
+    from src.api.exceptions import TwitterAPIException
+    from src.api.services import publish_outbox
+    _use_twitter(monkeypatch, _Twitter(TwitterAPIException("You are not allowed to create a Tweet with duplicate content.", 403)))
+
+    async def exercise():
+        post_id = await _create_post()
+        with pytest.raises(TwitterAPIException):
+            await publish_outbox.publish_post(post_id, "Shop Now! #Winter")
+        return await publish_outbox.get_attempt(post_id)
+
+    attempt = run(exercise())
+    assert (attempt.status, attempt.attempt_count) == ("pending", 1)
+
+def test_outbox_does_not_let_a_superseded_attempt_overwrite_the_newer_one(run, database, monkeypatch):
+    from src.api.services import publish_outbox
+    twitter = _Twitter()
+    _use_twitter(monkeypatch, twitter)
+
+    async def exercise():
+        post_id = await _create_post()
+        # Attempt 1 stalls past the lease and attempt 2 takes the row over and sends the tweet
+        await _crashed_attempt(datetime.now(timezone.utc) - timedelta(days=1))(post_id)
+        await publish_outbox.publish_post(post_id, "Shop Now! #Winter")
+        next_retry_at = await publish_outbox._record_failure(post_id, 1, "Read timed out")
+        await publish_outbox._record_sent(post_id, 1, "tweet-stale")
+        return next_retry_at, await publish_outbox.get_attempt(post_id)
+
+    next_retry_at, attempt = run(exercise())
+    assert next_retry_at is None
+    assert (attempt.status, attempt.attempt_count, attempt.tweet_id, attempt.last_error) == ("sent", 2, "tweet-1", None)
+
+def test_scheduled_publish_gives_up_on_a_rate_limit_that_outlasts_the_lease(run, database, monkeypatch):
+    import pytest
+    from src.api.exceptions import TwitterAPIException
+    from src.api.services import publish_outbox, scheduling_service
+    from src.api.services.rate_limiter import twitter_rate_limiter
+    from src.core.config import settings
+    monkeypatch.setattr(scheduling_service, "post_dispatcher", PostDispatcher(_ignore))
+    # The rate limit resets after the lease has lapsed
+    monkeypatch.setattr(twitter_rate_limiter, "wait_time", lambda: settings.PUBLISH_LEASE_SECONDS + 300.0)
+
+    async def exercise():
+        post_id = await _create_post()
+        assert await scheduling_service.claim_post(post_id)
+        with pytest.raises(TwitterAPIException) as excinfo:
+            await scheduling_service.publish_scheduled_post(post_id)
+        return post_id, excinfo.value, await publish_outbox.get_attempt(post_id)
+
+    post_id, error, attempt = run(exercise())
+    assert error.status_code == 429
+    assert (attempt.status, attempt.attempt_count) == ("pending", 1)
+    assert scheduling_service.post_dispatcher._scheduled[post_id] == as_utc(attempt.next_retry_at)
+
+def _post_now(monkeypatch, attempt):
+    """
+    Calls `POST /post_now` for a post that another request is publishing or has just published.
+    """
+    from uuid import uuid4
+    from fastapi.testclient import TestClient
+    from src.api.dependencies import get_storage_service
+    from src.api.endpoints import scheduling
+    from src.api.models.post import Post
+    from src.main import app
+
+    post = Post(id=uuid4(), content="Shop Now! #Winter", approved=True)
+
+    class Storage:
+        async def get_post(self, post_id):
+            return post
+
+    async def publish_post(post_id, content):
+        return None
+
+    async def get_attempt(post_id):
+        return attempt
+
+    monkeypatch.setattr(scheduling, "publish_post", publish_post)
+    monkeypatch.setattr(scheduling, "get_attempt", get_attempt)
+    app.dependency_overrides[get_storage_service] = lambda: Storage()
+    try:
+        return TestClient(app).post(f"/api/v1/scheduling/post_now/{post.id}")
+    finally:
+        app.dependency_overrides.clear()
+
+def test_post_now_reports_an_already_sent_post_with_its_tweet(monkeypatch):
+    from src.api.models.publish_attempt import PublishAttempt, PUBLISH_SENT
+    response = _post_now(monkeypatch, PublishAttempt(status=PUBLISH_SENT, tweet_id="tweet-1"))
+    assert response.status_code == 200
+    assert response.json()["tweet_id"] == "tweet-1"
+
+def test_post_now_conflicts_with_an_attempt_in_progress(monkeypatch):
+    from src.api.models.publish_attempt import PublishAttempt, PUBLISH_IN_PROGRESS
+    response = _post_now(monkeypatch, PublishAttempt(status=PUBLISH_IN_PROGRESS))
+    assert response.status_code == 409
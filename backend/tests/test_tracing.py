@@ -0,0 +1,100 @@
+# Unit tests for request tracing
+import json
+import os
+import subprocess
+import sys
+
+# Tracing is set up when `src` is imported, so the traced app runs in its own interpreter.
+# Gemini is a local HTTP server, so the call goes through the instrumented httpx transport.
+_TRACED_GENERATE = """
+import asyncio, json, threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from fastapi.testclient import TestClient
+from sqlmodel import SQLModel
+from src.main import app
+from src.core.database import engine
+from src.core.tracing import tracing
+from src.api.services import gemini_service
+
+class Gemini(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        body = json.dumps({"candidates": [{"content": {"parts": [{"text": "Shop Now! #Winter"}]}}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+server = ThreadingHTTPServer(("127.0.0.1", 0), Gemini)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+gemini_service.GEMINI_API_URL = "http://127.0.0.1:%s/v1beta/models/gemini:generateContent" % server.server_address[1]
+
+async def create_all():
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    await engine.dispose()
+
+asyncio.run(create_all())
+tracing.memory_exporter.clear()
+response = TestClient(app).post("/api/v1/content/generate", json={"prompt": "winter sale"})
+assert response.status_code == 200, response.text
+print(json.dumps([
+    {
+        "name": span.name,
+        "trace_id": format(span.context.trace_id, "032x"),
+        "parent": span.parent is not None,
+        "attributes": dict(span.attributes),
+    }
+    for span in tracing.finished_spans()
+]))
+server.shutdown()
+"""
+
+def _traced_generate(tmp_path):
+    """
+    Runs a `/generate` call with the "memory" exporter and returns its spans and log lines.
+    """
+    env = dict(
+        os.environ,
+        GOOGLE_API_KEY="gemini-secret",
+        DATABASE_URL=f"sqlite+aiosqlite:///{tmp_path / 'tracing.db'}",
+        TRACING_ENABLED="true",
+        TRACING_EXPORTER="memory",
+        TRACING_SAMPLE_RATIO="1",
+        LOG_LEVEL="INFO",
+        LOG_JSON="false",
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", _TRACED_GENERATE],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        env=env, capture_output=True, text=True, timeout=60,
+    )
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1]), result.stderr.splitlines()
+
+def _url(span) -> str:
+    # Newer instrumentation versions use the stable semantic conventions
+    return span["attributes"].get("url.full", span["attributes"].get("http.url", ""))
+
+def test_generate_is_traced_end_to_end_without_leaking_the_api_key(tmp_path):
+    spans, log_lines = _traced_generate(tmp_path)
+
+    route = next(span for span in spans if span["name"] == "POST /api/v1/content/generate" and not span["parent"])
+    trace_id = route["trace_id"]
+    names = {span["name"] for span in spans if span["trace_id"] == trace_id}
+    assert {"workflow default", "node generate", "node validate"} <= names, names
+    upstream = [span for span in spans if "gemini:generateContent" in _url(span)]
+    assert len(upstream) == 1
+    assert upstream[0]["trace_id"] == trace_id
+    assert "key=REDACTED" in _url(upstream[0])
+    assert len({span["trace_id"] for span in spans}) == 1
+
+    request_lines = [line for line in log_lines if "Generating post for prompt: winter sale" in line]
+    assert len(request_lines) == 1
+    assert f"trace_id={trace_id}" in request_lines[0]
+    assert "gemini-secret" not in json.dumps(spans)
+    assert not any("gemini-secret" in line for line in log_lines)
@@ -42,7 +42,7 @@ docker tag postgres:13-alpine gcr.io/$PROJECT_ID/postgres:13-alpine
 docker push gcr.io/$PROJECT_ID/postgres:13-alpine
 
 echo "Building and pushing backend image..."
-docker build -t gcr.io/$PROJECT_ID/backend:latest ./backend/src
+docker build -t gcr.io/$PROJECT_ID/backend:latest -f ./backend/src/Dockerfile ./backend
 docker push gcr.io/$PROJECT_ID/backend:latest
 
 echo "Building and pushing frontend image..."
@@ -72,6 +72,28 @@ POSTGRES_SERVICE_URL=$(gcloud run services describe postgres-db --platform manag
 # Extract hostname from URL (e.g., http://postgres-db-xxxxxx-uc.a.run.app -> postgres-db-xxxxxx-uc.a.run.app)
 POSTGRES_HOST=$(echo $POSTGRES_SERVICE_URL | sed -e 's/^https:\/\///' -e 's/^http:\/\///')
 
+# --- Database Migrations ---
+echo "Running database migrations..."
+# Apply pending migrations with a Cloud Run Job from the backend image before the new backend
+# revision starts; it only checks the schema version at startup (DB_SCHEMA_MODE=check)
+gcloud run jobs deploy db-migrate-job \
+  --image gcr.io/$PROJECT_ID/backend:latest \
+  --region $REGION \
+  --command alembic \
+  --args upgrade,head \
+  --set-env-vars DATABASE_URL="postgresql+asyncpg://${POSTGRES_USER}:${POSTGRES_PASSWORD}@${POSTGRES_HOST}:5432/${POSTGRES_DB}" \
+  --set-secrets GOOGLE_API_KEY=GOOGLE_API_KEY:latest,TWITTER_API_KEY=TWITTER_API_KEY:latest,TWITTER_API_SECRET=TWITTER_API_SECRET:latest,TWITTER_ACCESS_TOKEN=TWITTER_ACCESS_TOKEN:latest,TWITTER_ACCESS_TOKEN_SECRET=TWITTER_ACCESS_TOKEN_SECRET:latest \
+  --cpu 1 \
+  --memory 512Mi \
+  --max-retries 0 \
+  --project $PROJECT_ID
+
+# Execute the job and wait for it, so a failed migration stops the deploy
+gcloud run jobs execute db-migrate-job \
+  --region $REGION \
+  --wait \
+  --project $PROJECT_ID
+
 echo "Deploying backend service to Cloud Run..."
 # Deploy backend, connecting to the PostgreSQL service
 gcloud run deploy backend \
@@ -110,26 +132,6 @@ gcloud run deploy frontend \
 
 FRONTEND_URL=$(gcloud run services describe frontend --platform managed --region $REGION --project $PROJECT_ID --format 'value(status.url)')
 
-# --- Database Initialization Job ---
-echo "Running database initialization job..."
-# Deploy a Cloud Run Job using the backend image to run reset_database.py
-gcloud run jobs deploy db-init-job \
-  --image gcr.io/$PROJECT_ID/backend:latest \
-  --platform managed \
-  --region $REGION \
-  --command python \
-  --arg reset_database.py \
-  --set-env-vars DATABASE_URL="postgresql+asyncpg://${POSTGRES_USER}:${POSTGRES_PASSWORD}@${POSTGRES_HOST}:5432/${POSTGRES_DB}" \
-  --cpu 1 \
-  --memory 512Mi \
-  --max-retries 0 \
-  --project $PROJECT_ID
-
-# Execute the job
-gcloud run jobs execute db-init-job \
-  --region $REGION \
-  --project $PROJECT_ID
-
 echo "Deployment complete!"
 echo "Frontend URL: $FRONTEND_URL"
 echo "Backend URL: $BACKEND_URL"